@@ -0,0 +1,113 @@
+# SSBModel/caching.py
+
+import threading
+import uuid
+import weakref
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# Pending on-commit batches of this thread: (alias, key) -> weak reference to the batch
+_pending = threading.local()
+
+class _OnCommitBatch:
+    """One registered on_commit callback, with the items collected for it"""
+
+    def __init__(self, func, pass_items):
+        self.func = func
+        self.pass_items = pass_items
+        self.items = set()
+        self.started = False
+
+    def __call__(self):
+        self.started = True
+        if self.pass_items:
+            self.func(self.items)
+        else:
+            self.func()
+
+def _schedule(func, items, using, pass_items):
+    using = using or DEFAULT_DB_ALIAS
+    batches = getattr(_pending, 'batches', None)
+    if batches is None:
+        batches = _pending.batches = {}
+
+    # Only the transaction holds the batch; once Django runs it or discards it
+    # on rollback the reference is dead and the next call registers a new one
+    ref = batches.get((using, func))
+    batch = ref() if ref is not None else None
+    if batch is not None and not batch.started:
+        batch.items.update(items)
+        return
+
+    batch = _OnCommitBatch(func, pass_items)
+    batch.items.update(items)
+    batches[(using, func)] = weakref.ref(batch)
+    transaction.on_commit(batch, using=using)
+
+def schedule_once_on_commit(func, using=None):
+    """
+    Run func once after the current transaction commits
+
+    However often it is scheduled within one transaction (e.g. once per row of
+    a bulk delete), a single callback is registered. Outside a transaction
+    func runs immediately; rolled-back work never triggers it.
+    """
+    _schedule(func, (), using, pass_items=False)
+
+def collect_on_commit(func, items, using=None):
+    """
+    Call func(items) once after the current transaction commits
+
+    Items collected for the same func during the transaction are merged into
+    one set, so per-row signals turn into one set-based call on commit.
+    """
+    _schedule(func, items, using, pass_items=True)
+
+class VersionedCache:
+    """
+    Group of cache entries that are dropped together by replacing a version token
+
+    Entries are stored under the current version, so invalidating is a single
+    cache write: superseded entries are never read again and simply expire. A
+    build that races with an invalidation is stored under the old version and
+    ignored.
+    """
+
+    def __init__(self, prefix, timeout, alias='default'):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.alias = alias
+        self.version_key = f'{prefix}:version'
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def current_version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            # Another process may have set it first; use whichever won
+            if not self.cache.add(self.version_key, version, None):
+                version = self.cache.get(self.version_key, version)
+        return version
+
+    def invalidate(self):
+        """Start a new version immediately"""
+        self.cache.set(self.version_key, uuid.uuid4().hex, None)
+
+    def invalidate_on_commit(self):
+        """Start a new version once the current transaction commits"""
+        schedule_once_on_commit(self.invalidate)
+
+    def key(self, *parts):
+        return ':'.join([self.prefix, self.current_version(), *(str(part) for part in parts)])
+
+    def get_or_build(self, parts, build):
+        """Return the entry for parts under the current version, calling build() on a miss"""
+        key = self.key(*parts)
+        value = self.cache.get(key)
+        if value is None:
+            value = build()
+            self.cache.set(key, value, self.timeout)
+        return value
@@ -0,0 +1,45 @@
+# SSBModel/csv_streaming.py
+
+import csv
+from django.http import StreamingHttpResponse
+from users.models import UserActivity
+
+class Echo:
+    """File-like object whose write() hands back the value, so csv.writer can feed a generator"""
+    def write(self, value):
+        return value
+
+def csv_lines(header, rows):
+    """Yield the header and then each row as one line of CSV text"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+def streaming_csv_response(request, header, rows, filename, item_label):
+    """
+    Stream rows to the client as a CSV attachment and log the export
+
+    Rows are written as they are read, so memory use does not depend on the
+    export size. The csv_export UserActivity entry is written once the last
+    row has been sent, with the number of rows actually streamed; an aborted
+    download is not logged.
+    """
+    def stream():
+        exported = 0
+        lines = csv_lines(header, rows)
+        yield next(lines)
+        for line in lines:
+            exported += 1
+            yield line
+
+        UserActivity.objects.create(
+            user=request.user,
+            activity_type='csv_export',
+            description=f"Exported {exported} {item_label} to CSV",
+            ip_address=request.META.get('REMOTE_ADDR')
+        )
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
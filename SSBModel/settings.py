@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third-party apps
     'crispy_forms',
@@ -163,6 +164,30 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache (file based so all worker processes share invalidations). Culling
+# removes random entries, so MAX_ENTRIES is sized well above the number of
+# tree payloads, facet results and sidebar fragments kept at once; a culled
+# version token only costs a rebuild, never a stale read.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    # Short-lived per-process cache for type-ahead prefixes
+    'typeahead': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'part-typeahead',
+        'TIMEOUT': 30,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
 # User management settings
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGIN_URL = 'login'
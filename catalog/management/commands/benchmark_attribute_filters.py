@@ -0,0 +1,190 @@
+# catalog/management/commands/benchmark_attribute_filters.py
+import random
+import statistics
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from catalog.models import Category, Attribute, Product, ProductAttribute
+from catalog.services.attribute_documents import AttributeDocuments
+from catalog.services.facet_counts import FacetCounts
+from catalog.services.facets import AttributeFacets
+
+# ProductAttribute indexes compared by the benchmark (see ProductAttribute.Meta)
+BENCHMARK_INDEXES = (
+    'catalog_pa_attr_number_idx',
+    'catalog_pa_attr_bool_idx',
+    'catalog_pa_product_attr_idx',
+)
+
+# Seeded attributes: slug -> (type, values or numeric range)
+BENCHMARK_ATTRIBUTES = {
+    'bench-diameter': ('number', (1, 500)),
+    'bench-length': ('number', (1, 2000)),
+    'bench-load': ('number', (100, 50000)),
+    'bench-rpm': ('number', (0, 30000)),
+    'bench-material': ('choice', ('Steel', 'Stainless', 'Brass', 'Bronze', 'Nylon', 'PTFE', 'Ceramic')),
+    'bench-finish': ('choice', ('Plain', 'Zinc', 'Black oxide', 'Chrome', 'Nickel')),
+    'bench-standard': ('text', tuple(f'DIN {number}' for number in range(100, 160))),
+    'bench-series': ('text', tuple(f'S{number:03d}' for number in range(250))),
+    'bench-sealed': ('boolean', None),
+    'bench-rohs': ('boolean', None),
+}
+
+class Command(BaseCommand):
+    help = ('Seed benchmark products and compare attribute filter latency without and with the '
+            'ProductAttribute indexes. Runs in a throwaway test database (as "manage.py test" creates), '
+            'so the configured database is never written to.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000,
+                            help=f'Number of products to seed, each with {len(BENCHMARK_ATTRIBUTES)} attribute values')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per query; the median is reported')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of rows written per bulk insert')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed for the generated values')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Replace a leftover benchmark database without asking')
+
+    def handle(self, *args, **options):
+        self.repeat = max(1, options['repeat'])
+        self.random = random.Random(options['seed'])
+
+        # Seeding and dropping indexes must never reach real data, so the run
+        # gets its own test database, destroyed again at the end
+        old_name = connection.settings_dict['NAME']
+        self.stdout.write('Creating the benchmark database...')
+        connection.creation.create_test_db(verbosity=0, autoclobber=not options['interactive'], serialize=False)
+        try:
+            self.stdout.write(f'Seeding {options["products"]} products...')
+            started = time.perf_counter()
+            category, attributes = self.seed(options['products'], options['batch_size'])
+            self.stdout.write(f'  Seeded in {time.perf_counter() - started:.1f}s')
+
+            queries = self.queries(category, attributes)
+            indexes = [index for index in ProductAttribute._meta.indexes if index.name in BENCHMARK_INDEXES]
+
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(ProductAttribute, index)
+            self.analyze()
+            before = self.measure(queries)
+
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(ProductAttribute, index)
+            self.analyze()
+            after = self.measure(queries)
+
+            self.report(queries, before, after)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark database removed'))
+
+    def seed(self, count, batch_size):
+        """Create the benchmark category, attributes, products and values with bulk inserts"""
+        category = Category.objects.create(name='Attribute benchmark', slug='attribute-benchmark')
+        attributes = {}
+        for slug, (attr_type, values) in BENCHMARK_ATTRIBUTES.items():
+            attributes[slug] = Attribute.objects.create(
+                name=slug.replace('bench-', '').capitalize(),
+                slug=slug,
+                attr_type=attr_type,
+                choices_list=','.join(values) if attr_type == 'choice' else ''
+            )
+
+        for start in range(0, count, batch_size):
+            products = Product.objects.bulk_create([
+                Product(
+                    sku=f'BENCH-{number:08d}',
+                    name=f'Benchmark product {number}',
+                    description='',
+                    category=category,
+                    price=Decimal(self.random.randint(100, 100000)) / 100,
+                    stock=self.random.randint(0, 100)
+                )
+                for number in range(start, min(start + batch_size, count))
+            ])
+            values = [
+                self.value(product, attributes[slug])
+                for product in products
+                for slug in BENCHMARK_ATTRIBUTES
+            ]
+            ProductAttribute.objects.bulk_create(values, batch_size=batch_size)
+            AttributeDocuments.refresh([product.pk for product in products], batch_size=batch_size)
+
+        return category, attributes
+
+    def value(self, product, attribute):
+        """Random ProductAttribute for a benchmark product"""
+        values = BENCHMARK_ATTRIBUTES[attribute.slug][1]
+        row = ProductAttribute(product=product, attribute=attribute)
+        if attribute.attr_type == 'number':
+            row.value_number = Decimal(self.random.randint(values[0] * 100, values[1] * 100)) / 100
+        elif attribute.attr_type == 'boolean':
+            row.value_boolean = self.random.random() < 0.3
+        else:
+            row.value_text = self.random.choice(values)
+        return row
+
+    def queries(self, category, attributes):
+        """Named callables, each running one filter the catalog issues"""
+        diameter = attributes['bench-diameter']
+        material = attributes['bench-material']
+        sealed = attributes['bench-sealed']
+        sample_ids = list(Product.objects.filter(category=category).order_by('?').values_list('pk', flat=True)[:50])
+        filtered = AttributeFacets.apply(Product.objects.filter(category=category), {
+            'attr_bench-material': 'Brass', 'min_attr_bench-diameter': '100', 'max_attr_bench-diameter': '150'
+        })
+
+        return [
+            ('Number range on one attribute', lambda: list(ProductAttribute.objects.filter(
+                attribute=diameter, value_number__gte=100, value_number__lte=110
+            ).values_list('product_id', flat=True))),
+            ('Text value of one attribute', lambda: list(ProductAttribute.objects.filter(
+                attribute=material, value_text='Ceramic'
+            ).values_list('product_id', flat=True))),
+            ('Boolean value of one attribute', lambda: list(ProductAttribute.objects.filter(
+                attribute=sealed, value_boolean=True
+            ).values_list('product_id', flat=True))),
+            ('One attribute of 50 products', lambda: list(ProductAttribute.objects.filter(
+                product_id__in=sample_ids, attribute=diameter
+            ).values_list('product_id', 'value_number'))),
+            ('Documents of 50 products', lambda: AttributeDocuments.build(sample_ids)),
+            ('Facet counts of a filtered list', lambda: FacetCounts.build(filtered)),
+            ('Product list filter (document)', lambda: list(filtered.values_list('pk', flat=True))),
+        ]
+
+    def analyze(self):
+        """Refresh planner statistics so the comparison uses current row counts"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE catalog_productattribute')
+                cursor.execute('ANALYZE catalog_product')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def measure(self, queries):
+        """Median milliseconds per query over --repeat runs (after one warm-up run)"""
+        timings = []
+        for name, query in queries:
+            query()
+            runs = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                query()
+                runs.append((time.perf_counter() - started) * 1000)
+            timings.append(statistics.median(runs))
+        return timings
+
+    def report(self, queries, before, after):
+        rows = ProductAttribute.objects.count()
+        self.stdout.write(f'\nFilter latency over {rows} attribute rows (median of {self.repeat} runs, {connection.vendor})\n')
+        width = max(len(name) for name, _ in queries)
+        self.stdout.write(f'{"Query":<{width}}  {"No indexes":>12}  {"Indexed":>12}  {"Speedup":>8}')
+        for (name, _), without, indexed in zip(queries, before, after):
+            speedup = without / indexed if indexed else 0
+            self.stdout.write(f'{name:<{width}}  {without:>10.2f}ms  {indexed:>10.2f}ms  {speedup:>7.1f}x')
@@ -0,0 +1,17 @@
+# catalog/management/commands/rebuild_attribute_documents.py
+from django.core.management.base import BaseCommand
+from catalog.services.attribute_documents import AttributeDocuments
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized attribute document of every catalog product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of products rebuilt per query and transaction')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding product attribute documents...')
+
+        written = AttributeDocuments.rebuild_all(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Attribute documents rebuilt for {written} products'))
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:20
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+ATTRIBUTE_DATA_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['attribute_data'], name='catalog_product_attrs_gin')
+
+
+def create_attribute_data_index(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; other backends scan the documents
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('catalog', 'Product')
+    schema_editor.add_index(Product, ATTRIBUTE_DATA_INDEX)
+
+
+def drop_attribute_data_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('catalog', 'Product')
+    schema_editor.remove_index(Product, ATTRIBUTE_DATA_INDEX)
+
+
+def populate_attribute_data(apps, schema_editor):
+    """Build the attribute document of every existing product"""
+    Product = apps.get_model('catalog', 'Product')
+    ProductAttribute = apps.get_model('catalog', 'ProductAttribute')
+
+    documents = {}
+    rows = ProductAttribute.objects.order_by('product_id', 'id').values_list(
+        'product_id', 'attribute__slug', 'attribute__name', 'attribute__unit',
+        'attribute__attr_type', 'value_text', 'value_number', 'value_boolean'
+    )
+    for product_id, slug, name, unit, attr_type, value_text, value_number, value_boolean in rows.iterator(chunk_size=10000):
+        number = float(value_number) if value_number is not None else None
+        if attr_type == 'number':
+            value = number
+        elif attr_type == 'boolean':
+            value = value_boolean
+        else:
+            value = value_text
+        entry = {'name': name, 'unit': unit, 'type': attr_type, 'value': value}
+        if number is not None:
+            entry['number'] = number
+        documents.setdefault(product_id, {})[slug] = entry
+
+    Product.objects.bulk_update(
+        [Product(pk=pk, attribute_data=document) for pk, document in documents.items()],
+        ['attribute_data'],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='attribute_data',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='product', index=ATTRIBUTE_DATA_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_attribute_data_index, drop_attribute_data_index),
+            ],
+        ),
+        migrations.RunPython(populate_attribute_data, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_product_attribute_data'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productattribute',
+            index=models.Index(fields=['attribute', 'value_number'], name='catalog_pa_attr_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productattribute',
+            index=models.Index(fields=['attribute', 'value_boolean'], name='catalog_pa_attr_bool_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productattribute',
+            index=models.Index(fields=['product', 'attribute'], name='catalog_pa_product_attr_idx'),
+        ),
+    ]
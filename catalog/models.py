@@ -1,5 +1,6 @@
 # catalog/models.py
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from mptt.models import MPTTModel, TreeForeignKey
 from equipment.models import Equipment
 
@@ -92,8 +93,23 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Typed copy of the attribute values keyed by attribute slug, maintained
+    # from ProductAttribute (see catalog/services/attribute_documents.py)
+    attribute_data = models.JSONField(default=dict, blank=True, editable=False)
+    
+    class Meta:
+        indexes = [
+            # Containment (@>) filters on attribute values (PostgreSQL only)
+            GinIndex(fields=['attribute_data'], name='catalog_product_attrs_gin'),
+        ]
+    
     def __str__(self):
         return f"{self.sku} - {self.name}"
+    
+    @property
+    def attribute_entries(self):
+        """Attribute values for display, in attribute name order, without touching ProductAttribute"""
+        return sorted(self.attribute_data.values(), key=lambda entry: entry['name'])
 
 class ProductImage(models.Model):
     """Product images with ordering"""
@@ -116,6 +132,15 @@ class ProductAttribute(models.Model):
     value_number = models.DecimalField(max_digits=15, decimal_places=6, null=True, blank=True)
     value_boolean = models.BooleanField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            # Value and range lookups within one attribute (facet counts, reports)
+            models.Index(fields=['attribute', 'value_number'], name='catalog_pa_attr_number_idx'),
+            models.Index(fields=['attribute', 'value_boolean'], name='catalog_pa_attr_bool_idx'),
+            # One product's value for an attribute, and document rebuilds by product
+            models.Index(fields=['product', 'attribute'], name='catalog_pa_product_attr_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.product.sku} - {self.attribute.name}"
         
@@ -0,0 +1,108 @@
+# catalog/services/attribute_documents.py
+
+from django.db import transaction
+from ..models import Product, ProductAttribute
+
+# Fields read from ProductAttribute to build a document entry
+ENTRY_FIELDS = (
+    'product_id', 'attribute__slug', 'attribute__name', 'attribute__unit',
+    'attribute__attr_type', 'value_text', 'value_number', 'value_boolean'
+)
+
+class AttributeDocuments:
+    """
+    Denormalized attribute values on Product.attribute_data
+
+    Each product carries one JSON document keyed by attribute slug:
+
+        {"diameter": {"name": "Diameter", "unit": "mm", "type": "number",
+                      "value": 20.0, "number": 20.0}, ...}
+
+    'value' is already typed for the attribute, so rendering needs neither
+    ProductAttribute rows nor their Attribute. 'number' is only present when
+    the row has a numeric value and is what range filters compare, so text
+    values never take part in numeric comparisons. ProductAttribute remains
+    the source of truth: its signals collect the affected products and refresh
+    them together once the transaction commits, and the
+    rebuild_attribute_documents command recomputes all of them.
+    """
+
+    @staticmethod
+    def entry(row):
+        """Document entry for one ProductAttribute values() row"""
+        attr_type = row['attribute__attr_type']
+        number = float(row['value_number']) if row['value_number'] is not None else None
+
+        if attr_type == 'number':
+            value = number
+        elif attr_type == 'boolean':
+            value = row['value_boolean']
+        else:
+            value = row['value_text']
+
+        entry = {
+            'name': row['attribute__name'],
+            'unit': row['attribute__unit'],
+            'type': attr_type,
+            'value': value,
+        }
+        if number is not None:
+            entry['number'] = number
+        return entry
+
+    @staticmethod
+    def build(product_ids):
+        """Return product id -> document for the given products, from one query"""
+        documents = {product_id: {} for product_id in product_ids}
+        rows = ProductAttribute.objects.filter(
+            product_id__in=list(documents)
+        ).order_by('product_id', 'id').values(*ENTRY_FIELDS)
+        for row in rows:
+            documents[row['product_id']][row['attribute__slug']] = AttributeDocuments.entry(row)
+        return documents
+
+    @staticmethod
+    def refresh(product_ids, batch_size=1000):
+        """
+        Recompute and store the documents of the given products
+
+        Written with bulk updates, so no Product signals are sent. Returns the
+        number of products written.
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        written = 0
+        for start in range(0, len(product_ids), batch_size):
+            documents = AttributeDocuments.build(product_ids[start:start + batch_size])
+            products = [Product(pk=product_id, attribute_data=document) for product_id, document in documents.items()]
+            Product.objects.bulk_update(products, ['attribute_data'])
+            written += len(products)
+        return written
+
+    @staticmethod
+    def refresh_attributes(attribute_ids, batch_size=1000):
+        """Refresh every product that has a value for one of the attributes (after a rename or type change)"""
+        product_ids = ProductAttribute.objects.filter(
+            attribute_id__in=list(attribute_ids)
+        ).order_by().values_list('product_id', flat=True).distinct()
+        return AttributeDocuments.refresh(product_ids, batch_size=batch_size)
+
+    @staticmethod
+    def rebuild_all(batch_size=1000):
+        """
+        Recompute the document of every product
+
+        Products are processed in primary key batches, each in its own
+        transaction, so a large catalog is never held in memory or locked at
+        once. Returns the number of products written.
+        """
+        written = 0
+        last_pk = 0
+        while True:
+            product_ids = list(Product.objects.filter(
+                pk__gt=last_pk
+            ).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not product_ids:
+                return written
+            with transaction.atomic():
+                written += AttributeDocuments.refresh(product_ids, batch_size=batch_size)
+            last_pk = product_ids[-1]
@@ -0,0 +1,73 @@
+# catalog/services/category_tree.py
+
+from django.template.loader import render_to_string
+from SSBModel.caching import VersionedCache
+from ..models import Category, Product
+
+# Superseded fragments are never read again; let them age out
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Rendered sidebars per active category; Category and Product changes replace the version
+CATEGORY_TREE_CACHE = VersionedCache('catalog-category-tree', FRAGMENT_TIMEOUT)
+
+class CategoryTreeCache:
+    """
+    Rendered category sidebar (top-level categories and their children)
+
+    The tree and its cumulative product counts come from one MPTT
+    add_related_count query; which branch is active is worked out from the
+    lft/rght bounds, so rendering needs no further queries. Fragments are
+    cached per active category in CATEGORY_TREE_CACHE (invalidated from
+    catalog/signals.py).
+    """
+
+    @staticmethod
+    def build(roots=None):
+        """
+        Return the top-level categories (or the given roots) with their children
+
+        Each node has 'product_count' including the products of all its
+        descendants; roots carry their direct children in 'child_nodes'.
+        """
+        if roots is None:
+            queryset = Category.objects.filter(level__lte=1)
+        else:
+            root_ids = [root.pk for root in roots]
+            queryset = Category.objects.filter(pk__in=root_ids) | Category.objects.filter(parent_id__in=root_ids)
+
+        nodes = list(Category.objects.add_related_count(
+            queryset, Product, 'category', 'product_count', cumulative=True
+        ).order_by('tree_id', 'lft'))
+
+        by_id = {node.pk: node for node in nodes}
+        tree = []
+        for node in nodes:
+            node.child_nodes = []
+            parent = by_id.get(node.parent_id)
+            if parent is not None:
+                parent.child_nodes.append(node)
+            else:
+                tree.append(node)
+        return tree
+
+    @staticmethod
+    def _is_active(node, current):
+        """True if node is the current category or one of its ancestors"""
+        return (current is not None and node.tree_id == current.tree_id
+                and node.lft <= current.lft and node.rght >= current.rght)
+
+    @staticmethod
+    def render(current_category=None, roots=None):
+        """Return the sidebar HTML, rendering it on a cache miss"""
+        def render_tree():
+            tree = CategoryTreeCache.build(roots)
+            for root in tree:
+                root.active = CategoryTreeCache._is_active(root, current_category)
+                for child in root.child_nodes:
+                    child.active = CategoryTreeCache._is_active(child, current_category)
+            return render_to_string('catalog/category_tree.html', {'tree': tree})
+
+        return CATEGORY_TREE_CACHE.get_or_build((
+            '-'.join(str(root.pk) for root in roots) if roots is not None else 'all',
+            current_category.pk if current_category is not None else 'none'
+        ), render_tree)
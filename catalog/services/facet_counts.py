@@ -0,0 +1,125 @@
+# catalog/services/facet_counts.py
+
+import hashlib
+from django.db.models import Count, Max, Min
+from SSBModel.caching import VersionedCache
+from ..models import ProductAttribute
+
+# Seconds a filter signature stays cached; edits start a new version anyway
+CACHE_TIMEOUT = 60 * 10
+
+# Facet results per filter signature; catalog changes replace the version (see catalog/signals.py)
+FACET_CACHE = VersionedCache('catalog-facets', CACHE_TIMEOUT)
+
+# Attributes shared by fewer products than this are not offered as filters
+MIN_PRODUCTS = 2
+
+class FacetCounts:
+    """
+    Attribute value counts for a filtered product list
+
+    One grouped ProductAttribute query over the ids of the filtered products
+    returns, per attribute and value, the number of products and the numeric
+    range; the product query itself only appears as a subquery. Results are
+    cached per filter signature (the SQL of the filtered id query) in
+    FACET_CACHE.
+    """
+
+    @staticmethod
+    def _product_ids(queryset):
+        """Id subquery of a product queryset, without ordering or prefetches"""
+        return queryset.order_by().values('id')
+
+    @staticmethod
+    def signature(queryset):
+        """Stable digest of the filters applied to a product queryset"""
+        sql, params = FacetCounts._product_ids(queryset).query.sql_with_params()
+        return hashlib.md5(f"{sql}|{params!r}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def build(queryset, min_products=MIN_PRODUCTS):
+        """
+        Aggregate the attribute values of the products in queryset
+
+        Returns:
+            List of facet dicts in attribute name order, each with the attribute
+            fields the sidebar uses ('name', 'slug', 'attr_type', 'unit',
+            'choices_list'), 'product_count', 'values' as (value, count) pairs
+            and the numeric 'min'/'max' (None without numeric values)
+        """
+        rows = ProductAttribute.objects.filter(
+            product_id__in=FacetCounts._product_ids(queryset)
+        ).values(
+            'attribute_id', 'attribute__name', 'attribute__slug', 'attribute__attr_type',
+            'attribute__unit', 'attribute__choices_list', 'value_text', 'value_boolean'
+        ).annotate(
+            products=Count('product_id', distinct=True),
+            low=Min('value_number'),
+            high=Max('value_number')
+        ).order_by()
+
+        facets = {}
+        for row in rows:
+            facet = facets.get(row['attribute_id'])
+            if facet is None:
+                facet = facets[row['attribute_id']] = {
+                    'id': row['attribute_id'],
+                    'name': row['attribute__name'],
+                    'slug': row['attribute__slug'],
+                    'attr_type': row['attribute__attr_type'],
+                    'unit': row['attribute__unit'],
+                    'choices_list': row['attribute__choices_list'],
+                    'product_count': 0,
+                    'values': [],
+                    'min': None,
+                    'max': None,
+                }
+            # A product normally has one value per attribute, so the groups add up
+            facet['product_count'] += row['products']
+
+            if facet['attr_type'] == 'boolean':
+                if row['value_boolean'] is not None:
+                    facet['values'].append((row['value_boolean'], row['products']))
+            elif facet['attr_type'] != 'number' and row['value_text']:
+                facet['values'].append((row['value_text'], row['products']))
+
+            if row['low'] is not None:
+                facet['min'] = row['low'] if facet['min'] is None else min(facet['min'], row['low'])
+                facet['max'] = row['high'] if facet['max'] is None else max(facet['max'], row['high'])
+
+        result = []
+        for facet in facets.values():
+            if facet['product_count'] < min_products:
+                continue
+            facet['values'].sort(key=lambda item: (-item[1], str(item[0])))
+            result.append(facet)
+        result.sort(key=lambda facet: (facet['name'], facet['id']))
+        return result
+
+    @staticmethod
+    def get(queryset, use_cache=True):
+        """Return the facets of a product queryset, building them on a cache miss"""
+        if not use_cache:
+            return FacetCounts.build(queryset)
+
+        return FACET_CACHE.get_or_build(
+            (FacetCounts.signature(queryset),),
+            lambda: FacetCounts.build(queryset)
+        )
+
+    @staticmethod
+    def as_json(facets):
+        """JSON-ready form: attribute slug -> type, unit, product count, value counts and range"""
+        return {
+            facet['slug']: {
+                'name': facet['name'],
+                'attr_type': facet['attr_type'],
+                'unit': facet['unit'],
+                'product_count': facet['product_count'],
+                'values': {str(value).lower() if isinstance(value, bool) else value: count
+                           for value, count in facet['values']},
+                'min': float(facet['min']) if facet['min'] is not None else None,
+                'max': float(facet['max']) if facet['max'] is not None else None,
+            }
+            for facet in facets
+        }
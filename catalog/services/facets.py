@@ -0,0 +1,115 @@
+# catalog/services/facets.py
+
+from decimal import Decimal, InvalidOperation
+from django.db import connection
+from django.db.models import Q
+from ..models import Attribute
+
+# GET parameter prefixes of attribute filters, longest first so min_/max_ win over attr_
+FILTER_PREFIXES = (
+    ('min_attr_', 'min'),
+    ('max_attr_', 'max'),
+    ('attr_', 'value'),
+)
+
+TRUE_VALUES = ('true', 'yes', '1')
+
+class AttributeFacets:
+    """
+    Attribute filtering for catalog product lists
+
+    Filters are answered from the attribute document on Product
+    (see AttributeDocuments), so every condition applies to the product row
+    itself: no join on ProductAttribute, no multiplied rows and no DISTINCT.
+    Exact values become one JSON containment test, which the GIN index on
+    attribute_data serves on PostgreSQL; ranges compare the numeric copy of
+    the value. The filtered attributes are resolved by slug in one query.
+    """
+
+    @staticmethod
+    def parse_filters(params):
+        """
+        Collect attribute filters from GET parameters
+
+        Returns:
+            Dict slug -> {'value': ..., 'min': ..., 'max': ...} (only the keys given)
+        """
+        filters = {}
+        for key, value in params.items():
+            if not value:
+                continue
+            for prefix, kind in FILTER_PREFIXES:
+                if key.startswith(prefix):
+                    filters.setdefault(key[len(prefix):], {})[kind] = value
+                    break
+        return filters
+
+    @staticmethod
+    def _number(value):
+        try:
+            return Decimal(value)
+        except (InvalidOperation, TypeError):
+            return None
+
+    @staticmethod
+    def _value_condition(slug, value):
+        """Product condition for an exact attribute value"""
+        if connection.features.supports_json_field_contains:
+            return Q(attribute_data__contains={slug: {'value': value}})
+        # Backends without JSON containment compare the extracted value
+        return Q(**{f'attribute_data__{slug}__value': value})
+
+    @staticmethod
+    def attribute_condition(attribute, spec):
+        """
+        Build the Product condition for one attribute filter
+
+        Returns None if the filter has no usable value (bad numbers are ignored,
+        as they always were).
+        """
+        condition = Q()
+        if attribute.attr_type in ('text', 'choice'):
+            if 'value' in spec:
+                condition &= AttributeFacets._value_condition(attribute.slug, spec['value'])
+        elif attribute.attr_type == 'boolean':
+            if 'value' in spec:
+                condition &= AttributeFacets._value_condition(attribute.slug, spec['value'].lower() in TRUE_VALUES)
+
+        # Exact numbers for number attributes; ranges for any attribute with numeric values
+        if attribute.attr_type == 'number' and 'value' in spec:
+            number = AttributeFacets._number(spec['value'])
+            if number is not None:
+                condition &= AttributeFacets._value_condition(attribute.slug, float(number))
+        for kind, lookup in (('min', 'gte'), ('max', 'lte')):
+            if kind in spec:
+                number = AttributeFacets._number(spec[kind])
+                if number is not None:
+                    condition &= Q(**{f'attribute_data__{attribute.slug}__number__{lookup}': float(number)})
+
+        return condition or None
+
+    @staticmethod
+    def conditions(params):
+        """Resolve the attribute filters in params into Product conditions"""
+        filters = AttributeFacets.parse_filters(params)
+        if not filters:
+            return []
+
+        attributes = Attribute.objects.filter(slug__in=list(filters))
+        conditions = []
+        for attribute in attributes:
+            condition = AttributeFacets.attribute_condition(attribute, filters[attribute.slug])
+            if condition is not None:
+                conditions.append(condition)
+        return conditions
+
+    @staticmethod
+    def apply(queryset, params):
+        """
+        Narrow a Product queryset with the attribute filters in params
+
+        Unknown attribute slugs are ignored.
+        """
+        for condition in AttributeFacets.conditions(params):
+            queryset = queryset.filter(condition)
+        return queryset
@@ -1,9 +1,13 @@
 # catalog/signals.py
-from django.db.models.signals import pre_save, post_save, m2m_changed
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils.text import slugify
+from SSBModel.caching import collect_on_commit
 
-from .models import Category, Product, ProductTemplate
+from .models import Category, Product, ProductTemplate, Attribute, ProductAttribute
+from .services.facet_counts import FACET_CACHE
+from .services.attribute_documents import AttributeDocuments
+from .services.category_tree import CATEGORY_TREE_CACHE
 
 @receiver(pre_save, sender=Category)
 def category_pre_save(sender, instance, **kwargs):
@@ -59,4 +63,47 @@ def product_post_save(sender, instance, created, **kwargs):
             elif attr.attr_type == 'boolean':
                 pass  # Use default null value
                 
-            instance.attributes.create(**kwargs)
\ No newline at end of file
+            instance.attributes.create(**kwargs)
+
+# Keep Product.attribute_data in step with the ProductAttribute rows. Changed
+# products are collected per transaction and refreshed in one batch on commit,
+# so a bulk delete (e.g. the cascade from an Attribute) costs one rebuild
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def product_attribute_changed(sender, instance, **kwargs):
+    collect_on_commit(AttributeDocuments.refresh, [instance.product_id])
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """A save writes back the instance's in-memory document, which may be stale"""
+    collect_on_commit(AttributeDocuments.refresh, [instance.pk])
+
+@receiver(post_save, sender=Attribute)
+def attribute_changed(sender, instance, created, **kwargs):
+    """Names, units and types are copied into the documents"""
+    if not created:
+        collect_on_commit(AttributeDocuments.refresh_attributes, [instance.pk])
+
+# Signals to invalidate the cached facet counts on any change to what they count
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Attribute)
+@receiver(post_save, sender=ProductAttribute)
+def facet_source_saved(sender, instance, **kwargs):
+    FACET_CACHE.invalidate_on_commit()
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Attribute)
+@receiver(post_delete, sender=ProductAttribute)
+def facet_source_deleted(sender, instance, **kwargs):
+    FACET_CACHE.invalidate_on_commit()
+
+# Signals to invalidate the cached category sidebar on changes to the tree or its counts
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Product)
+def category_tree_source_saved(sender, instance, **kwargs):
+    CATEGORY_TREE_CACHE.invalidate_on_commit()
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Product)
+def category_tree_source_deleted(sender, instance, **kwargs):
+    CATEGORY_TREE_CACHE.invalidate_on_commit()
@@ -1,7 +1,7 @@
 # catalog/templatetags/catalog_tags.py
 from django import template
 from django.utils.safestring import mark_safe
-from catalog.models import Category, Product
+from catalog.services.category_tree import CategoryTreeCache
 
 register = template.Library()
 
@@ -33,51 +33,8 @@ def product_attribute(product, attribute_slug, default=''):
 
 @register.simple_tag
 def category_tree(categories=None, current_category=None):
-    """Render category tree with proper indentation"""
-    if categories is None:
-        categories = Category.objects.filter(parent=None)
-    
-    result = '<ul class="list-unstyled">'
-    
-    for category in categories:
-        active = ''
-        if current_category and (current_category.id == category.id or 
-                                current_category.is_descendant_of(category)):
-            active = 'fw-bold'
-        
-        result += f'<li class="{active}">'
-        result += f'<a href="/catalog/category/{category.slug}/" class="text-decoration-none">{category.name}</a>'
-        
-        # Add count of products
-        product_count = Product.objects.filter(category=category).count()
-        if product_count:
-            result += f' <span class="badge bg-secondary">{product_count}</span>'
-        
-        # Render children
-        children = category.get_children()
-        if children:
-            result += '<ul class="list-unstyled ms-3 mt-1 mb-2">'
-            for child in children:
-                child_active = ''
-                if current_category and (current_category.id == child.id or 
-                                        current_category.is_descendant_of(child)):
-                    child_active = 'fw-bold'
-                
-                result += f'<li class="{child_active}">'
-                result += f'<a href="/catalog/category/{child.slug}/" class="text-decoration-none">{child.name}</a>'
-                
-                # Add count of products for child
-                child_count = Product.objects.filter(category=child).count()
-                if child_count:
-                    result += f' <span class="badge bg-secondary">{child_count}</span>'
-                
-                result += '</li>'
-            result += '</ul>'
-        
-        result += '</li>'
-    
-    result += '</ul>'
-    return mark_safe(result)
+    """Render the category sidebar with cumulative product counts (cached, see CategoryTreeCache)"""
+    return mark_safe(CategoryTreeCache.render(current_category=current_category, roots=categories))
 
 @register.simple_tag
 def breadcrumbs(category=None, product=None):
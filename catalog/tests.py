@@ -1,3 +1,271 @@
-from django.test import TestCase
+import re
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from .models import Category, Attribute, Product, ProductAttribute
+from .services.attribute_documents import AttributeDocuments
+from .services.category_tree import CategoryTreeCache
+from .services.facet_counts import FacetCounts
+from .services.facets import AttributeFacets
+
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class CatalogTestCase(TestCase):
+    """Bearings with a material, a diameter and a sealed flag"""
+
+    def setUp(self):
+        # Attribute documents are refreshed, and catalog caches dropped, once the
+        # transaction commits; running the callbacks here also keeps later
+        # changes from joining a batch the test transaction never commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Bearings', slug='bearings')
+            self.material = Attribute.objects.create(name='Material', slug='material', attr_type='choice')
+            self.diameter = Attribute.objects.create(name='Diameter', slug='diameter', attr_type='number', unit='mm')
+            self.sealed = Attribute.objects.create(name='Sealed', slug='sealed', attr_type='boolean')
+
+            self.steel_20 = self.make_product('B-1', material='Steel', diameter=20, sealed=True)
+            self.steel_35 = self.make_product('B-2', material='Steel', diameter=35, sealed=False)
+            self.ceramic_20 = self.make_product('B-3', material='Ceramic', diameter=20)
+
+    def make_product(self, sku, material=None, diameter=None, sealed=None):
+        product = Product.objects.create(
+            sku=sku, name=f'Bearing {sku}', description='', category=self.category, price=Decimal('9.99')
+        )
+        if material is not None:
+            ProductAttribute.objects.create(product=product, attribute=self.material, value_text=material)
+        if diameter is not None:
+            ProductAttribute.objects.create(product=product, attribute=self.diameter, value_number=diameter)
+        if sealed is not None:
+            ProductAttribute.objects.create(product=product, attribute=self.sealed, value_boolean=sealed)
+        return product
+
+    def document(self, product):
+        return Product.objects.get(pk=product.pk).attribute_data
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class AttributeDocumentTests(CatalogTestCase):
+    """Product.attribute_data follows the ProductAttribute rows"""
+
+    def test_documents_are_typed_copies_of_the_values(self):
+        self.assertEqual(self.document(self.steel_20), {
+            'material': {'name': 'Material', 'unit': '', 'type': 'choice', 'value': 'Steel'},
+            'diameter': {'name': 'Diameter', 'unit': 'mm', 'type': 'number', 'value': 20.0, 'number': 20.0},
+            'sealed': {'name': 'Sealed', 'unit': '', 'type': 'boolean', 'value': True},
+        })
+
+    def test_changed_and_deleted_values_are_synced_on_commit(self):
+        value = ProductAttribute.objects.get(product=self.steel_20, attribute=self.diameter)
+        with self.captureOnCommitCallbacks(execute=True):
+            value.value_number = 25
+            value.save()
+            ProductAttribute.objects.filter(product=self.steel_20, attribute=self.sealed).delete()
+
+        document = self.document(self.steel_20)
+        self.assertEqual(document['diameter']['number'], 25.0)
+        self.assertNotIn('sealed', document)
+
+    def test_changes_in_one_transaction_refresh_once(self):
+        with mock.patch.object(AttributeDocuments, 'refresh', wraps=AttributeDocuments.refresh) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                ProductAttribute.objects.filter(attribute=self.material).delete()
+
+        refresh.assert_called_once()
+        self.assertEqual(set(refresh.call_args[0][0]), {self.steel_20.pk, self.steel_35.pk, self.ceramic_20.pk})
+        self.assertNotIn('material', self.document(self.ceramic_20))
+
+    def test_deleting_an_attribute_removes_it_from_every_document(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.diameter.delete()
+
+        for product in (self.steel_20, self.steel_35, self.ceramic_20):
+            self.assertNotIn('diameter', self.document(product))
+
+    def test_renaming_an_attribute_updates_the_documents(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.diameter.name = 'Bore'
+            self.diameter.save()
+
+        self.assertEqual(self.document(self.steel_35)['diameter']['name'], 'Bore')
+
+    def test_saving_a_stale_product_keeps_the_document(self):
+        stale = Product.objects.get(pk=self.steel_20.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductAttribute.objects.filter(product=self.steel_20, attribute=self.material).update(value_text='Brass')
+            AttributeDocuments.refresh([self.steel_20.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stale.name = 'Renamed'
+            stale.save()
+
+        self.assertEqual(self.document(self.steel_20)['material']['value'], 'Brass')
+
+    def test_rebuild_all_matches_the_rows(self):
+        Product.objects.update(attribute_data={})
+
+        written = AttributeDocuments.rebuild_all(batch_size=2)
+
+        self.assertEqual(written, 3)
+        self.assertEqual(self.document(self.ceramic_20)['material']['value'], 'Ceramic')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class AttributeFacetFilterTests(CatalogTestCase):
+    """Attribute filters from GET parameters narrow the product list"""
+
+    def filtered(self, **params):
+        return set(AttributeFacets.apply(Product.objects.all(), params).values_list('sku', flat=True))
+
+    def test_parse_filters_groups_parameters_by_slug(self):
+        self.assertEqual(
+            AttributeFacets.parse_filters({'attr_material': 'Steel', 'min_attr_diameter': '10',
+                                           'max_attr_diameter': '30', 'attr_sealed': '', 'page': '2'}),
+            {'material': {'value': 'Steel'}, 'diameter': {'min': '10', 'max': '30'}}
+        )
+
+    def test_choice_value(self):
+        self.assertEqual(self.filtered(attr_material='Steel'), {'B-1', 'B-2'})
+
+    def test_boolean_value(self):
+        self.assertEqual(self.filtered(attr_sealed='true'), {'B-1'})
+        self.assertEqual(self.filtered(attr_sealed='no'), {'B-2'})
+
+    def test_exact_number(self):
+        self.assertEqual(self.filtered(attr_diameter='20'), {'B-1', 'B-3'})
+
+    def test_number_range(self):
+        self.assertEqual(self.filtered(min_attr_diameter='21'), {'B-2'})
+        self.assertEqual(self.filtered(max_attr_diameter='20'), {'B-1', 'B-3'})
+        self.assertEqual(self.filtered(min_attr_diameter='10', max_attr_diameter='40'), {'B-1', 'B-2', 'B-3'})
+
+    def test_filters_combine(self):
+        self.assertEqual(self.filtered(attr_material='Steel', max_attr_diameter='20'), {'B-1'})
+
+    def test_unknown_slugs_and_bad_numbers_are_ignored(self):
+        self.assertEqual(self.filtered(attr_colour='Red', min_attr_diameter='wide'), {'B-1', 'B-2', 'B-3'})
+
+    def test_filters_resolve_attributes_in_one_query(self):
+        with self.assertNumQueries(1):
+            conditions = AttributeFacets.conditions({'attr_material': 'Steel', 'min_attr_diameter': '10'})
+        self.assertEqual(len(conditions), 2)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class FacetCountTests(CatalogTestCase):
+    """Value counts and ranges of the attributes in a product list"""
+
+    def facets(self, queryset=None, **kwargs):
+        queryset = Product.objects.all() if queryset is None else queryset
+        return {facet['slug']: facet for facet in FacetCounts.build(queryset, **kwargs)}
+
+    def test_counts_values_and_ranges(self):
+        with self.assertNumQueries(1):
+            facets = FacetCounts.build(Product.objects.all())
+
+        self.assertEqual([facet['slug'] for facet in facets], ['diameter', 'material', 'sealed'])
+        diameter, material, sealed = facets
+        self.assertEqual(material['values'], [('Steel', 2), ('Ceramic', 1)])
+        self.assertEqual(material['product_count'], 3)
+        self.assertEqual(sealed['values'], [(False, 1), (True, 1)])
+        self.assertEqual(diameter['values'], [])
+        self.assertEqual((diameter['min'], diameter['max']), (20, 35))
+
+    def test_counts_follow_the_filters(self):
+        queryset = AttributeFacets.apply(Product.objects.all(), {'attr_material': 'Steel'})
+
+        facets = self.facets(queryset, min_products=1)
+
+        self.assertEqual(facets['material']['values'], [('Steel', 2)])
+        self.assertEqual((facets['diameter']['min'], facets['diameter']['max']), (20, 35))
+
+    def test_rare_attributes_are_left_out(self):
+        self.assertNotIn('sealed', self.facets(min_products=3))
+        self.assertIn('sealed', self.facets(min_products=2))
+
+    def test_as_json(self):
+        facets = FacetCounts.as_json(FacetCounts.build(Product.objects.all()))
+
+        self.assertEqual(facets['sealed']['values'], {'false': 1, 'true': 1})
+        self.assertEqual((facets['diameter']['min'], facets['diameter']['max']), (20.0, 35.0))
+
+    def test_results_are_cached_until_the_catalog_changes(self):
+        queryset = Product.objects.all()
+        FacetCounts.get(queryset)
+        with self.assertNumQueries(0):
+            facets = FacetCounts.get(queryset)
+        self.assertEqual(facets[1]['values'], [('Steel', 2), ('Ceramic', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_product('B-4', material='Ceramic')
+
+        facets = FacetCounts.get(queryset)
+        self.assertEqual(facets[1]['values'], [('Ceramic', 2), ('Steel', 2)])
+
+    def test_cached_results_are_per_filter(self):
+        steel = AttributeFacets.apply(Product.objects.all(), {'attr_material': 'Steel'})
+        ceramic = AttributeFacets.apply(Product.objects.all(), {'attr_material': 'Ceramic'})
+
+        self.assertNotEqual(FacetCounts.signature(steel), FacetCounts.signature(ceramic))
+        FacetCounts.get(steel)
+        self.assertEqual([facet['slug'] for facet in FacetCounts.get(ceramic)], [])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CategoryTreeCacheTests(TestCase):
+    """The sidebar carries cumulative product counts and is dropped on catalog changes"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tools = Category.objects.create(name='Tools', slug='tools')
+            self.drills = Category.objects.create(name='Drills', slug='drills', parent=self.tools)
+            self.bits = Category.objects.create(name='Bits', slug='bits', parent=self.drills)
+            self.fasteners = Category.objects.create(name='Fasteners', slug='fasteners')
+            for sku, category in [('T-1', self.tools), ('D-1', self.drills), ('D-2', self.drills), ('B-1', self.bits)]:
+                self.make_product(sku, category)
+
+    def make_product(self, sku, category):
+        return Product.objects.create(sku=sku, name=sku, description='', category=category, price=Decimal('1.00'))
+
+    def test_counts_include_every_descendant(self):
+        with self.assertNumQueries(1):
+            tree = CategoryTreeCache.build()
+
+        self.assertEqual([(root.name, root.product_count) for root in tree], [('Tools', 4), ('Fasteners', 0)])
+        self.assertEqual([(child.name, child.product_count) for child in tree[0].child_nodes], [('Drills', 3)])
+
+    def test_build_from_given_roots(self):
+        tree = CategoryTreeCache.build(roots=[self.drills])
+
+        self.assertEqual([(root.name, root.product_count) for root in tree], [('Drills', 3)])
+        self.assertEqual([child.name for child in tree[0].child_nodes], ['Bits'])
+
+    def test_active_branch_is_marked(self):
+        html = CategoryTreeCache.render(current_category=self.drills)
+
+        self.assertEqual(re.findall(r'<li class="fw-bold">\s*<a [^>]*>([^<]+)</a>', html), ['Tools', 'Drills'])
+        self.assertIn('Fasteners', html)
+
+    def test_rendered_sidebar_is_cached_until_a_product_changes(self):
+        before = CategoryTreeCache.render()
+        with self.assertNumQueries(0):
+            self.assertEqual(CategoryTreeCache.render(), before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_product('F-1', self.fasteners)
+
+        after = CategoryTreeCache.render()
+        self.assertNotEqual(after, before)
+        self.assertRegex(after, r'Fasteners</a>\s*<span class="badge bg-secondary">1</span>')
+
+    def test_category_changes_replace_the_sidebar(self):
+        CategoryTreeCache.render()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fasteners.name = 'Fixings'
+            self.fasteners.save()
+
+        self.assertIn('Fixings', CategoryTreeCache.render())
 
-# Create your tests here.
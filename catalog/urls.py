@@ -9,6 +9,7 @@ urlpatterns = [
     path('category/<slug:slug>/', views.CategoryDetailView.as_view(), name='category-detail'),
     path('product/<str:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
     path('products/', views.ProductListView.as_view(), name='product-list'),
+    path('products/facets/', views.product_facets, name='product-facets'),
     
     # Equipment integration
     path('equipment/<int:equipment_id>/parts/', manage_equipment_parts, name='manage-equipment-parts'),
@@ -1,5 +1,6 @@
 # catalog/views.py
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse
 from django.views.generic import ListView, DetailView
 from django.db.models import Q, Count, Prefetch
 from django.contrib.auth.decorators import login_required
@@ -9,6 +10,8 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 from .models import Category, Product, Attribute, ProductTemplate, TemplateAttribute
 from .forms import ProductFilterForm
+from .services.facets import AttributeFacets
+from .services.facet_counts import FacetCounts
 from users.decorators import can_add_parts, can_edit_parts, can_delete_parts
 
 def catalog_home(request):
@@ -80,83 +83,18 @@ class CategoryDetailView(DetailView):
             if sort_param:
                 products = products.order_by(sort_param)
             
-            # Attribute filters - this gets complex
-            for key, value in self.request.GET.items():
-                if key.startswith('attr_') and value:
-                    attr_slug = key.replace('attr_', '')
-                    try:
-                        attr = Attribute.objects.get(slug=attr_slug)
-                        
-                        # Filter based on attribute type
-                        if attr.attr_type == 'text' or attr.attr_type == 'choice':
-                            products = products.filter(
-                                attributes__attribute=attr,
-                                attributes__value_text=value
-                            )
-                        elif attr.attr_type == 'number':
-                            try:
-                                value_float = float(value)
-                                products = products.filter(
-                                    attributes__attribute=attr,
-                                    attributes__value_number=value_float
-                                )
-                            except ValueError:
-                                pass
-                        elif attr.attr_type == 'boolean':
-                            bool_value = value.lower() in ('true', 'yes', '1')
-                            products = products.filter(
-                                attributes__attribute=attr,
-                                attributes__value_boolean=bool_value
-                            )
-                    except Attribute.DoesNotExist:
-                        pass
-                        
-                # Handle min/max range for numeric attributes
-                elif key.startswith('min_attr_') and value:
-                    attr_slug = key.replace('min_attr_', '')
-                    try:
-                        attr = Attribute.objects.get(slug=attr_slug)
-                        value_float = float(value)
-                        products = products.filter(
-                            attributes__attribute=attr,
-                            attributes__value_number__gte=value_float
-                        )
-                    except (Attribute.DoesNotExist, ValueError):
-                        pass
-                        
-                elif key.startswith('max_attr_') and value:
-                    attr_slug = key.replace('max_attr_', '')
-                    try:
-                        attr = Attribute.objects.get(slug=attr_slug)
-                        value_float = float(value)
-                        products = products.filter(
-                            attributes__attribute=attr,
-                            attributes__value_number__lte=value_float
-                        )
-                    except (Attribute.DoesNotExist, ValueError):
-                        pass
+            # Attribute filters: one grouped subquery for all of them
+            products = AttributeFacets.apply(products, self.request.GET)
         
         # Always prefetch related data for performance
         products = products.prefetch_related(
-            'images', 'attributes__attribute', 'category'
-        ).distinct()
+            'images', 'category'
+        )
         
         context['products'] = products
         
-        # Get all attributes used by products in this category for filters
-        product_ids = products.values_list('id', flat=True)
-        attr_ids = set()
-        
-        from django.db.models import Count
-        used_attributes = Attribute.objects.filter(
-            productattribute__product__in=product_ids
-        ).annotate(
-            product_count=Count('productattribute__product', distinct=True)
-        ).filter(
-            product_count__gt=1  # Only include attributes used by multiple products
-        ).order_by('name')
-        
-        context['filter_attributes'] = used_attributes
+        # Attribute value counts for the sidebar, from one cached aggregation
+        context['filter_attributes'] = FacetCounts.get(products)
         
         return context
 
@@ -184,7 +122,6 @@ class ProductDetailView(DetailView):
         """Prefetch related data for performance"""
         return super().get_queryset().prefetch_related(
             'images', 
-            'attributes__attribute', 
             'related_equipment',
             Prefetch('category', queryset=Category.objects.select_related('parent'))
         )
@@ -258,61 +195,8 @@ class ProductListView(ListView):
         if self.request.GET.get('in_stock'):
             queryset = queryset.filter(stock__gt=0)
         
-        # Attribute filters - handle dynamically
-        for key, value in self.request.GET.items():
-            if key.startswith('attr_') and value:
-                attr_slug = key.replace('attr_', '')
-                try:
-                    attr = Attribute.objects.get(slug=attr_slug)
-                    
-                    # Filter based on attribute type
-                    if attr.attr_type == 'text' or attr.attr_type == 'choice':
-                        queryset = queryset.filter(
-                            attributes__attribute=attr,
-                            attributes__value_text=value
-                        )
-                    elif attr.attr_type == 'number':
-                        try:
-                            value_float = float(value)
-                            queryset = queryset.filter(
-                                attributes__attribute=attr,
-                                attributes__value_number=value_float
-                            )
-                        except ValueError:
-                            pass
-                    elif attr.attr_type == 'boolean':
-                        bool_value = value.lower() in ('true', 'yes', '1')
-                        queryset = queryset.filter(
-                            attributes__attribute=attr,
-                            attributes__value_boolean=bool_value
-                        )
-                except Attribute.DoesNotExist:
-                    pass
-                    
-            # Handle min/max range for numeric attributes
-            elif key.startswith('min_attr_') and value:
-                attr_slug = key.replace('min_attr_', '')
-                try:
-                    attr = Attribute.objects.get(slug=attr_slug)
-                    value_float = float(value)
-                    queryset = queryset.filter(
-                        attributes__attribute=attr,
-                        attributes__value_number__gte=value_float
-                    )
-                except (Attribute.DoesNotExist, ValueError):
-                    pass
-                    
-            elif key.startswith('max_attr_') and value:
-                attr_slug = key.replace('max_attr_', '')
-                try:
-                    attr = Attribute.objects.get(slug=attr_slug)
-                    value_float = float(value)
-                    queryset = queryset.filter(
-                        attributes__attribute=attr,
-                        attributes__value_number__lte=value_float
-                    )
-                except (Attribute.DoesNotExist, ValueError):
-                    pass
+        # Attribute filters: one grouped subquery for all of them
+        queryset = AttributeFacets.apply(queryset, self.request.GET)
         
         # Sort options
         sort_param = self.request.GET.get('sort')
@@ -324,31 +208,26 @@ class ProductListView(ListView):
         
         # Always prefetch related data for performance
         return queryset.prefetch_related(
-            'images', 'attributes__attribute', 'category'
-        ).distinct()
+            'images', 'category'
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = Category.objects.all()
         context['templates'] = ProductTemplate.objects.all()
         
-        # Get filterable attributes for the current product set
-        product_ids = self.get_queryset().values_list('id', flat=True)
-        
-        # Find attributes that appear in multiple products
-        from django.db.models import Count
-        used_attributes = Attribute.objects.filter(
-            productattribute__product__in=product_ids
-        ).annotate(
-            product_count=Count('productattribute__product', distinct=True)
-        ).filter(
-            product_count__gt=1  # Only include attributes used by multiple products
-        ).order_by('name')
-        
-        context['filter_attributes'] = used_attributes
+        # Attribute value counts for the current product set; the filtered
+        # queryset is reused as a subquery instead of being built again
+        context['filter_attributes'] = FacetCounts.get(self.object_list)
         
         return context
 
+def product_facets(request):
+    """Attribute value counts and numeric ranges for the product list filters, as JSON"""
+    view = ProductListView()
+    view.setup(request)
+    return JsonResponse(FacetCounts.as_json(FacetCounts.get(view.get_queryset())))
+
 # Admin views for template management
 @login_required
 @can_add_parts
@@ -1,37 +1,49 @@
 # equipment/api_views.py
 
 import json
+from django.db.models import Count
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
-from .models import Equipment, EquipmentCategory
+from .models import Equipment, EquipmentCategory, EquipmentMoveError, SIBLING_ORDER
+from .services.equipment_search import EquipmentSearch, DEFAULT_PAGE_SIZE
 from users.decorators import can_edit_parts
 from users.models import UserActivity
 
+def _tree_nodes(queryset):
+    """
+    Format equipment rows as jstree nodes
+
+    Child counts come from a single aggregated query annotation, so the
+    number of queries does not depend on the number of nodes.
+    """
+    rows = queryset.annotate(
+        child_count=Count('children')
+    ).values(
+        'id', 'code', 'full_code', 'name', 'level', 'status', 'fabricant', 'child_count'
+    ).order_by(*SIBLING_ORDER)
+    
+    return [{
+        'id': f'equipment_{row["id"]}',
+        'text': f'{row["name"]} <span class="equipment-code">{row["code"]}</span>',
+        'type': row['status'],  # Use status as the node type
+        'children': row['child_count'] > 0,
+        'data': {
+            'status': row['status'],
+            'level': row['level'],
+            'code': row['code'],
+            'full_code': row['full_code'],
+            'fabricant': row['fabricant'],
+            'child_count': row['child_count']
+        }
+    } for row in rows]
+
 @login_required
 def get_equipment_tree_data(request):
     """API endpoint for getting the root level equipment data for the tree view"""
     try:
         # Get top-level equipment (no parent)
-        root_equipment = Equipment.objects.filter(parent__isnull=True).order_by('position', 'name')
-        
-        # Format data for jstree
-        tree_data = []
-        for item in root_equipment:
-            # Check if this item has children
-            has_children = Equipment.objects.filter(parent=item).exists()
-            
-            tree_data.append({
-                'id': f'equipment_{item.id}',
-                'text': f'{item.name} <span class="equipment-code">{item.code}</span>',
-                'type': item.status,  # Use status as the node type
-                'children': has_children,
-                'data': {
-                    'status': item.status,
-                    'category': str(item.category.id) if item.category else '',
-                    'location': item.location or ''
-                }
-            })
+        tree_data = _tree_nodes(Equipment.objects.filter(parent__isnull=True))
         
         return JsonResponse(tree_data, safe=False)
     except Exception as e:
@@ -45,30 +57,14 @@ def get_equipment_children(request):
         
         if not node_id:
             return JsonResponse({'error': 'No node ID provided'}, status=400)
+        if not node_id.isdigit():
+            return JsonResponse({'error': 'Invalid node ID'}, status=400)
         
-        # Get the parent equipment
-        parent = Equipment.objects.get(id=node_id)
-        
-        # Get children of this equipment
-        children = Equipment.objects.filter(parent=parent).order_by('position', 'name')
+        # Make sure the parent exists so a bad ID is reported rather than returning nothing
+        if not Equipment.objects.filter(id=node_id).exists():
+            raise Equipment.DoesNotExist
         
-        # Format data for jstree
-        children_data = []
-        for item in children:
-            # Check if this item has its own children
-            has_children = Equipment.objects.filter(parent=item).exists()
-            
-            children_data.append({
-                'id': f'equipment_{item.id}',
-                'text': f'{item.name} <span class="equipment-code">{item.code}</span>',
-                'type': item.status,  # Use status as the node type
-                'children': has_children,
-                'data': {
-                    'status': item.status,
-                    'category': str(item.category.id) if item.category else '',
-                    'location': item.location or ''
-                }
-            })
+        children_data = _tree_nodes(Equipment.objects.filter(parent_id=node_id))
         
         return JsonResponse(children_data, safe=False)
     except Equipment.DoesNotExist:
@@ -76,6 +72,33 @@ def get_equipment_children(request):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@login_required
+def search_equipment(request):
+    """
+    API endpoint for paged equipment search
+    
+    Accepts 'q' (name/fabricant text or code prefix), 'code' (exact full_code
+    prefix), 'status', 'page' and 'page_size'. Each result carries its ancestor
+    path so the tree can open down to it without loading the whole hierarchy.
+    """
+    status = request.GET.get('status', '').strip()
+    if status and status not in dict(Equipment._meta.get_field('status').choices):
+        return JsonResponse({'error': 'Invalid status parameter'}, status=400)
+    
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid page parameter'}, status=400)
+    
+    return JsonResponse(EquipmentSearch.search_nodes(
+        term=request.GET.get('q', '').strip(),
+        code=request.GET.get('code', '').strip(),
+        status=status,
+        page=page,
+        page_size=page_size
+    ))
+
 @login_required
 @can_edit_parts
 @require_POST
@@ -86,33 +109,20 @@ def update_equipment_position(request):
         data = json.loads(request.body)
         equipment_id = data.get('id')
         parent_id = data.get('parent_id')
-        position = data.get('position', 0)
+        position = int(data.get('position', 0))
         
         # Get the equipment to update
         equipment = Equipment.objects.get(id=equipment_id)
+        parent = Equipment.objects.get(id=parent_id) if parent_id else None
         
-        # Update parent if provided
-        if parent_id:
-            # Check that we're not creating a circular reference
-            parent = Equipment.objects.get(id=parent_id)
-            
-            # Check that parent is not a descendant of this equipment
-            current_parent = parent
-            while current_parent:
-                if current_parent.id == equipment.id:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': 'Cannot set a descendant as parent (circular reference)'
-                    }, status=400)
-                current_parent = current_parent.parent
-                
-            equipment.parent = parent
-        else:
-            equipment.parent = None
-        
-        # Update position
-        equipment.position = position
-        equipment.save()
+        # Re-parent and re-level the whole subtree in one transaction
+        try:
+            equipment.move_to(parent, index=position)
+        except EquipmentMoveError:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Cannot set a descendant as parent (circular reference)'
+            }, status=400)
         
         # Log the activity
         UserActivity.objects.create(
@@ -53,4 +53,9 @@ class EquipmentCSVImportForm(forms.Form):
         required=False,
         initial=False,
         help_text='WARNING: Clear all existing equipment before import'
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=False,
+        help_text='Only report what would be created, updated or rejected; nothing is saved'
     )
\ No newline at end of file
@@ -1,85 +1,84 @@
-# Save this as equipment/management/commands/diagnose_equipment.py
+# equipment/management/commands/diagnose_equipment.py
+import time
 from django.core.management.base import BaseCommand
-from equipment.models import Equipment, EquipmentCategory
-import json
+from equipment.models import EquipmentCategory
+from equipment.services.integrity import EquipmentIntegrityScanner
 
 class Command(BaseCommand):
-    help = 'Diagnose equipment hierarchy data'
+    help = 'Check the equipment hierarchy for cycles, orphans, stale levels/codes and duplicate positions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Repair the issues found with bulk updates')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows written per bulk update')
+        parser.add_argument('--limit', type=int, default=10,
+                            help='Number of examples listed per issue type')
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting equipment hierarchy diagnosis'))
-        
-        # Check if there are any equipment items
-        equipment_count = Equipment.objects.count()
-        self.stdout.write(f'Total equipment items: {equipment_count}')
-        
-        if equipment_count == 0:
+        started = time.monotonic()
+
+        scanner = EquipmentIntegrityScanner(batch_size=options['batch_size']).scan()
+        self.limit = options['limit']
+
+        self.stdout.write(f'Total equipment items: {len(scanner.rows)}')
+        if not scanner.rows:
             self.stdout.write(self.style.WARNING('No equipment found in the database.'))
             return
-        
-        # Check categories
-        category_count = EquipmentCategory.objects.count()
-        self.stdout.write(f'Total equipment categories: {category_count}')
-        
-        # Check parent-child relationships
-        root_equipment = Equipment.objects.filter(parent__isnull=True).count()
-        self.stdout.write(f'Root equipment (no parent): {root_equipment}')
-        
-        # Check for circular references
-        self.stdout.write('Checking for circular references...')
-        circular_refs = self._check_circular_references()
-        if circular_refs:
-            self.stdout.write(self.style.ERROR(f'Found {len(circular_refs)} circular references:'))
-            for item_id, path in circular_refs:
-                self.stdout.write(self.style.ERROR(f'  - Equipment ID {item_id}: {" -> ".join(path)}'))
+
+        self.stdout.write(f'Total equipment categories: {EquipmentCategory.objects.count()}')
+        roots = sum(1 for parent_id in scanner.parents.values() if parent_id is None)
+        self.stdout.write(f'Root equipment (no parent): {roots}')
+
+        self._report('Circular references', [
+            f'{" -> ".join(str(item_id) for item_id in cycle + cycle[:1])} (ID {cycle[0]} becomes top-level)'
+            for cycle in scanner.cycles
+        ])
+        self._report('Orphans (missing parent)', [
+            f'ID {item_id}: parent {scanner.parents[item_id]} does not exist'
+            for item_id in scanner.orphans
+        ])
+        self._report('Level mismatches', [
+            f'ID {item_id}: level {stored}, depth {expected}'
+            for item_id, stored, expected in scanner.level_mismatches
+        ])
+        self._report('Stale full codes', [
+            f'ID {item_id}: {stored!r} should be {expected!r}'
+            for item_id, stored, expected in scanner.stale_full_codes
+        ])
+        self._report('Full codes too long to store (not fixable)', [
+            f'ID {item_id}: {expected!r}'
+            for item_id, expected in scanner.overlong_full_codes
+        ])
+        self._report('Duplicate sibling positions', [
+            f'Parent {parent_id or "(top level)"}, position {position}: IDs {", ".join(map(str, ids))}'
+            for parent_id, position, ids in scanner.duplicate_positions
+        ])
+        self._report('Unreachable items', [f'ID {item_id}' for item_id in scanner.unreachable])
+
+        self.stdout.write(f'Scan finished in {time.monotonic() - started:.1f}s')
+
+        if scanner.issue_count == 0:
+            self.stdout.write(self.style.SUCCESS('No issues found.'))
+        elif options['fix']:
+            updated = scanner.fix()
+            self.stdout.write(self.style.SUCCESS(f'Repaired: {updated} equipment items updated'))
         else:
-            self.stdout.write(self.style.SUCCESS('No circular references found.'))
-        
-        # Sample of equipment tree data format
-        self.stdout.write('\nSample of equipment tree data format:')
-        tree_sample = self._get_tree_sample()
-        self.stdout.write(json.dumps(tree_sample, indent=2))
-        
+            self.stdout.write(self.style.WARNING(
+                f'{len(scanner.changes)} items need repair; run with --fix to apply'
+            ))
+
         self.stdout.write(self.style.SUCCESS('Diagnosis complete'))
-    
-    def _check_circular_references(self):
-        """Check for circular references in the equipment hierarchy"""
-        circular_refs = []
-        for equipment in Equipment.objects.all():
-            visited = {}
-            path = []
-            current = equipment
-            
-            while current and current.parent:
-                path.append(f"{current.id}:{current.name}")
-                
-                if current.parent.id in visited:
-                    # Circular reference found
-                    circular_refs.append((current.id, path))
-                    break
-                
-                visited[current.id] = True
-                current = current.parent
-        
-        return circular_refs
-    
-    def _get_tree_sample(self):
-        """Get a sample of the equipment tree data format"""
-        equipment_items = Equipment.objects.all()[:10]  # Get first 10 items
-        
-        tree_data = []
-        for item in equipment_items:
-            node = {
-                'id': f'equipment_{item.id}',
-                'text': f'{item.name} <span class="equipment-code">{item.code}</span>',
-                'type': item.status,
-                'parent': f'equipment_{item.parent_id}' if item.parent_id else '#',
-                'data': {
-                    'status': item.status,
-                    'category': str(item.category.id) if item.category else '',
-                    'location': item.location or ''
-                }
-            }
-            tree_data.append(node)
-        
-        return tree_data
\ No newline at end of file
+
+    def _report(self, title, lines):
+        """Print an issue count and the first few examples"""
+        if not lines:
+            self.stdout.write(f'{title}: none')
+            return
+
+        self.stdout.write(self.style.ERROR(f'{title}: {len(lines)}'))
+        for line in lines[:self.limit]:
+            self.stdout.write(self.style.ERROR(f'  - {line}'))
+        if len(lines) > self.limit:
+            self.stdout.write(f'  ... and {len(lines) - self.limit} more')
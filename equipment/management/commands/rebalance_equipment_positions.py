@@ -0,0 +1,21 @@
+# equipment/management/commands/rebalance_equipment_positions.py
+from django.core.management.base import BaseCommand
+from equipment.services.ordering import EquipmentOrdering, POSITION_GAP
+
+class Command(BaseCommand):
+    help = 'Respace sibling positions of equipment groups that have run out of gaps (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help=f'Respace every sibling group {POSITION_GAP} apart, crowded or not')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows written per bulk update')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebalancing equipment positions...')
+        
+        groups, updated = EquipmentOrdering.rebalance_all(force=options['all'], batch_size=options['batch_size'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Positions rebalanced: {groups} sibling groups, {updated} equipment items updated'
+        ))
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0002_alter_equipment_options_equipment_doc_reference_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipment',
+            name='position',
+            field=models.PositiveIntegerField(default=None, help_text='Display order within same level'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['parent', 'position'], name='equipment_parent_position_idx'),
+        ),
+    ]
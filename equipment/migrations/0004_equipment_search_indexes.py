@@ -0,0 +1,65 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:10
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+TRIGRAM_INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('full_code'), name='gin_trgm_ops'),
+        name='equipment_full_code_trgm'
+    ),
+    django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'),
+        name='equipment_name_trgm'
+    ),
+    django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('fabricant'), name='gin_trgm_ops'),
+        name='equipment_fabricant_trgm'
+    ),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; other backends scan for icontains
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Equipment = apps.get_model('equipment', 'Equipment')
+    for index in TRIGRAM_INDEXES:
+        schema_editor.add_index(Equipment, index)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Equipment = apps.get_model('equipment', 'Equipment')
+    for index in TRIGRAM_INDEXES:
+        schema_editor.remove_index(Equipment, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0003_equipment_parent_position_index'),
+        # Creates the pg_trgm extension
+        ('parts', '0007_part_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['full_code'], name='equipment_full_code_like', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['status', 'full_code'], name='equipment_status_code_idx'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='equipment', index=index) for index in TRIGRAM_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+            ],
+        ),
+    ]
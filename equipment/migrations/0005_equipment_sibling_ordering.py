@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:22
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0004_equipment_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='equipment',
+            options={'ordering': ['level', 'position', 'code', 'id']},
+        ),
+    ]
@@ -18,10 +18,25 @@ class EquipmentCategory(MPTTModel):
         return self.name
 
 # equipment/models.py
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import connection, models, transaction
+from django.db.models.functions import Upper
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 from mptt.models import MPTTModel, TreeForeignKey
 
+# Guard against runaway recursion if the data ever contains a parent cycle
+MAX_TREE_DEPTH = 1000
+
+# Display order of siblings, used by every tree view, export and position calculation
+SIBLING_ORDER = ('position', 'code', 'id')
+
+class EquipmentMoveError(Exception):
+    """Raised when a move is malformed or would break the hierarchy (e.g. a cycle)"""
+    pass
+
 class Equipment(models.Model):
     """Equipment item model with hierarchical structure"""
     # Basic information
@@ -46,15 +61,27 @@ class Equipment(models.Model):
         ('maintenance', 'Under Maintenance'),
         ('decommissioned', 'Decommissioned'),
     ], default='active')
-    position = models.PositiveIntegerField(default=0, help_text="Display order within same level")
+    # Left unset (None), save() places a new item after its siblings; 0 is a real position
+    position = models.PositiveIntegerField(default=None, help_text="Display order within same level")
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        ordering = ['level', 'position', 'code']
+        ordering = ['level', *SIBLING_ORDER]
         unique_together = [['parent', 'code']]  # Prevent duplicate codes under same parent
+        indexes = [
+            # Ordered child fetches: WHERE parent_id = ... ORDER BY position
+            models.Index(fields=['parent', 'position'], name='equipment_parent_position_idx'),
+            # Search: exact full_code prefixes, status filters paged in code order, and
+            # trigram indexes on the UPPER() expressions icontains/istartswith compare on PostgreSQL
+            models.Index(fields=['full_code'], name='equipment_full_code_like', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['status', 'full_code'], name='equipment_status_code_idx'),
+            GinIndex(OpClass(Upper('full_code'), name='gin_trgm_ops'), name='equipment_full_code_trgm'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='equipment_name_trgm'),
+            GinIndex(OpClass(Upper('fabricant'), name='gin_trgm_ops'), name='equipment_fabricant_trgm'),
+        ]
     
     def __str__(self):
         return f"{self.full_code} - {self.name}"
@@ -66,7 +93,100 @@ class Equipment(models.Model):
         else:
             self.full_code = self.code
         
-        super().save(*args, **kwargs)
+        # New items without an explicit position go after their siblings
+        if self._state.adding and self.position is None:
+            from .services.ordering import EquipmentOrdering
+            self.position = EquipmentOrdering.next_position(self.parent_id) or 0
+        
+        # Descendants derive level and full_code from us, so note what they saw
+        old = None
+        if self.pk:
+            old = Equipment.objects.filter(pk=self.pk).values('level', 'full_code').first()
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            if old and (old['level'] != self.level or old['full_code'] != self.full_code):
+                self.refresh_descendants()
+    
+    def refresh_descendants(self):
+        """
+        Rewrite level and full_code of the whole subtree below this item
+        
+        One recursive CTE walks the subtree from this item's stored values and
+        a single UPDATE applies the result, whatever the size of the branch.
+        Returns the number of updated rows.
+        """
+        table = connection.ops.quote_name(Equipment._meta.db_table)
+        sql = f"""
+            WITH RECURSIVE subtree (id, level, full_code, depth) AS (
+                SELECT child.id, parent.level + 1, parent.full_code || '-' || child.code, 1
+                FROM {table} child
+                JOIN {table} parent ON parent.id = child.parent_id
+                WHERE child.parent_id = %s
+                UNION ALL
+                SELECT child.id, subtree.level + 1, subtree.full_code || '-' || child.code, subtree.depth + 1
+                FROM {table} child
+                JOIN subtree ON child.parent_id = subtree.id
+                WHERE subtree.depth < %s
+            )
+            UPDATE {table}
+            SET level = subtree.level, full_code = subtree.full_code, updated_at = %s
+            FROM subtree
+            WHERE {table}.id = subtree.id
+              AND ({table}.level <> subtree.level OR {table}.full_code <> subtree.full_code)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self.pk, MAX_TREE_DEPTH, timezone.now()])
+            updated = cursor.rowcount
+        
+        if updated:
+            invalidate_equipment_tree()
+        return updated
+    
+    def move_to(self, parent, index=None):
+        """
+        Move this item (and its subtree) under a new parent, or to the top level
+        
+        The item is re-levelled under its new parent and the subtree's level
+        and full_code are rewritten set-based in the same transaction. With
+        an index, the item is placed at that index among its new siblings by
+        giving it a position between its neighbours; the siblings themselves
+        are not rewritten. Raises EquipmentMoveError if the move would create a cycle.
+        """
+        from .services.hierarchy import EquipmentHierarchy
+        from .services.ordering import EquipmentOrdering
+        
+        if parent is not None:
+            # One ancestor query from the new parent; finding this item means a cycle
+            if parent.pk == self.pk or EquipmentHierarchy.is_ancestor(self.pk, parent.pk):
+                raise EquipmentMoveError("Cannot move an item under itself or one of its descendants")
+        
+        self.parent = parent
+        self.level = parent.level + 1 if parent is not None else 1
+        with transaction.atomic():
+            if index is not None:
+                self.position = EquipmentOrdering.place(self.pk, self.parent_id, index)
+            self.save()
     
     def get_absolute_url(self):
-        return reverse('equipment-detail', kwargs={'pk': self.pk})
\ No newline at end of file
+        return reverse('equipment-detail', kwargs={'pk': self.pk})
+
+def invalidate_equipment_tree():
+    """
+    Drop the cached tree once the current transaction commits
+    
+    Called by the signal receivers below and by every bulk writer, since
+    bulk_update and raw SQL updates send no signals.
+    """
+    from .services.tree_cache import TREE_CACHE
+    TREE_CACHE.invalidate_on_commit()
+
+# Signals to invalidate the cached equipment tree on any saved or deleted item
+@receiver(post_save, sender=Equipment)
+def equipment_saved(sender, instance, **kwargs):
+    invalidate_equipment_tree()
+
+@receiver(post_delete, sender=Equipment)
+def equipment_deleted(sender, instance, **kwargs):
+    invalidate_equipment_tree()
@@ -0,0 +1,206 @@
+# equipment/services/batch_move.py
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from ..models import Equipment, EquipmentMoveError, invalidate_equipment_tree
+from .hierarchy import EquipmentHierarchy
+from .ordering import EquipmentOrdering
+
+class EquipmentBatchMover:
+    """
+    Applies a list of drag-and-drop moves in one transaction
+
+    Moves are {id, parent_id, position} dicts, replayed in order the way the
+    tree widget performed them: the item leaves its old siblings and is
+    inserted at index `position` among its new ones. Every move is checked
+    against one in-memory snapshot of the part of the hierarchy the batch
+    touches (see _load), read with three queries whatever the table size.
+    The whole batch is rejected if any move is invalid. Moved items get a sparse position between their new neighbours
+    (see EquipmentOrdering) and their subtrees' level and full_code are
+    recomputed; only rows that actually change are written with bulk_update.
+    """
+
+    UPDATE_FIELDS = ['parent', 'level', 'full_code', 'position', 'updated_at']
+
+    # Snapshot row layout: id, then the values kept per item
+    FIELDS = ['id', 'parent_id', 'code', 'level', 'full_code', 'position']
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.moved = []
+        self.updated = 0
+
+    @staticmethod
+    def parse_moves(data):
+        """
+        Normalize the request payload into (id, parent_id, position) tuples
+
+        Raises EquipmentMoveError if the payload is not a list of moves.
+        """
+        if not isinstance(data, list) or not data:
+            raise EquipmentMoveError("Expected a non-empty list of moves")
+
+        moves = []
+        for index, move in enumerate(data, start=1):
+            if not isinstance(move, dict):
+                raise EquipmentMoveError(f"Move {index} is not an object")
+            try:
+                item_id = int(move['id'])
+                parent_id = int(move['parent_id']) if move.get('parent_id') not in (None, '') else None
+                position = int(move.get('position', 0))
+            except (KeyError, TypeError, ValueError):
+                raise EquipmentMoveError(f"Move {index} needs an integer id, parent_id and position")
+            if position < 0:
+                raise EquipmentMoveError(f"Move {index} has a negative position")
+            moves.append((item_id, parent_id, position))
+        return moves
+
+    def _load(self, moves):
+        """
+        Read the rows a batch of moves can touch, as id -> (parent_id, code, level, full_code, position)
+
+        These are the moved items with their subtrees (whose level and
+        full_code follow them), the target parents with their ancestors (for
+        the cycle check and the new full codes) and every sibling group an
+        item leaves or joins (for positions and duplicate codes). Items that
+        were not found are simply missing.
+        """
+        moved_ids = {item_id for item_id, _, _ in moves}
+        target_ids = {parent_id for _, parent_id, _ in moves}
+
+        rows = {row[0]: row[1:] for row in EquipmentHierarchy.subtree_rows(moved_ids, self.FIELDS)}
+        rows.update(
+            (row[0], row[1:]) for row in EquipmentHierarchy.ancestor_rows(target_ids - {None}, self.FIELDS)
+        )
+
+        # A later move may leave a group an earlier one joined, so old and new parents suffice
+        group_ids = target_ids | {rows[item_id][0] for item_id in moved_ids if item_id in rows}
+        groups = Q(parent_id__in=[parent_id for parent_id in group_ids if parent_id is not None])
+        if None in group_ids:
+            groups |= Q(parent__isnull=True)
+        rows.update(
+            (row[0], row[1:]) for row in Equipment.objects.filter(groups).order_by().values_list(*self.FIELDS)
+        )
+        return rows
+
+    def apply(self, moves):
+        """Validate and write the moves; returns self with moved and updated filled in"""
+        with transaction.atomic():
+            rows = self._load(moves)
+            parents = {item_id: row[0] for item_id, row in rows.items()}
+            positions = {item_id: row[4] for item_id, row in rows.items()}
+            children = {}
+            for item_id, parent_id in parents.items():
+                children.setdefault(parent_id, []).append(item_id)
+            siblings = {}  # Display-ordered children of the parents touched so far
+
+            def children_of(parent_id):
+                if parent_id not in siblings:
+                    siblings[parent_id] = sorted(
+                        children.get(parent_id, []),
+                        key=lambda item_id: (rows[item_id][4], rows[item_id][1], item_id)
+                    )
+                return siblings[parent_id]
+
+            for item_id, parent_id, position in moves:
+                if item_id not in rows:
+                    raise EquipmentMoveError(f"Equipment {item_id} not found")
+                if parent_id is not None and parent_id not in rows:
+                    raise EquipmentMoveError(f"Parent equipment {parent_id} not found")
+
+                # Walk up from the new parent; reaching the item means a cycle
+                ancestor_id = parent_id
+                seen = set()
+                while ancestor_id is not None and ancestor_id not in seen:
+                    if ancestor_id == item_id:
+                        raise EquipmentMoveError(
+                            f"Cannot move equipment {rows[item_id][1]} under itself or one of its descendants"
+                        )
+                    seen.add(ancestor_id)
+                    ancestor_id = parents.get(ancestor_id)
+
+                code = rows[item_id][1]
+                new_siblings = children_of(parent_id)
+                if any(rows[sibling_id][1] == code for sibling_id in new_siblings if sibling_id != item_id):
+                    raise EquipmentMoveError(f"Code {code} already exists under the target parent")
+
+                children_of(parents[item_id]).remove(item_id)
+                index = min(position, len(new_siblings))
+                new_position = EquipmentOrdering.position_at([positions[i] for i in new_siblings], index)
+                if new_position is None:
+                    # No room between the neighbours: respace this sibling group
+                    for sibling_id, spaced in zip(new_siblings, EquipmentOrdering.spaced(len(new_siblings))):
+                        positions[sibling_id] = spaced
+                    new_position = EquipmentOrdering.position_at([positions[i] for i in new_siblings], index)
+                new_siblings.insert(index, item_id)
+                positions[item_id] = new_position
+                parents[item_id] = parent_id
+                if item_id not in self.moved:
+                    self.moved.append(item_id)
+
+            changes = self._plan(rows, parents, positions)
+            self._write(rows, changes)
+        return self
+
+    def _plan(self, rows, parents, positions):
+        """Work out the new parent, position, level and full_code of every affected item"""
+        changes = {}  # id -> {field: value}
+        for item_id, position in positions.items():
+            if rows[item_id][4] != position:
+                changes.setdefault(item_id, {})['position'] = position
+
+        children = {}
+        for item_id, parent_id in parents.items():
+            children.setdefault(parent_id, []).append(item_id)
+
+        # Recompute from the topmost moved items down through their subtrees
+        moved = set(self.moved)
+        max_length = Equipment._meta.get_field('full_code').max_length
+        for item_id in self.moved:
+            ancestor_id = parents[item_id]
+            seen = set()
+            while ancestor_id is not None and ancestor_id not in moved and ancestor_id not in seen:
+                seen.add(ancestor_id)
+                ancestor_id = parents.get(ancestor_id)
+            if ancestor_id in moved:
+                continue
+
+            parent_id = parents[item_id]
+            stack = [(item_id, rows[parent_id][2] + 1 if parent_id else 1, rows[parent_id][3] if parent_id else None)]
+            while stack:
+                node_id, level, parent_full_code = stack.pop()
+                code, stored_level, stored_full_code = rows[node_id][1:4]
+                full_code = f"{parent_full_code}-{code}" if parent_full_code is not None else code
+                if len(full_code) > max_length:
+                    raise EquipmentMoveError(f"Full code of {code} would exceed {max_length} characters")
+
+                if stored_level != level:
+                    changes.setdefault(node_id, {})['level'] = level
+                if stored_full_code != full_code:
+                    changes.setdefault(node_id, {})['full_code'] = full_code
+                stack.extend((child_id, level + 1, full_code) for child_id in children.get(node_id, []))
+
+        for item_id in self.moved:
+            if parents[item_id] != rows[item_id][0]:
+                changes.setdefault(item_id, {})['parent_id'] = parents[item_id]
+        return changes
+
+    def _write(self, rows, changes):
+        """Write the changed rows with bulk updates"""
+        now = timezone.now()
+        items = []
+        for item_id, values in changes.items():
+            parent_id, code, level, full_code, position = rows[item_id]
+            items.append(Equipment(
+                pk=item_id,
+                parent_id=values.get('parent_id', parent_id),
+                level=values.get('level', level),
+                full_code=values.get('full_code', full_code),
+                position=values.get('position', position),
+                updated_at=now
+            ))
+
+        invalidate_equipment_tree()
+        Equipment.objects.bulk_update(items, self.UPDATE_FIELDS, batch_size=self.batch_size)
+        self.updated = len(items)
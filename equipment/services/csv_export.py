@@ -0,0 +1,97 @@
+# equipment/services/csv_export.py
+
+from django.db import connection
+from ..models import Equipment, MAX_TREE_DEPTH, SIBLING_ORDER
+from .level_importer import EquipmentLevelImporter
+
+class EquipmentCSVExporter:
+    """
+    Export of the equipment hierarchy in the level-based import format
+
+    Rows come out depth-first, siblings in display order (SIBLING_ORDER),
+    with Level set to the item's actual depth, which is exactly what
+    EquipmentLevelImporter needs to rebuild the same tree. On PostgreSQL the
+    walk and ordering are done by one recursive query read through a
+    server-side cursor, so memory use does not depend on the hierarchy
+    size. Other backends order an in-memory (id, parent) skeleton and read
+    the row data in chunks.
+    """
+
+    CSV_COLUMNS = EquipmentLevelImporter.CSV_COLUMNS
+    # Model fields in CSV column order; Level is the computed depth
+    FIELDS = ['code', 'name', 'description', 'fabricant', 'doc_reference']
+
+    CHUNK_SIZE = 2000
+
+    @staticmethod
+    def _row(code, depth, name, description, fabricant, doc_reference):
+        return [code, depth, name, description, fabricant, doc_reference]
+
+    @staticmethod
+    def iter_rows(chunk_size=None):
+        """Yield one CSV row (as a list) per equipment item, depth-first"""
+        chunk_size = chunk_size or EquipmentCSVExporter.CHUNK_SIZE
+        if connection.vendor == 'postgresql':
+            yield from EquipmentCSVExporter._iter_rows_cte(chunk_size)
+        else:
+            yield from EquipmentCSVExporter._iter_rows_in_memory(chunk_size)
+
+    @staticmethod
+    def _iter_rows_cte(chunk_size):
+        table = connection.ops.quote_name(Equipment._meta.db_table)
+        columns = ', '.join(f'item.{field}' for field in EquipmentCSVExporter.FIELDS)
+        # The sort path holds (zero-padded position, code, zero-padded id) triples from
+        # the root down, so ordering by it gives a pre-order walk in SIBLING_ORDER
+        sql = f"""
+            WITH RECURSIVE walk (id, depth, sort_path) AS (
+                SELECT id, 1, ARRAY[lpad("position"::text, 10, '0'), code::text, lpad(id::text, 20, '0')]
+                FROM {table} WHERE parent_id IS NULL
+                UNION ALL
+                SELECT child.id, walk.depth + 1,
+                       walk.sort_path || ARRAY[lpad(child."position"::text, 10, '0'), child.code::text, lpad(child.id::text, 20, '0')]
+                FROM {table} child
+                JOIN walk ON child.parent_id = walk.id
+                WHERE walk.depth < %s
+            )
+            SELECT walk.depth, {columns}
+            FROM walk JOIN {table} item ON item.id = walk.id
+            ORDER BY walk.sort_path
+        """
+        # A named (server-side) cursor fetches the result a chunk at a time
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql, [MAX_TREE_DEPTH])
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for depth, code, name, description, fabricant, doc_reference in rows:
+                    yield EquipmentCSVExporter._row(code, depth, name, description, fabricant, doc_reference)
+
+    @staticmethod
+    def _iter_rows_in_memory(chunk_size):
+        children = {}
+        skeleton = Equipment.objects.order_by(*SIBLING_ORDER).values_list('id', 'parent_id')
+        for item_id, parent_id in skeleton.iterator(chunk_size=chunk_size):
+            children.setdefault(parent_id, []).append(item_id)
+
+        order = []
+        stack = [(item_id, 1) for item_id in reversed(children.get(None, []))]
+        while stack:
+            item_id, depth = stack.pop()
+            order.append((item_id, depth))
+            if depth < MAX_TREE_DEPTH:
+                stack.extend((child_id, depth + 1) for child_id in reversed(children.get(item_id, [])))
+
+        for start in range(0, len(order), chunk_size):
+            chunk = order[start:start + chunk_size]
+            values = {
+                row[0]: row[1:]
+                for row in Equipment.objects.filter(
+                    id__in=[item_id for item_id, depth in chunk]
+                ).values_list('id', *EquipmentCSVExporter.FIELDS)
+            }
+            for item_id, depth in chunk:
+                if item_id not in values:
+                    continue  # Deleted since the skeleton was read
+                code, name, description, fabricant, doc_reference = values[item_id]
+                yield EquipmentCSVExporter._row(code, depth, name, description, fabricant, doc_reference)
@@ -0,0 +1,92 @@
+# equipment/services/equipment_search.py
+
+from django.db.models import Q
+from ..models import Equipment
+from .hierarchy import EquipmentHierarchy
+
+# Page sizes for the search API
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+class EquipmentSearch:
+    """
+    Indexed search over equipment codes, names and manufacturers
+
+    Every filter is answered from an index on PostgreSQL: exact code
+    prefixes from the varchar_pattern_ops index on full_code, free text from
+    the trigram indexes on UPPER(full_code/name/fabricant), and status with
+    the (status, full_code) index, which also serves the code ordering.
+    """
+
+    @staticmethod
+    def filter(queryset, term=None, code=None, status=None):
+        """
+        Narrow an Equipment queryset
+
+        Args:
+            queryset: Equipment queryset to filter
+            term: Text matched case-insensitively in name or fabricant, or as a full_code prefix
+            code: Exact full_code prefix (e.g. a section of the plant)
+            status: Exact status value
+
+        Returns:
+            Filtered queryset in full_code order
+        """
+        if code:
+            queryset = queryset.filter(full_code__startswith=code)
+
+        if term:
+            queryset = queryset.filter(
+                Q(full_code__istartswith=term) | Q(name__icontains=term) | Q(fabricant__icontains=term)
+            )
+
+        if status:
+            queryset = queryset.filter(status=status)
+
+        return queryset.order_by('full_code', 'id')
+
+    @staticmethod
+    def search_nodes(term=None, code=None, status=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+        """
+        Return one page of matching items with their ancestor paths
+
+        One row past the page is read to tell whether another page exists, so
+        no COUNT query is needed. The ancestors of the whole page come from a
+        single query; each result lists them root first as 'path', with the
+        jstree node ids in 'path_ids' so the tree can open down to the match.
+
+        Returns:
+            Dict with 'results', 'page', 'page_size' and 'has_next'
+        """
+        page = max(1, int(page))
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        start = (page - 1) * page_size
+
+        queryset = EquipmentSearch.filter(Equipment.objects.all(), term=term, code=code, status=status)
+        rows = list(queryset.values(
+            'id', 'parent_id', 'code', 'full_code', 'name', 'level', 'fabricant', 'status'
+        )[start:start + page_size + 1])
+
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        paths = EquipmentHierarchy.paths_to_root(row['id'] for row in rows)
+
+        results = []
+        for row in rows:
+            ancestors = paths.get(row['id'], [])[:-1]
+            results.append(dict(
+                row,
+                node_id=f"equipment_{row['id']}",
+                path=[
+                    {'id': item['id'], 'code': item['code'], 'full_code': item['full_code'], 'name': item['name']}
+                    for item in ancestors
+                ],
+                path_ids=[f"equipment_{item['id']}" for item in ancestors]
+            ))
+
+        return {
+            'results': results,
+            'page': page,
+            'page_size': page_size,
+            'has_next': has_next
+        }
@@ -0,0 +1,282 @@
+# equipment/services/hierarchy.py
+
+from django.db import connection
+from ..models import Equipment, MAX_TREE_DEPTH
+
+class EquipmentHierarchy:
+    """
+    Ancestor and descendant queries for Equipment
+
+    On PostgreSQL every question is answered by a single WITH RECURSIVE
+    query. Other backends walk one level per query, reading only the rows
+    on the way. All walks stop at cycles, so they are safe on damaged data.
+    """
+
+    @staticmethod
+    def _use_cte():
+        return connection.vendor == 'postgresql'
+
+    @staticmethod
+    def _table():
+        return connection.ops.quote_name(Equipment._meta.db_table)
+
+    @staticmethod
+    def _parent_map():
+        return dict(Equipment.objects.values_list('id', 'parent_id'))
+
+    @staticmethod
+    def _ancestor_map(pks):
+        """{id: parent_id} of the given items and everything above them, one query per level"""
+        parents = {}
+        frontier = set(pks)
+        while frontier:
+            level = dict(Equipment.objects.filter(id__in=frontier).values_list('id', 'parent_id'))
+            parents.update(level)
+            frontier = {parent_id for parent_id in level.values()
+                        if parent_id is not None and parent_id not in parents}
+        return parents
+
+    @staticmethod
+    def _subtree_ids(pks):
+        """Ids of the given items and everything below them, one query per level"""
+        ids = set()
+        frontier = set(pks)
+        while frontier:
+            ids |= frontier
+            frontier = set(Equipment.objects.filter(
+                parent_id__in=frontier
+            ).values_list('id', flat=True)) - ids
+        return ids
+
+    @staticmethod
+    def _fetch(sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    @staticmethod
+    def _columns(fields):
+        """Quoted item.column list for model field names"""
+        return ', '.join(
+            f'item.{connection.ops.quote_name(Equipment._meta.get_field(field).column)}' for field in fields
+        )
+
+    @staticmethod
+    def ancestor_ids(pk, include_self=False):
+        """Return the ids above an item, nearest first (parent, grandparent, ... root)"""
+        if EquipmentHierarchy._use_cte():
+            table = EquipmentHierarchy._table()
+            rows = EquipmentHierarchy._fetch(f"""
+                WITH RECURSIVE ancestors (id, parent_id, depth, path) AS (
+                    SELECT id, parent_id, 0, ARRAY[id] FROM {table} WHERE id = %s
+                    UNION ALL
+                    SELECT item.id, item.parent_id, ancestors.depth + 1, ancestors.path || item.id
+                    FROM {table} item
+                    JOIN ancestors ON item.id = ancestors.parent_id
+                    WHERE NOT item.id = ANY(ancestors.path)
+                )
+                SELECT id FROM ancestors WHERE depth >= %s ORDER BY depth
+            """, [pk, 0 if include_self else 1])
+            return [row[0] for row in rows]
+
+        parents = EquipmentHierarchy._ancestor_map([pk])
+        ids = [pk] if include_self and pk in parents else []
+        seen = {pk}
+        current = parents.get(pk)
+        while current is not None and current not in seen and current in parents:
+            ids.append(current)
+            seen.add(current)
+            current = parents[current]
+        return ids
+
+    @staticmethod
+    def is_ancestor(ancestor_pk, pk):
+        """True if ancestor_pk is strictly above pk in the hierarchy"""
+        return ancestor_pk in EquipmentHierarchy.ancestor_ids(pk)
+
+    @staticmethod
+    def path_to_root(pk):
+        """
+        Return the items from the root down to pk (inclusive)
+
+        Each item is a dict with id, code, full_code, name and level.
+        """
+        return EquipmentHierarchy.paths_to_root([pk]).get(pk, [])
+
+    @staticmethod
+    def paths_to_root(pks):
+        """Return {pk: path_to_root(pk)} for several items in one query"""
+        pks = list(pks)
+        if not pks:
+            return {}
+        fields = ['id', 'code', 'full_code', 'name', 'level']
+
+        if EquipmentHierarchy._use_cte():
+            table = EquipmentHierarchy._table()
+            columns = EquipmentHierarchy._columns(fields)
+            rows = EquipmentHierarchy._fetch(f"""
+                WITH RECURSIVE ancestors (start_id, id, parent_id, depth, path) AS (
+                    SELECT id, id, parent_id, 0, ARRAY[id] FROM {table} WHERE id = ANY(%s)
+                    UNION ALL
+                    SELECT ancestors.start_id, item.id, item.parent_id, ancestors.depth + 1, ancestors.path || item.id
+                    FROM {table} item
+                    JOIN ancestors ON item.id = ancestors.parent_id
+                    WHERE NOT item.id = ANY(ancestors.path)
+                )
+                SELECT ancestors.start_id, {columns}
+                FROM ancestors JOIN {table} item ON item.id = ancestors.id
+                ORDER BY ancestors.start_id, ancestors.depth DESC
+            """, [pks])
+            paths = {}
+            for row in rows:
+                paths.setdefault(row[0], []).append(dict(zip(fields, row[1:])))
+            return paths
+
+        parents = EquipmentHierarchy._ancestor_map(pks)
+        ids = {}
+        for pk in pks:
+            if pk not in parents:
+                continue
+            ids[pk] = [pk]
+            current = parents[pk]
+            while current is not None and current not in ids[pk] and current in parents:
+                ids[pk].append(current)
+                current = parents[current]
+
+        needed = {item_id for path in ids.values() for item_id in path}
+        items = {row['id']: row for row in Equipment.objects.filter(id__in=needed).values(*fields)}
+        return {pk: [items[item_id] for item_id in reversed(path)] for pk, path in ids.items()}
+
+    @staticmethod
+    def descendant_ids(pk):
+        """Return the ids of every item below pk"""
+        if EquipmentHierarchy._use_cte():
+            table = EquipmentHierarchy._table()
+            rows = EquipmentHierarchy._fetch(f"""
+                WITH RECURSIVE descendants (id, depth) AS (
+                    SELECT id, 1 FROM {table} WHERE parent_id = %s
+                    UNION ALL
+                    SELECT item.id, descendants.depth + 1
+                    FROM {table} item
+                    JOIN descendants ON item.parent_id = descendants.id
+                    WHERE descendants.depth < %s
+                )
+                SELECT DISTINCT id FROM descendants
+            """, [pk, MAX_TREE_DEPTH])
+            return [row[0] for row in rows if row[0] != pk]
+
+        return list(EquipmentHierarchy._subtree_ids([pk]) - {pk})
+
+    @staticmethod
+    def subtree_rows(pks, fields):
+        """Return the given items and everything below them as tuples of fields"""
+        pks = list(pks)
+        if not pks:
+            return []
+
+        if EquipmentHierarchy._use_cte():
+            table = EquipmentHierarchy._table()
+            return EquipmentHierarchy._fetch(f"""
+                WITH RECURSIVE subtree (id, depth) AS (
+                    SELECT id, 0 FROM {table} WHERE id = ANY(%s)
+                    UNION ALL
+                    SELECT item.id, subtree.depth + 1
+                    FROM {table} item
+                    JOIN subtree ON item.parent_id = subtree.id
+                    WHERE subtree.depth < %s
+                )
+                SELECT {EquipmentHierarchy._columns(fields)}
+                FROM {table} item WHERE item.id IN (SELECT id FROM subtree)
+            """, [pks, MAX_TREE_DEPTH])
+
+        ids = EquipmentHierarchy._subtree_ids(pks)
+        return list(Equipment.objects.filter(id__in=ids).order_by().values_list(*fields))
+
+    @staticmethod
+    def ancestor_rows(pks, fields):
+        """Return the given items and everything above them as tuples of fields"""
+        pks = list(pks)
+        if not pks:
+            return []
+
+        if EquipmentHierarchy._use_cte():
+            table = EquipmentHierarchy._table()
+            return EquipmentHierarchy._fetch(f"""
+                WITH RECURSIVE ancestors (id, parent_id, path) AS (
+                    SELECT id, parent_id, ARRAY[id] FROM {table} WHERE id = ANY(%s)
+                    UNION ALL
+                    SELECT item.id, item.parent_id, ancestors.path || item.id
+                    FROM {table} item
+                    JOIN ancestors ON item.id = ancestors.parent_id
+                    WHERE NOT item.id = ANY(ancestors.path)
+                )
+                SELECT {EquipmentHierarchy._columns(fields)}
+                FROM {table} item WHERE item.id IN (SELECT id FROM ancestors)
+            """, [pks])
+
+        parents = EquipmentHierarchy._ancestor_map(pks)
+        ids = set()
+        for pk in pks:
+            current = pk
+            while current is not None and current not in ids and current in parents:
+                ids.add(current)
+                current = parents[current]
+        return list(Equipment.objects.filter(id__in=ids).order_by().values_list(*fields))
+
+    @staticmethod
+    def find_cycles():
+        """
+        Return every parent cycle as a list of ids, starting from its lowest id
+
+        Items that merely hang below a cycle are not reported. On PostgreSQL
+        the walk only starts from items that do not reach a root, so a healthy
+        tree costs one pass down from the roots.
+        """
+        if EquipmentHierarchy._use_cte():
+            table = EquipmentHierarchy._table()
+            rows = EquipmentHierarchy._fetch(f"""
+                WITH RECURSIVE rooted (id, depth) AS (
+                    SELECT id, 0 FROM {table} WHERE parent_id IS NULL
+                    UNION ALL
+                    SELECT item.id, rooted.depth + 1
+                    FROM {table} item
+                    JOIN rooted ON item.parent_id = rooted.id
+                    WHERE rooted.depth < %s
+                ),
+                walk (start_id, next_id, path, is_cycle) AS (
+                    SELECT id, parent_id, ARRAY[id], false FROM {table}
+                    WHERE parent_id IS NOT NULL AND id NOT IN (SELECT id FROM rooted)
+                    UNION ALL
+                    SELECT walk.start_id, item.parent_id, walk.path || item.id, item.id = ANY(walk.path)
+                    FROM walk
+                    JOIN {table} item ON item.id = walk.next_id
+                    WHERE NOT walk.is_cycle AND array_length(walk.path, 1) < %s
+                )
+                SELECT path FROM walk
+                WHERE is_cycle AND path[array_length(path, 1)] = start_id
+            """, [MAX_TREE_DEPTH, MAX_TREE_DEPTH])
+            # Each member of a cycle reports it; keep the copy starting at the lowest id
+            return sorted(path[:-1] for path in (row[0] for row in rows) if path[0] == min(path))
+
+        return EquipmentHierarchy.cycles_in(EquipmentHierarchy._parent_map())
+
+    @staticmethod
+    def cycles_in(parents):
+        """Find the parent cycles of an in-memory {id: parent_id} map, as find_cycles does"""
+        cycles = []
+        done = set()
+        for start in parents:
+            walk = []
+            position = {}
+            current = start
+            while current is not None and current not in done and current in parents:
+                if current in position:
+                    cycle = walk[position[current]:]
+                    lowest = cycle.index(min(cycle))
+                    cycles.append(cycle[lowest:] + cycle[:lowest])
+                    break
+                position[current] = len(walk)
+                walk.append(current)
+                current = parents[current]
+            done.update(walk)
+        return sorted(cycles)
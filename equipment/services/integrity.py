@@ -0,0 +1,154 @@
+# equipment/services/integrity.py
+
+from django.db import transaction
+from django.utils import timezone
+from ..models import Equipment, invalidate_equipment_tree
+from .hierarchy import EquipmentHierarchy
+from .ordering import EquipmentOrdering
+
+class EquipmentIntegrityScanner:
+    """
+    Consistency check of the whole equipment hierarchy
+
+    Every item is read once as a plain tuple and the checks run on the
+    in-memory graph. Structural problems are resolved first (orphans and
+    one member of each cycle become top-level items); level, full_code and
+    sibling positions are then compared against that repaired tree, so the
+    report lists exactly what fix() would write.
+    """
+
+    FIELDS = ('id', 'parent_id', 'code', 'level', 'full_code', 'position')
+    UPDATE_FIELDS = ['parent', 'level', 'full_code', 'position', 'updated_at']
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.rows = {}
+        self.parents = {}
+        self.orphans = []
+        self.cycles = []
+        self.level_mismatches = []  # (id, stored, expected)
+        self.stale_full_codes = []  # (id, stored, expected)
+        self.overlong_full_codes = []  # (id, expected)
+        self.duplicate_positions = []  # (parent_id, position, [ids])
+        self.unreachable = []
+        self.changes = {}  # id -> {field: new value}
+
+    @property
+    def issue_count(self):
+        return (len(self.orphans) + len(self.cycles) + len(self.level_mismatches)
+                + len(self.stale_full_codes) + len(self.overlong_full_codes)
+                + len(self.duplicate_positions) + len(self.unreachable))
+
+    def scan(self):
+        """Read the hierarchy in one query and run every check"""
+        queryset = Equipment.objects.order_by().values_list(*self.FIELDS)
+        for item_id, parent_id, code, level, full_code, position in queryset.iterator(chunk_size=10000):
+            self.rows[item_id] = (code, level, full_code, position)
+            self.parents[item_id] = parent_id
+
+        # Effective parents once orphans and cycles are broken
+        parents = dict(self.parents)
+
+        self.orphans = sorted(
+            item_id for item_id, parent_id in parents.items()
+            if parent_id is not None and parent_id not in parents
+        )
+        for item_id in self.orphans:
+            parents[item_id] = None
+
+        self.cycles = EquipmentHierarchy.cycles_in(parents)
+        for cycle in self.cycles:
+            parents[cycle[0]] = None
+
+        for item_id, parent_id in parents.items():
+            if parent_id != self.parents[item_id]:
+                self._change(item_id, parent_id=parent_id)
+
+        children = {}
+        for item_id, parent_id in parents.items():
+            children.setdefault(parent_id, []).append(item_id)
+
+        self._check_positions(children)
+        self._check_paths(children)
+        return self
+
+    def _change(self, item_id, **values):
+        self.changes.setdefault(item_id, {}).update(values)
+
+    def _sibling_key(self, item_id):
+        code, level, full_code, position = self.rows[item_id]
+        return position, code, item_id
+
+    def _check_positions(self, children):
+        """Respace sibling groups that share a position, keeping their display order"""
+        for parent_id, siblings in children.items():
+            siblings.sort(key=self._sibling_key)
+
+            by_position = {}
+            for item_id in siblings:
+                by_position.setdefault(self.rows[item_id][3], []).append(item_id)
+            duplicates = [(position, ids) for position, ids in by_position.items() if len(ids) > 1]
+            if not duplicates:
+                continue
+
+            for position, ids in duplicates:
+                self.duplicate_positions.append((parent_id, position, ids))
+            for item_id, new_position in zip(siblings, EquipmentOrdering.spaced(len(siblings))):
+                if self.rows[item_id][3] != new_position:
+                    self._change(item_id, position=new_position)
+
+    def _check_paths(self, children):
+        """Walk down from the top-level items and compare level and full_code"""
+        max_length = Equipment._meta.get_field('full_code').max_length
+        reached = set()
+        stack = [(item_id, 1, None) for item_id in reversed(children.get(None, []))]
+
+        while stack:
+            item_id, level, parent_full_code = stack.pop()
+            reached.add(item_id)
+            code, stored_level, stored_full_code, position = self.rows[item_id]
+            full_code = f"{parent_full_code}-{code}" if parent_full_code is not None else code
+
+            if stored_level != level:
+                self.level_mismatches.append((item_id, stored_level, level))
+                self._change(item_id, level=level)
+
+            if stored_full_code != full_code:
+                if len(full_code) > max_length:
+                    self.overlong_full_codes.append((item_id, full_code))
+                else:
+                    self.stale_full_codes.append((item_id, stored_full_code, full_code))
+                    self._change(item_id, full_code=full_code)
+
+            for child_id in reversed(children.get(item_id, [])):
+                stack.append((child_id, level + 1, full_code))
+
+        # Cannot happen once cycles are broken; reported rather than assumed
+        self.unreachable = sorted(set(self.rows) - reached)
+
+    def fix(self):
+        """
+        Write the planned repairs with bulk updates in one transaction
+
+        Returns the number of updated items.
+        """
+        if not self.changes:
+            return 0
+
+        now = timezone.now()
+        items = []
+        for item_id, values in self.changes.items():
+            code, level, full_code, position = self.rows[item_id]
+            items.append(Equipment(
+                pk=item_id,
+                parent_id=values.get('parent_id', self.parents[item_id]),
+                level=values.get('level', level),
+                full_code=values.get('full_code', full_code),
+                position=values.get('position', position),
+                updated_at=now
+            ))
+
+        with transaction.atomic():
+            invalidate_equipment_tree()
+            Equipment.objects.bulk_update(items, self.UPDATE_FIELDS, batch_size=self.batch_size)
+        return len(items)
@@ -0,0 +1,263 @@
+# equipment/services/level_importer.py
+
+from django.db import transaction
+from django.utils import timezone
+from ..models import Equipment, invalidate_equipment_tree
+from .ordering import EquipmentOrdering
+
+class EquipmentImportRowError(Exception):
+    """Raised when a single CSV row cannot be turned into an equipment item"""
+    pass
+
+class _Node:
+    """One equipment item of the planned hierarchy"""
+    __slots__ = ('row_number', 'code', 'parent', 'depth', 'pk', 'stored', 'level',
+                 'full_code', 'position', 'values', 'action', 'changes')
+
+    def __init__(self, row_number, code, parent, stored):
+        self.row_number = row_number
+        self.code = code
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.stored = stored
+        self.pk = stored['id'] if stored else None
+        self.position = stored['position'] if stored else 0
+        self.level = 1
+        self.full_code = ''
+        self.values = {}
+        self.action = None
+        self.changes = {}
+
+class EquipmentLevelImporter:
+    """
+    Bulk importer for level-based equipment CSV files
+
+    The whole hierarchy is planned in memory from the level stack: parents,
+    positions and full codes are resolved against a single read of the
+    existing equipment, keyed on (parent, code). Writes are then batched,
+    with one bulk_create per tree depth for new items and a bulk_update for
+    changed ones. In dry-run mode the plan is reported and nothing is written.
+    """
+
+    CSV_COLUMNS = ['Code', 'Level', 'Name', 'Reference', 'Fabricant', 'Doc Ref']
+
+    # CSV header -> model field for the descriptive columns
+    TEXT_COLUMNS = {
+        'Name': 'name',
+        'Reference': 'description',
+        'Fabricant': 'fabricant',
+        'Doc Ref': 'doc_reference',
+    }
+    COMPARED_FIELDS = ['level', 'full_code'] + list(TEXT_COLUMNS.values())
+    UPDATE_FIELDS = COMPARED_FIELDS + ['updated_at']
+
+    def __init__(self, update_existing=True, clear_existing=False, batch_size=1000):
+        self.update_existing = update_existing
+        self.clear_existing = clear_existing
+        self.batch_size = batch_size
+        self.nodes = []
+        self.errors = []
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0
+
+    @property
+    def changed_nodes(self):
+        """Planned items that would be created or modified, in file order"""
+        return [node for node in self.nodes if node.action in ('create', 'update')]
+
+    def run(self, records, dry_run=False):
+        """Plan the import of the given CSV records and apply it unless dry_run"""
+        self.plan(records)
+        if not dry_run:
+            with transaction.atomic():
+                if self.clear_existing:
+                    Equipment.objects.all().delete()
+                self._write()
+        return self
+
+    def parse_row(self, record):
+        """
+        Extract (code, level, values) from a CSV record
+
+        Raises EquipmentImportRowError if the row is not usable.
+        """
+        code = (record.get('Code') or '').strip()
+        name = (record.get('Name') or '').strip()
+        if not code or not name:
+            raise EquipmentImportRowError("Code and Name are required")
+
+        try:
+            level = int((record.get('Level') or '1').strip())
+        except ValueError:
+            raise EquipmentImportRowError(f"Invalid level '{record.get('Level')}'")
+        if level < 1:
+            raise EquipmentImportRowError(f"Invalid level '{level}'")
+
+        values = {field: (record.get(column) or '').strip() for column, field in self.TEXT_COLUMNS.items()}
+
+        # Catch overlong values here so one bad row doesn't fail a whole batch
+        for field, value in [('code', code)] + list(values.items()):
+            max_length = Equipment._meta.get_field(field).max_length
+            if max_length and len(value) > max_length:
+                raise EquipmentImportRowError(f"Value for {field} exceeds {max_length} characters")
+
+        return code, level, values
+
+    def plan(self, records):
+        """Resolve every row against the existing equipment without writing anything"""
+        existing, next_position = self._load_existing()
+        full_code_length = Equipment._meta.get_field('full_code').max_length
+
+        level_stack = {}  # Latest item for each level, as in the row-by-row import
+        planned = {}  # (parent node or pk, code) -> node, to merge repeated rows
+
+        for row_number, record in enumerate(records, start=2):  # Line 1 is the header
+            try:
+                code, level, values = self.parse_row(record)
+            except EquipmentImportRowError as e:
+                self.errors.append((row_number, record.get('Code', ''), str(e)))
+                continue
+
+            parent = level_stack.get(level - 1) if level > 1 else None
+            full_code = f"{parent.full_code}-{code}" if parent else code
+            if len(full_code) > full_code_length:
+                self.errors.append((row_number, code, f"Full code exceeds {full_code_length} characters"))
+                continue
+
+            # A parent planned for creation has no pk yet; the node itself keys its children
+            parent_key = (parent.pk or parent) if parent else None
+            node = planned.get((parent_key, code))
+            repeated = node is not None
+
+            if node is None:
+                # Only items under an existing parent (or at the top) can already exist
+                stored = None
+                if parent is None or parent.pk:
+                    stored = existing.get((parent.pk if parent else None, code))
+                node = _Node(row_number, code, parent, stored)
+                planned[(parent_key, code)] = node
+                self.nodes.append(node)
+
+                if stored is None:
+                    # New items go after their current siblings, in file order
+                    node.position = EquipmentOrdering.position_between(next_position.get(parent_key), None) or 0
+                    next_position[parent_key] = node.position
+
+            apply = True
+            if node.stored is None and not repeated:
+                node.action = 'create'
+                self.created += 1
+            elif not self.update_existing:
+                # Kept on the level stack so its children still find their parent
+                apply = False
+                if node.action is None:
+                    node.action = 'skip'
+                    node.level = node.stored['level']
+                    node.full_code = node.stored['full_code']
+                self.skipped += 1
+            else:
+                self._count_update(node, level, full_code, values)
+
+            if apply:
+                node.level = level
+                node.full_code = full_code
+                node.values = values
+
+            level_stack[level] = node
+            for deeper in [l for l in level_stack if l > level]:
+                del level_stack[deeper]
+
+        return self
+
+    def _count_update(self, node, level, full_code, values):
+        """Record an update (or no-op) of an existing or already planned item"""
+        if node.stored is None:
+            # Repeated row for an item created by this import: last one wins
+            self.updated += 1
+            return
+
+        new_values = dict(values, level=level, full_code=full_code)
+        node.changes = {
+            field: (node.stored[field], new_values[field])
+            for field in self.COMPARED_FIELDS
+            if node.stored[field] != new_values[field]
+        }
+        if node.changes:
+            node.action = 'update'
+            self.updated += 1
+        else:
+            if node.action is None:
+                node.action = 'unchanged'
+            self.unchanged += 1
+
+    def _load_existing(self):
+        """Read existing items (keyed on parent pk and code) and the last sibling position of each parent"""
+        existing = {}
+        next_position = {}
+        if self.clear_existing:
+            return existing, next_position
+
+        for row in Equipment.objects.values('id', 'parent_id', 'code', 'position', *self.COMPARED_FIELDS):
+            existing[(row['parent_id'], row['code'])] = row
+            next_position[row['parent_id']] = max(next_position.get(row['parent_id'], 0), row['position'])
+        return existing, next_position
+
+    def _write(self):
+        """Apply the plan: inserts depth by depth, then updates, then stale subtrees"""
+        now = timezone.now()
+
+        invalidate_equipment_tree()
+
+        to_create = {}
+        for node in self.nodes:
+            if node.action == 'create':
+                to_create.setdefault(node.depth, []).append(node)
+
+        for depth in sorted(to_create):
+            nodes = to_create[depth]
+            created = Equipment.objects.bulk_create([
+                Equipment(
+                    code=node.code,
+                    parent_id=node.parent.pk if node.parent else None,
+                    level=node.level,
+                    full_code=node.full_code,
+                    position=node.position,
+                    **node.values
+                ) for node in nodes
+            ], batch_size=self.batch_size)
+
+            if any(item.pk is None for item in created):
+                # Backends without RETURNING support: read the new pks back
+                parent_ids = {node.parent.pk if node.parent else None for node in nodes}
+                queryset = Equipment.objects.filter(code__in=[node.code for node in nodes])
+                pks = {
+                    (parent_id, code): pk
+                    for pk, parent_id, code in queryset.values_list('pk', 'parent_id', 'code')
+                    if parent_id in parent_ids
+                }
+                for node in nodes:
+                    node.pk = pks[(node.parent.pk if node.parent else None, node.code)]
+            else:
+                for node, item in zip(nodes, created):
+                    node.pk = item.pk
+
+        to_update = [node for node in self.nodes if node.action == 'update']
+        Equipment.objects.bulk_update([
+            Equipment(pk=node.pk, level=node.level, full_code=node.full_code, updated_at=now, **node.values)
+            for node in to_update
+        ], self.UPDATE_FIELDS, batch_size=self.batch_size)
+
+        # Items missing from the file may sit below a re-levelled or re-coded one;
+        # one set-based rewrite from each topmost such item covers them all
+        refreshed = set()
+        for node in to_update:
+            if 'level' not in node.changes and 'full_code' not in node.changes:
+                continue
+            ancestor = node.parent
+            while ancestor is not None and ancestor.pk not in refreshed:
+                ancestor = ancestor.parent
+            if ancestor is None:
+                Equipment(pk=node.pk).refresh_descendants()
+                refreshed.add(node.pk)
@@ -0,0 +1,137 @@
+# equipment/services/ordering.py
+
+from django.db import transaction
+from ..models import Equipment, SIBLING_ORDER, invalidate_equipment_tree
+
+# Spacing between consecutive siblings after a rebalance
+POSITION_GAP = 1024
+
+# Upper bound of the position column (PositiveIntegerField)
+MAX_POSITION = 2147483647
+
+class EquipmentOrdering:
+    """
+    Sparse sibling positions for Equipment
+
+    Siblings are kept POSITION_GAP apart, so an item is placed between its
+    new neighbours by taking the midpoint of their positions and only the
+    item itself is written. When two neighbours have no room left between
+    them, that one sibling group is respaced; the rebalance_equipment_positions
+    command does the same for every crowded group in the background.
+    """
+
+    @staticmethod
+    def position_between(lower, upper):
+        """
+        Return a position strictly between two neighbours (None for an open end)
+
+        Returns None when there is no free integer between them.
+        """
+        if upper is None:
+            position = (lower + POSITION_GAP) if lower is not None else POSITION_GAP
+            return position if position <= MAX_POSITION else None
+
+        lower = lower if lower is not None else -1  # Position 0 is usable before the first sibling
+        position = (lower + upper) // 2
+        return position if lower < position < upper else None
+
+    @staticmethod
+    def position_at(positions, index):
+        """Position for an item inserted at index among siblings with the given ordered positions"""
+        index = max(0, min(index, len(positions)))
+        lower = positions[index - 1] if index > 0 else None
+        upper = positions[index] if index < len(positions) else None
+        return EquipmentOrdering.position_between(lower, upper)
+
+    @staticmethod
+    def spaced(count):
+        """Evenly spaced positions for a sibling group of the given size"""
+        gap = max(1, min(POSITION_GAP, MAX_POSITION // (count + 1)))
+        return [gap * (index + 1) for index in range(count)]
+
+    @staticmethod
+    def is_crowded(positions):
+        """True if some neighbours in the ordered positions have no room between them"""
+        if positions and positions[-1] + POSITION_GAP > MAX_POSITION:
+            return True
+        return any(upper - lower < 2 for lower, upper in zip(positions, positions[1:]))
+
+    @staticmethod
+    def sibling_positions(parent_id, exclude=None):
+        """Ordered (id, position) pairs of the children of parent_id (None for the top level)"""
+        siblings = Equipment.objects.filter(parent_id=parent_id)
+        if exclude is not None:
+            siblings = siblings.exclude(pk=exclude)
+        return list(siblings.order_by(*SIBLING_ORDER).values_list('id', 'position'))
+
+    @staticmethod
+    def rebalance(parent_id, exclude=None):
+        """
+        Respace one sibling group, keeping its order
+
+        Returns the ordered (id, position) pairs after the rebalance.
+        """
+        siblings = EquipmentOrdering.sibling_positions(parent_id, exclude)
+        spaced = list(zip([item_id for item_id, position in siblings], EquipmentOrdering.spaced(len(siblings))))
+
+        changed = [
+            Equipment(pk=item_id, position=position)
+            for (item_id, position), (_, old_position) in zip(spaced, siblings)
+            if position != old_position
+        ]
+        if changed:
+            with transaction.atomic():
+                invalidate_equipment_tree()
+                Equipment.objects.bulk_update(changed, ['position'])
+        return spaced
+
+    @staticmethod
+    def place(item_id, parent_id, index):
+        """
+        Return the position that puts an item at index among the children of parent_id
+
+        Usually no other row is touched; a crowded sibling group is respaced first.
+        """
+        siblings = EquipmentOrdering.sibling_positions(parent_id, exclude=item_id)
+        positions = [position for _, position in siblings]
+        position = EquipmentOrdering.position_at(positions, index)
+        if position is None:
+            positions = [position for _, position in EquipmentOrdering.rebalance(parent_id, exclude=item_id)]
+            position = EquipmentOrdering.position_at(positions, index)
+        return position
+
+    @staticmethod
+    def next_position(parent_id):
+        """Position after the last child of parent_id"""
+        last = Equipment.objects.filter(parent_id=parent_id).order_by('-position').values_list('position', flat=True).first()
+        return EquipmentOrdering.position_between(last, None)
+
+    @staticmethod
+    def rebalance_all(force=False, batch_size=1000):
+        """
+        Respace every crowded sibling group (or all of them with force)
+
+        The hierarchy is read once and the changed positions are written with
+        bulk updates. Returns (groups rebalanced, items updated).
+        """
+        groups = {}
+        rows = Equipment.objects.order_by(*SIBLING_ORDER).values_list('id', 'parent_id', 'position')
+        for item_id, parent_id, position in rows.iterator(chunk_size=10000):
+            groups.setdefault(parent_id, []).append((item_id, position))
+
+        rebalanced = 0
+        changed = []
+        for siblings in groups.values():
+            positions = [position for _, position in siblings]
+            if not force and not EquipmentOrdering.is_crowded(positions):
+                continue
+            rebalanced += 1
+            for (item_id, old_position), position in zip(siblings, EquipmentOrdering.spaced(len(siblings))):
+                if position != old_position:
+                    changed.append(Equipment(pk=item_id, position=position))
+
+        if changed:
+            with transaction.atomic():
+                invalidate_equipment_tree()
+                Equipment.objects.bulk_update(changed, ['position'], batch_size=batch_size)
+        return rebalanced, len(changed)
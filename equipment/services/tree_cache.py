@@ -0,0 +1,68 @@
+# equipment/services/tree_cache.py
+
+import hashlib
+import json
+from SSBModel.caching import VersionedCache
+from ..models import Equipment, SIBLING_ORDER
+
+# Superseded payloads are never read again; let them age out
+PAYLOAD_TIMEOUT = 60 * 60 * 24
+
+# Tree payloads; any committed Equipment change replaces the version (see invalidate_equipment_tree)
+TREE_CACHE = VersionedCache('equipment-tree', PAYLOAD_TIMEOUT)
+
+class EquipmentTreeCache:
+    """
+    Serialized jstree payload of the level-based equipment tree
+
+    The payload is built once per tree version and kept in TREE_CACHE. Any
+    committed change to Equipment replaces the version (see the receivers in
+    models.py and the bulk writers).
+    """
+
+    @staticmethod
+    def build_nodes():
+        """Build the flat jstree node list from a single query"""
+        rows = Equipment.objects.values(
+            'id', 'parent_id', 'level', 'code', 'full_code', 'name',
+            'fabricant', 'description', 'status'
+        ).order_by('level', *SIBLING_ORDER)
+
+        tree_data = []
+        for item in rows:
+            label = f'<span class="equipment-level">{item["level"]}</span> {item["name"]} <span class="equipment-code">{item["full_code"]}</span>'
+            tree_data.append({
+                'id': f'equipment_{item["id"]}',
+                'text': label,
+                'parent': f'equipment_{item["parent_id"]}' if item['parent_id'] else '#',
+                'type': item['status'],
+                'data': {
+                    'level': item['level'],
+                    'code': item['code'],
+                    'full_code': item['full_code'],
+                    'baseName': label,
+                    'fabricant': item['fabricant'],
+                    'description': item['description'],
+                    'status': item['status']
+                }
+            })
+        return tree_data
+
+    @staticmethod
+    def get():
+        """
+        Return the cached payload, building it on a miss
+
+        Returns:
+            Dict with 'json' (serialized node list), 'etag' and 'count'
+        """
+        def build_payload():
+            nodes = EquipmentTreeCache.build_nodes()
+            tree_json = json.dumps(nodes)
+            return {
+                'json': tree_json,
+                'etag': hashlib.md5(tree_json.encode('utf-8')).hexdigest(),
+                'count': len(nodes)
+            }
+
+        return TREE_CACHE.get_or_build(('payload',), build_payload)
@@ -1,3 +1,653 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from SSBModel.csv_streaming import csv_lines
+from users.models import UserActivity
+from .models import Equipment, EquipmentMoveError, SIBLING_ORDER
+from .services.batch_move import EquipmentBatchMover
+from .services.csv_export import EquipmentCSVExporter
+from .services.hierarchy import EquipmentHierarchy
+from .services.integrity import EquipmentIntegrityScanner
+from .services.ordering import EquipmentOrdering, POSITION_GAP
+from .services.level_importer import EquipmentLevelImporter
+
+
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_item(code, parent=None, **fields):
+    """Create an equipment item at the level below its parent"""
+    return Equipment.objects.create(
+        code=code,
+        name=fields.pop('name', code.title()),
+        parent=parent,
+        level=parent.level + 1 if parent else 1,
+        **fields
+    )
+
+
+def level_csv(*rows):
+    """CSV records in the level-based import format from (Code, Level, Name) rows"""
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(EquipmentLevelImporter.CSV_COLUMNS)
+    for code, level, name in rows:
+        writer.writerow([code, level, name, '', '', ''])
+    text.seek(0)
+    return csv.DictReader(text)
+
+
+def snapshot():
+    """(full_code, level, parent full_code) of every item, for comparing whole trees"""
+    return sorted(Equipment.objects.values_list('full_code', 'level', 'parent__full_code'))
+
+
+class EquipmentTreeApiTests(TestCase):
+    """The lazy tree API reports child counts from one aggregated query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tree-api-user', password='x')
+        cls.plant = make_item('PLANT')
+        cls.line_b = make_item('LINEB', cls.plant)
+        cls.line_a = make_item('LINEA', cls.plant)
+        cls.pump = make_item('PUMP', cls.line_a)
+        cls.store = make_item('STORE')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def nodes(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return {node['data']['code']: node for node in response.json()}
+
+    def test_root_nodes_carry_child_counts(self):
+        nodes = self.nodes('equipment-tree-data')
+
+        self.assertCountEqual(nodes, ['PLANT', 'STORE'])
+        self.assertEqual(nodes['PLANT']['id'], f'equipment_{self.plant.pk}')
+        self.assertEqual((nodes['PLANT']['children'], nodes['PLANT']['data']['child_count']), (True, 2))
+        self.assertEqual((nodes['STORE']['children'], nodes['STORE']['data']['child_count']), (False, 0))
+
+    def test_children_carry_their_own_counts(self):
+        nodes = self.nodes('equipment-children', node=f'equipment_{self.plant.pk}')
+
+        self.assertCountEqual(nodes, ['LINEA', 'LINEB'])
+        self.assertEqual(nodes['LINEA']['data']['child_count'], 1)
+        self.assertEqual(nodes['LINEB']['data']['child_count'], 0)
+
+    def test_query_count_does_not_grow_with_the_nodes(self):
+        for index in range(5):
+            make_item(f'CELL{index}', self.line_b)
+
+        # Session, user, the existence check and the aggregated node query
+        with self.assertNumQueries(4):
+            self.nodes('equipment-children', node=f'equipment_{self.plant.pk}')
+
+    def test_bad_node_ids_are_reported(self):
+        url = reverse('equipment-children')
+
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'node': 'equipment_x'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'node': 'equipment_999999'}).status_code, 404)
+
+
+class EquipmentMoveTests(TestCase):
+    """Equipment.move_to and the set-based subtree rewrite behind it"""
+
+    def setUp(self):
+        self.plant = make_item('PLANT')
+        self.line = make_item('LINE', self.plant)
+        self.pump = make_item('PUMP', self.line)
+        self.motor = make_item('MOTOR', self.pump)
+        self.store = make_item('STORE')
+
+    def test_move_rewrites_the_subtree(self):
+        self.line.move_to(self.store)
+
+        self.assertEqual(snapshot(), [
+            ('PLANT', 1, None),
+            ('STORE', 1, None),
+            ('STORE-LINE', 2, 'STORE'),
+            ('STORE-LINE-PUMP', 3, 'STORE-LINE'),
+            ('STORE-LINE-PUMP-MOTOR', 4, 'STORE-LINE-PUMP'),
+        ])
+
+    def test_move_to_the_top_level(self):
+        self.pump.move_to(None)
+
+        self.motor.refresh_from_db()
+        self.assertEqual((self.motor.level, self.motor.full_code), (2, 'PUMP-MOTOR'))
+
+    def test_move_under_own_descendant_is_rejected(self):
+        before = snapshot()
+
+        with self.assertRaises(EquipmentMoveError):
+            self.line.move_to(self.motor)
+        with self.assertRaises(EquipmentMoveError):
+            self.line.move_to(self.line)
+
+        self.assertEqual(snapshot(), before)
+
+    def test_move_places_the_item_at_an_index(self):
+        first = make_item('A', self.store)
+        last = make_item('Z', self.store)
+
+        self.pump.move_to(self.store, index=1)
+
+        self.assertEqual(
+            list(self.store.children.values_list('code', flat=True)),
+            ['A', 'PUMP', 'Z']
+        )
+        self.pump.refresh_from_db()
+        first.refresh_from_db()
+        last.refresh_from_db()
+        self.assertLess(first.position, self.pump.position)
+        self.assertLess(self.pump.position, last.position)
+
+    def test_renaming_a_code_refreshes_descendants(self):
+        self.line.code = 'LINE2'
+        self.line.save()
+
+        self.motor.refresh_from_db()
+        self.assertEqual(self.motor.full_code, 'PLANT-LINE2-PUMP-MOTOR')
+
+    def test_refresh_descendants_repairs_stale_rows(self):
+        Equipment.objects.filter(pk__in=[self.pump.pk, self.motor.pk]).update(level=9, full_code='STALE')
+
+        self.line.refresh_descendants()
+
+        self.assertEqual(snapshot()[2:4], [
+            ('PLANT-LINE-PUMP', 3, 'PLANT-LINE'),
+            ('PLANT-LINE-PUMP-MOTOR', 4, 'PLANT-LINE-PUMP'),
+        ])
+
+
+class EquipmentLevelImportTests(TestCase):
+    """Level-based CSV imports planned in memory and written in bulk"""
+
+    ROWS = [
+        ('PLANT', 1, 'Plant'),
+        ('LINE', 2, 'Line'),
+        ('PUMP', 3, 'Pump'),
+        ('VALVE', 3, 'Valve'),
+        ('STORE', 1, 'Store'),
+        ('LINE', 2, 'Store line'),
+    ]
+
+    def test_levels_build_the_hierarchy(self):
+        importer = EquipmentLevelImporter().run(level_csv(*self.ROWS))
+
+        self.assertEqual((importer.created, importer.updated, importer.errors), (6, 0, []))
+        self.assertEqual(snapshot(), [
+            ('PLANT', 1, None),
+            ('PLANT-LINE', 2, 'PLANT'),
+            ('PLANT-LINE-PUMP', 3, 'PLANT-LINE'),
+            ('PLANT-LINE-VALVE', 3, 'PLANT-LINE'),
+            ('STORE', 1, None),
+            ('STORE-LINE', 2, 'STORE'),
+        ])
+        line = Equipment.objects.get(full_code='PLANT-LINE')
+        self.assertEqual(list(line.children.values_list('code', flat=True)), ['PUMP', 'VALVE'])
+
+    def test_dry_run_reports_without_writing(self):
+        importer = EquipmentLevelImporter().run(level_csv(*self.ROWS), dry_run=True)
+
+        self.assertEqual(importer.created, 6)
+        self.assertEqual(len(importer.changed_nodes), 6)
+        self.assertFalse(Equipment.objects.exists())
+
+    def test_reimport_updates_only_changed_rows(self):
+        EquipmentLevelImporter().run(level_csv(*self.ROWS))
+
+        rows = list(self.ROWS)
+        rows[2] = ('PUMP', 3, 'Main pump')
+        importer = EquipmentLevelImporter().run(level_csv(*rows))
+
+        self.assertEqual((importer.created, importer.updated, importer.unchanged), (0, 1, 5))
+        self.assertEqual(Equipment.objects.get(full_code='PLANT-LINE-PUMP').name, 'Main pump')
+        self.assertEqual(Equipment.objects.count(), 6)
+
+    def test_updated_item_refreshes_its_unlisted_children(self):
+        EquipmentLevelImporter().run(level_csv(*self.ROWS))
+        Equipment.objects.filter(full_code__startswith='PLANT-LINE').update(level=7, full_code='STALE')
+
+        # PUMP and VALVE are not in the file but sit below the repaired LINE
+        importer = EquipmentLevelImporter().run(level_csv(('PLANT', 1, 'Plant'), ('LINE', 2, 'Line')))
+
+        self.assertEqual((importer.created, importer.updated), (0, 1))
+        self.assertEqual(snapshot()[:4], [
+            ('PLANT', 1, None),
+            ('PLANT-LINE', 2, 'PLANT'),
+            ('PLANT-LINE-PUMP', 3, 'PLANT-LINE'),
+            ('PLANT-LINE-VALVE', 3, 'PLANT-LINE'),
+        ])
+
+    def test_bad_rows_are_reported(self):
+        importer = EquipmentLevelImporter().run(level_csv(
+            ('PLANT', 1, 'Plant'),
+            ('', 2, 'No code'),
+            ('LINE', 'two', 'Bad level'),
+        ))
+
+        self.assertEqual(importer.created, 1)
+        self.assertEqual([row_number for row_number, code, error in importer.errors], [3, 4])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class EquipmentTreeCacheTests(TestCase):
+    """The level tree payload is cached per version and revalidated by ETag"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('tree-cache-user', password='x')
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plant = make_item('PLANT')
+            self.pump = make_item('PUMP', self.plant)
+
+    def fetch(self, **headers):
+        return self.client.get(reverse('equipment-level-tree-data'), **headers)
+
+    def test_unchanged_tree_is_revalidated_with_304(self):
+        response = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([node['data']['code'] for node in response.json()], ['PLANT', 'PUMP'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        revalidated = self.fetch(HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_cached_payload_is_served_without_equipment_queries(self):
+        self.fetch()
+
+        # Only the session and the user are loaded
+        with self.assertNumQueries(2):
+            self.assertEqual(self.fetch().status_code, 200)
+
+    def test_committed_write_replaces_the_payload(self):
+        etag = self.fetch()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pump.name = 'Feed pump'
+            self.pump.save()
+        response = self.fetch(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Feed pump', response.json()[1]['text'])
+
+    def test_bulk_delete_replaces_the_payload(self):
+        etag = self.fetch()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Equipment.objects.filter(pk=self.pump.pk).delete()
+
+        self.assertEqual(len(self.fetch(HTTP_IF_NONE_MATCH=etag).json()), 1)
+
+
+class EquipmentHierarchyTests(TestCase):
+    """The recursive CTE and the level-by-level fallback give the same answers"""
+
+    def setUp(self):
+        self.plant = make_item('PLANT')
+        self.line = make_item('LINE', self.plant)
+        self.pump = make_item('PUMP', self.line)
+        self.motor = make_item('MOTOR', self.pump)
+        self.valve = make_item('VALVE', self.line)
+        self.store = make_item('STORE')
+
+    def answers(self, call):
+        """The fallback's answer, checked against the CTE's where PostgreSQL is in use"""
+        with mock.patch.object(EquipmentHierarchy, '_use_cte', return_value=False):
+            fallback = call()
+        if EquipmentHierarchy._use_cte():
+            self.assertEqual(call(), fallback)
+        return fallback
+
+    def make_cycle(self):
+        """LOOPA -> LOOPB -> LOOPA, with TAIL hanging below it"""
+        loop_a = make_item('LOOPA')
+        loop_b = make_item('LOOPB', loop_a)
+        tail = make_item('TAIL', loop_b)
+        # Written around save(), which refuses cycles
+        Equipment.objects.filter(pk=loop_a.pk).update(parent=loop_b)
+        return loop_a, loop_b, tail
+
+    def test_ancestors_are_nearest_first(self):
+        self.assertEqual(self.answers(lambda: EquipmentHierarchy.ancestor_ids(self.motor.pk)),
+                         [self.pump.pk, self.line.pk, self.plant.pk])
+        self.assertEqual(self.answers(lambda: EquipmentHierarchy.ancestor_ids(self.line.pk, include_self=True)),
+                         [self.line.pk, self.plant.pk])
+        self.assertEqual(self.answers(lambda: EquipmentHierarchy.ancestor_ids(self.store.pk)), [])
+        self.assertTrue(self.answers(lambda: EquipmentHierarchy.is_ancestor(self.plant.pk, self.motor.pk)))
+        self.assertFalse(self.answers(lambda: EquipmentHierarchy.is_ancestor(self.valve.pk, self.motor.pk)))
+
+    def test_fallback_reads_one_level_per_query(self):
+        with mock.patch.object(EquipmentHierarchy, '_use_cte', return_value=False):
+            with self.assertNumQueries(4):
+                EquipmentHierarchy.ancestor_ids(self.motor.pk)
+            with self.assertNumQueries(4):
+                EquipmentHierarchy.descendant_ids(self.plant.pk)
+
+    def test_descendants(self):
+        self.assertCountEqual(self.answers(lambda: EquipmentHierarchy.descendant_ids(self.line.pk)),
+                              [self.pump.pk, self.motor.pk, self.valve.pk])
+        self.assertEqual(self.answers(lambda: EquipmentHierarchy.descendant_ids(self.motor.pk)), [])
+
+    def test_walks_stop_at_cycles(self):
+        loop_a, loop_b, tail = self.make_cycle()
+
+        self.assertEqual(self.answers(lambda: EquipmentHierarchy.ancestor_ids(tail.pk)), [loop_b.pk, loop_a.pk])
+        self.assertCountEqual(self.answers(lambda: EquipmentHierarchy.descendant_ids(loop_a.pk)),
+                              [loop_b.pk, tail.pk])
+
+    def test_only_the_cycle_itself_is_reported(self):
+        self.assertEqual(self.answers(EquipmentHierarchy.find_cycles), [])
+
+        loop_a, loop_b, tail = self.make_cycle()
+
+        self.assertEqual(self.answers(EquipmentHierarchy.find_cycles), [[loop_a.pk, loop_b.pk]])
+
+    def test_subtree_and_ancestor_rows(self):
+        fields = ['id', 'code']
+
+        self.assertCountEqual(
+            self.answers(lambda: EquipmentHierarchy.subtree_rows([self.pump.pk, self.valve.pk], fields)),
+            [(self.pump.pk, 'PUMP'), (self.motor.pk, 'MOTOR'), (self.valve.pk, 'VALVE')]
+        )
+        self.assertCountEqual(
+            self.answers(lambda: EquipmentHierarchy.ancestor_rows([self.motor.pk, self.store.pk], fields)),
+            [(self.motor.pk, 'MOTOR'), (self.pump.pk, 'PUMP'), (self.line.pk, 'LINE'),
+             (self.plant.pk, 'PLANT'), (self.store.pk, 'STORE')]
+        )
+        self.assertEqual(EquipmentHierarchy.subtree_rows([], fields), [])
+
+    def test_paths_run_from_the_root(self):
+        paths = self.answers(lambda: EquipmentHierarchy.paths_to_root([self.motor.pk, self.store.pk, 999999]))
+
+        self.assertEqual([item['code'] for item in paths[self.motor.pk]], ['PLANT', 'LINE', 'PUMP', 'MOTOR'])
+        self.assertEqual(paths[self.motor.pk][-1]['full_code'], 'PLANT-LINE-PUMP-MOTOR')
+        self.assertEqual([item['code'] for item in paths[self.store.pk]], ['STORE'])
+        self.assertNotIn(999999, paths)
+
+
+class EquipmentCSVExportTests(TestCase):
+    """The level-based export reads back into the same tree"""
+
+    def setUp(self):
+        plant = make_item('PLANT')
+        line = make_item('LINE', plant, fabricant='ACME')
+        make_item('VALVE', line)
+        pump = make_item('PUMP', line, description='Main, "primary" pump')
+        make_item('STORE')
+        # Display order differs from code order
+        pump.move_to(line, index=0)
+
+    def tree(self):
+        """Every item with its data, siblings in display order"""
+        items = []
+        def walk(parent_id):
+            for item in Equipment.objects.filter(parent_id=parent_id).order_by(*SIBLING_ORDER):
+                items.append((item.full_code, item.level, item.name, item.description, item.fabricant))
+                walk(item.pk)
+        walk(None)
+        return items
+
+    def test_export_is_depth_first_in_display_order(self):
+        rows = list(EquipmentCSVExporter.iter_rows())
+
+        self.assertEqual([(row[0], row[1]) for row in rows], [
+            ('PLANT', 1), ('LINE', 2), ('PUMP', 3), ('VALVE', 3), ('STORE', 1),
+        ])
+
+    def test_round_trip_through_the_level_importer(self):
+        before = self.tree()
+        text = ''.join(csv_lines(EquipmentCSVExporter.CSV_COLUMNS, EquipmentCSVExporter.iter_rows()))
+
+        importer = EquipmentLevelImporter(clear_existing=True).run(csv.DictReader(io.StringIO(text)))
+
+        self.assertEqual((importer.created, importer.errors), (5, []))
+        self.assertEqual(self.tree(), before)
+
+    def test_export_view_streams_and_logs_once(self):
+        user = User.objects.create_user('exporter', password='x')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('export-equipment-csv'))
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="equipment_export.csv"')
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(
+            list(UserActivity.objects.filter(user=user).values_list('activity_type', 'description')),
+            [('csv_export', 'Exported 5 equipment items to CSV')]
+        )
+
+
+class EquipmentBatchMoveTests(TestCase):
+    """Drag-and-drop batches validated against a partial snapshot and written in bulk"""
+
+    def setUp(self):
+        self.plant = make_item('PLANT')
+        self.line = make_item('LINE', self.plant)
+        self.pump = make_item('PUMP', self.line)
+        self.motor = make_item('MOTOR', self.pump)
+        self.store = make_item('STORE')
+        self.shelf = make_item('SHELF', self.store)
+
+    def children(self, parent):
+        return list(Equipment.objects.filter(parent=parent).order_by(*SIBLING_ORDER).values_list('code', flat=True))
+
+    def test_moves_are_replayed_in_order(self):
+        mover = EquipmentBatchMover().apply([
+            (self.pump.pk, self.store.pk, 0),
+            (self.line.pk, None, 0),
+        ])
+
+        self.assertEqual(mover.moved, [self.pump.pk, self.line.pk])
+        self.assertEqual(self.children(self.store), ['PUMP', 'SHELF'])
+        self.assertEqual(self.children(None), ['LINE', 'PLANT', 'STORE'])
+        self.motor.refresh_from_db()
+        self.assertEqual((self.motor.level, self.motor.full_code), (3, 'STORE-PUMP-MOTOR'))
+        self.assertEqual(Equipment.objects.get(pk=self.line.pk).full_code, 'LINE')
+
+    def test_cycle_rejects_the_whole_batch(self):
+        before = snapshot()
+
+        with self.assertRaises(EquipmentMoveError):
+            EquipmentBatchMover().apply([
+                (self.shelf.pk, None, 0),
+                (self.plant.pk, self.motor.pk, 0),
+            ])
+        self.assertEqual(snapshot(), before)
+
+    def test_cycle_through_an_earlier_move_is_rejected(self):
+        # After the first move STORE sits below MOTOR, so PLANT cannot go under SHELF
+        with self.assertRaises(EquipmentMoveError):
+            EquipmentBatchMover().apply([
+                (self.store.pk, self.motor.pk, 0),
+                (self.plant.pk, self.shelf.pk, 0),
+            ])
+
+    def test_duplicate_code_and_missing_items_are_rejected(self):
+        make_item('PUMP', self.store)
+        for moves in ([(self.pump.pk, self.store.pk, 0)],
+                      [(self.pump.pk, 999999, 0)],
+                      [(999999, None, 0)]):
+            with self.assertRaises(EquipmentMoveError):
+                EquipmentBatchMover().apply(moves)
+
+    def test_move_view_applies_a_batch(self):
+        user = User.objects.create_user('mover', password='x')
+        user.profile.role = 'engineer'
+        user.profile.save()
+        self.client.force_login(user)
+
+        response = self.client.post(reverse('move-equipment-batch'), json.dumps({'moves': [
+            {'id': self.pump.pk, 'parent_id': self.store.pk, 'position': 1},
+        ]}), content_type='application/json')
+
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(self.children(self.store), ['SHELF', 'PUMP'])
+
+        response = self.client.post(reverse('move-equipment-batch'), json.dumps({'moves': [
+            {'id': self.store.pk, 'parent_id': self.motor.pk, 'position': 0},
+        ]}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class EquipmentIntegrityScannerTests(TestCase):
+    """The in-memory scan reports what fix() writes, and fix() leaves a clean tree"""
+
+    def setUp(self):
+        self.plant = make_item('PLANT')
+        self.line = make_item('LINE', self.plant)
+        self.pump = make_item('PUMP', self.line)
+        self.valve = make_item('VALVE', self.line)
+
+    def test_clean_tree_has_no_issues(self):
+        scanner = EquipmentIntegrityScanner().scan()
+
+        self.assertEqual(scanner.issue_count, 0)
+        self.assertEqual(scanner.fix(), 0)
+
+    def test_stale_levels_codes_and_positions_are_found_and_fixed(self):
+        Equipment.objects.filter(pk=self.pump.pk).update(level=5, full_code='WRONG')
+        Equipment.objects.filter(pk__in=[self.pump.pk, self.valve.pk]).update(position=7)
+
+        scanner = EquipmentIntegrityScanner().scan()
+
+        self.assertEqual(scanner.level_mismatches, [(self.pump.pk, 5, 3)])
+        self.assertEqual(scanner.stale_full_codes, [(self.pump.pk, 'WRONG', 'PLANT-LINE-PUMP')])
+        self.assertEqual(scanner.duplicate_positions, [(self.line.pk, 7, [self.pump.pk, self.valve.pk])])
+
+        scanner.fix()
+        self.assertEqual(EquipmentIntegrityScanner().scan().issue_count, 0)
+        self.assertEqual(list(self.line.children.order_by(*SIBLING_ORDER).values_list('code', flat=True)),
+                         ['PUMP', 'VALVE'])
+
+    def test_cycles_and_orphans_become_top_level(self):
+        # PLANT -> LINE -> PLANT, and PUMP pointing at a deleted parent
+        Equipment.objects.filter(pk=self.plant.pk).update(parent_id=self.line.pk)
+        Equipment.objects.filter(pk=self.valve.pk).update(parent_id=999999)
+
+        scanner = EquipmentIntegrityScanner().scan()
+
+        self.assertEqual(scanner.cycles, [[self.plant.pk, self.line.pk]])
+        self.assertEqual(scanner.orphans, [self.valve.pk])
+        self.assertEqual(scanner.unreachable, [])
+
+        scanner.fix()
+        self.assertEqual(EquipmentIntegrityScanner().scan().issue_count, 0)
+        self.assertEqual(snapshot(), [
+            ('PLANT', 1, None),
+            ('PLANT-LINE', 2, 'PLANT'),
+            ('PLANT-LINE-PUMP', 3, 'PLANT-LINE'),
+            ('VALVE', 1, None),
+        ])
+
+
+class EquipmentOrderingTests(TestCase):
+    """Sparse sibling positions: midpoint placement and rebalancing"""
+
+    def setUp(self):
+        self.plant = make_item('PLANT')
+        self.first = make_item('FIRST', self.plant)
+        self.second = make_item('SECOND', self.plant)
+        self.third = make_item('THIRD', self.plant)
+
+    def children(self):
+        return list(self.plant.children.order_by(*SIBLING_ORDER).values_list('code', flat=True))
+
+    def positions(self):
+        return list(self.plant.children.order_by(*SIBLING_ORDER).values_list('position', flat=True))
+
+    def test_new_items_are_appended_with_a_gap(self):
+        self.assertEqual(self.positions(), [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP])
+
+    def test_explicit_position_zero_is_kept(self):
+        item = make_item('ZERO', self.plant, position=0)
+
+        item.refresh_from_db()
+        self.assertEqual(item.position, 0)
+        self.assertEqual(self.children()[0], 'ZERO')
+
+    def test_place_takes_the_midpoint_without_touching_siblings(self):
+        self.assertEqual(EquipmentOrdering.place(self.third.pk, self.plant.pk, 1), POSITION_GAP * 3 // 2)
+        self.assertEqual(EquipmentOrdering.place(self.third.pk, self.plant.pk, 0), (POSITION_GAP - 1) // 2)
+        self.assertEqual(self.positions(), [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP])
+
+    def test_crowded_group_is_rebalanced_before_placing(self):
+        Equipment.objects.filter(pk=self.first.pk).update(position=5)
+        Equipment.objects.filter(pk=self.second.pk).update(position=6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.third.move_to(self.plant, index=1)
+
+        self.assertEqual(self.children(), ['FIRST', 'THIRD', 'SECOND'])
+        self.assertEqual(self.positions(), [POSITION_GAP, POSITION_GAP * 3 // 2, 2 * POSITION_GAP])
+
+    def test_rebalance_all_respaces_only_crowded_groups(self):
+        store = make_item('STORE')
+        Equipment.objects.filter(pk=self.second.pk).update(position=POSITION_GAP + 1)
+
+        self.assertEqual(EquipmentOrdering.rebalance_all(), (1, 1))
+        self.assertEqual(self.positions(), [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP])
+        self.assertEqual(Equipment.objects.get(pk=store.pk).position, store.position)
+
+
+class EquipmentSearchApiTests(TestCase):
+    """The search API pages through matches and returns their ancestor paths"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('search-user', password='x')
+        cls.plant = make_item('PLANT')
+        cls.line = make_item('LINE', cls.plant)
+        cls.pumps = [make_item(f'PUMP{index}', cls.line, fabricant='Grundfos') for index in range(3)]
+        cls.spare = make_item('SPARE', fabricant='KSB', status='inactive')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def search(self, **params):
+        response = self.client.get(reverse('equipment-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_without_counting(self):
+        first = self.search(q='grundfos', page_size=2)
+        last = self.search(q='grundfos', page_size=2, page=2)
+
+        self.assertEqual([row['code'] for row in first['results']], ['PUMP0', 'PUMP1'])
+        self.assertTrue(first['has_next'])
+        self.assertEqual([row['code'] for row in last['results']], ['PUMP2'])
+        self.assertFalse(last['has_next'])
+
+    def test_results_carry_their_ancestor_paths(self):
+        result = self.search(code='PLANT-LINE-PUMP1')['results'][0]
+
+        self.assertEqual(result['node_id'], f'equipment_{self.pumps[1].pk}')
+        self.assertEqual([item['code'] for item in result['path']], ['PLANT', 'LINE'])
+        self.assertEqual(result['path_ids'], [f'equipment_{self.plant.pk}', f'equipment_{self.line.pk}'])
+
+    def test_code_prefix_and_status_filters(self):
+        self.assertEqual([row['code'] for row in self.search(q='plant-line')['results']],
+                         ['LINE', 'PUMP0', 'PUMP1', 'PUMP2'])
+        self.assertEqual([row['code'] for row in self.search(status='inactive')['results']], ['SPARE'])
+
+    def test_bad_parameters_are_rejected(self):
+        url = reverse('equipment-search')
+
+        self.assertEqual(self.client.get(url, {'status': 'lost'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'page': 'two'}).status_code, 400)
 
-# Create your tests here.
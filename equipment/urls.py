@@ -1,6 +1,7 @@
 # equipment/urls.py
 from django.urls import path
 from . import views
+from . import api_views
 from .views import import_equipment_level_csv, equipment_level_tree_view, update_equipment_position
 
 urlpatterns = [
@@ -13,8 +14,14 @@ urlpatterns = [
     
     # Tree views
     path('tree/', equipment_level_tree_view, name='equipment-tree'),
+    path('tree/data/', views.equipment_level_tree_data, name='equipment-level-tree-data'),
     path('update-position/', update_equipment_position, name='update-equipment-position'),
+    path('move-batch/', views.move_equipment_batch, name='move-equipment-batch'),
+    path('api/tree/', api_views.get_equipment_tree_data, name='equipment-tree-data'),
+    path('api/children/', api_views.get_equipment_children, name='equipment-children'),
+    path('api/search/', api_views.search_equipment, name='equipment-search'),
     
     # CSV import/export
     path('import-csv/', import_equipment_level_csv, name='import-level-csv'),
+    path('export-csv/', views.export_equipment_csv, name='export-equipment-csv'),
 ]
\ No newline at end of file
@@ -1,6 +1,6 @@
 # equipment/views.py
+import codecs
 import csv
-import io
 import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
@@ -9,19 +9,55 @@ from django.http import JsonResponse, HttpResponse
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.contrib import messages
-from django.views.decorators.http import require_POST
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 
 
+from SSBModel.csv_streaming import streaming_csv_response
 from users.models import UserActivity
 from users.decorators import can_add_parts, can_edit_parts, can_delete_parts, can_upload_csv
-from .models import Equipment, EquipmentCategory
+from .models import Equipment, EquipmentCategory, EquipmentMoveError, SIBLING_ORDER
 from .forms import EquipmentForm, EquipmentCategoryForm, EquipmentCSVImportForm
+from .services.batch_move import EquipmentBatchMover
+from .services.csv_export import EquipmentCSVExporter
+from .services.equipment_search import EquipmentSearch
+from .services.level_importer import EquipmentLevelImporter
+from .services.tree_cache import EquipmentTreeCache
+
+# Limits on what an import reports back to the page
+MAX_REPORTED_ERRORS = 10
+MAX_REPORTED_CHANGES = 200
 
 # Equipment CRUD views
 class EquipmentListView(ListView):
     model = Equipment
     template_name = 'equipment/equipment_list.html'
     context_object_name = 'equipment_list'
+    paginate_by = 50
+    
+    def get_queryset(self):
+        # Filtered in the database with the same indexed lookups as the search API
+        return EquipmentSearch.filter(
+            Equipment.objects.all(),
+            term=self.request.GET.get('q', '').strip(),
+            code=self.request.GET.get('code', '').strip(),
+            status=self.request.GET.get('status', '').strip()
+        )
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search'] = {
+            'q': self.request.GET.get('q', ''),
+            'code': self.request.GET.get('code', ''),
+            'status': self.request.GET.get('status', ''),
+        }
+        context['status_choices'] = Equipment._meta.get_field('status').choices
+        
+        # Keep the filters on the pagination links
+        filter_query = self.request.GET.copy()
+        filter_query.pop('page', None)
+        context['filter_query'] = filter_query.urlencode()
+        return context
 
 class EquipmentDetailView(DetailView):
     model = Equipment
@@ -61,41 +97,23 @@ def equipment_tree_view(request):
 
 @login_required
 def equipment_level_tree_view(request):
-    """Render the equipment tree with data based on level hierarchy"""
-    # Get all equipment items
-    equipment_items = Equipment.objects.all().order_by('level', 'position', 'code')
-    
-    # Prepare data for jstree
-    tree_data = []
-    for item in equipment_items:
-        # Determine parent ID for tree structure
-        parent_id = f'equipment_{item.parent_id}' if item.parent else '#'
-        
-        # Create node data with additional information
-        node = {
-            'id': f'equipment_{item.id}',
-            'text': f'<span class="equipment-level">{item.level}</span> {item.name} <span class="equipment-code">{item.full_code}</span>',
-            'parent': parent_id,
-            'type': item.status,
-            'data': {
-                'level': item.level,
-                'code': item.code,
-                'full_code': item.full_code,
-                'baseName': f'<span class="equipment-level">{item.level}</span> {item.name} <span class="equipment-code">{item.full_code}</span>',
-                'fabricant': item.fabricant,
-                'description': item.description,
-                'status': item.status
-            }
-        }
-        tree_data.append(node)
-    
-    # Convert to JSON for the template
-    tree_data_json = json.dumps(tree_data)
+    """Render the equipment tree page; the nodes are loaded from equipment_level_tree_data"""
+    return render(request, 'equipment/level_based_tree.html')
+
+def _level_tree_etag(request):
+    return EquipmentTreeCache.get()['etag']
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_level_tree_etag)
+def equipment_level_tree_data(request):
+    """
+    Serve the level-based tree as jstree JSON from the tree cache
     
-    return render(request, 'equipment/level_based_tree.html', {
-        'tree_data_json': tree_data_json,
-        'equipment_count': equipment_items.count()
-    })
+    Browsers revalidate with If-None-Match and get a 304 while the hierarchy
+    is unchanged.
+    """
+    return HttpResponse(EquipmentTreeCache.get()['json'], content_type='application/json')
 
 # AJAX endpoints for tree operations
 @login_required
@@ -112,38 +130,16 @@ def update_equipment_position(request):
         
         # Get the equipment to update
         equipment = Equipment.objects.get(id=equipment_id)
+        parent = Equipment.objects.get(id=parent_id) if parent_id else None
         
-        # Check for circular reference if parent is provided
-        if parent_id:
-            # Get the new parent
-            parent = Equipment.objects.get(id=parent_id)
-            
-            # Check that this parent is not a descendant of the equipment
-            current = parent
-            while current:
-                if current.id == equipment.id:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': 'Cannot create circular reference'
-                    }, status=400)
-                current = current.parent
-            
-            # Update parent if different
-            if equipment.parent_id != parent.id:
-                equipment.parent = parent
-                # Update level based on parent's level
-                equipment.level = parent.level + 1
-        else:
-            # If no parent, set as top level
-            equipment.parent = None
-            equipment.level = 1
-        
-        # Update position
-        equipment.position = position
-        equipment.save()
-        
-        # Update all children's levels recursively
-        update_children_levels(equipment)
+        # Re-parent and re-level the whole subtree in one transaction
+        try:
+            equipment.move_to(parent, index=position)
+        except EquipmentMoveError:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Cannot create circular reference'
+            }, status=400)
         
         return JsonResponse({
             'status': 'success',
@@ -162,115 +158,96 @@ def update_equipment_position(request):
             'message': str(e)
         }, status=500)
 
+@login_required
+@can_edit_parts
+@require_POST
+def move_equipment_batch(request):
+    """API endpoint for applying several drag-and-drop moves at once"""
+    try:
+        data = json.loads(request.body)
+        mover = EquipmentBatchMover()
+        mover.apply(mover.parse_moves(data.get('moves') if isinstance(data, dict) else data))
+    except (ValueError, EquipmentMoveError) as e:
+        # Malformed JSON or a rejected move; nothing has been written
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    # One activity entry for the whole batch
+    UserActivity.objects.create(
+        user=request.user,
+        activity_type='equipment_position_update',
+        description=f'Moved {len(mover.moved)} equipment items ({mover.updated} items updated)',
+        ip_address=request.META.get('REMOTE_ADDR')
+    )
+    
+    return JsonResponse({
+        'status': 'success',
+        'moved': len(mover.moved),
+        'updated': mover.updated
+    })
+
 # NEW CSV IMPORT
 @login_required
 @can_upload_csv
 def import_equipment_level_csv(request):
-    """Import equipment hierarchy from CSV using level-based structuring"""
+    """
+    Import equipment hierarchy from CSV using level-based structuring
+    
+    Unlike part imports this runs within the request rather than through the
+    import job queue: the importer plans in memory and writes with a few bulk
+    statements, and dry runs report their planned changes on this page.
+    """
+    report = None
+    
     if request.method == 'POST':
         form = EquipmentCSVImportForm(request.POST, request.FILES)
         if form.is_valid():
             csv_file = request.FILES['csv_file']
-            update_existing = form.cleaned_data['update_existing']
-            clear_existing = form.cleaned_data.get('clear_existing', False)
-            
-            # Clear existing data if requested
-            if clear_existing:
-                Equipment.objects.all().delete()
-                messages.success(request, "All existing equipment data has been cleared.")
+            dry_run = form.cleaned_data.get('dry_run', False)
             
-            # Process CSV file
             try:
-                decoded_file = csv_file.read().decode('utf-8')
-                io_string = io.StringIO(decoded_file)
-                reader = csv.DictReader(io_string)
+                # Decode line by line so the upload is never held in memory whole
+                reader = csv.DictReader(codecs.iterdecode(csv_file, 'utf-8'))
                 
-                # Track items by level for building the hierarchy
-                level_stack = {}  # Will store the latest item for each level
-                created_count = 0
-                updated_count = 0
-                error_count = 0
+                importer = EquipmentLevelImporter(
+                    update_existing=form.cleaned_data['update_existing'],
+                    clear_existing=form.cleaned_data.get('clear_existing', False)
+                ).run(reader, dry_run=dry_run)
                 
-                # Process each row in the CSV
-                for row in reader:
-                    # Extract basic fields
-                    code = row.get('Code', '')
-                    level = int(row.get('Level', 1))
-                    name = row.get('Name', '')
-                    fabricant = row.get('Fabricant', '')
-                    description = row.get('Reference', '')
-                    doc_reference = row.get('Doc Ref', '')
-                    
-                    if not code or not name:
-                        error_count += 1
-                        continue
-                    
-                    try:
-                        # Determine parent based on level
-                        parent = None
-                        if level > 1 and level - 1 in level_stack:
-                            parent = level_stack[level - 1]
-                        
-                        # Check if equipment with this code and parent already exists
-                        try:
-                            if parent:
-                                equipment = Equipment.objects.get(code=code, parent=parent)
-                                is_new = False
-                            else:
-                                equipment = Equipment.objects.get(code=code, parent__isnull=True)
-                                is_new = False
-                        except Equipment.DoesNotExist:
-                            equipment = Equipment(code=code)
-                            is_new = True
-                        
-                        if is_new or update_existing:
-                            # Update equipment attributes
-                            equipment.name = name
-                            equipment.level = level
-                            equipment.parent = parent
-                            equipment.fabricant = fabricant
-                            equipment.description = description
-                            equipment.doc_reference = doc_reference
-                            
-                            # Calculate position based on order in CSV
-                            equipment.position = Equipment.objects.filter(
-                                level=level, 
-                                parent=parent
-                            ).count()
-                            
-                            equipment.save()
-                            
-                            # Update counts for reporting
-                            if is_new:
-                                created_count += 1
-                            else:
-                                updated_count += 1
-                            
-                            # Update level stack to track this item for child references
-                            level_stack[level] = equipment
-                            
-                            # Clear any higher levels when we move to a new branch
-                            for l in list(level_stack.keys()):
-                                if l > level:
-                                    del level_stack[l]
-                    
-                    except Exception as e:
-                        error_count += 1
-                        messages.error(request, f"Error processing row with code {code}: {str(e)}")
+                # Report only the first few row errors as messages
+                for row_number, code, error in importer.errors[:MAX_REPORTED_ERRORS]:
+                    messages.error(request, f"Error processing row {row_number} with code {code}: {error}")
+                if len(importer.errors) > MAX_REPORTED_ERRORS:
+                    messages.error(request, f"... and {len(importer.errors) - MAX_REPORTED_ERRORS} more errors")
                 
-                # Log the activity
-                UserActivity.objects.create(
-                    user=request.user,
-                    activity_type='csv_import',
-                    description=f'Imported equipment hierarchy from CSV: {created_count} created, {updated_count} updated',
-                    ip_address=request.META.get('REMOTE_ADDR')
+                summary = (
+                    f'{importer.created} created, {importer.updated} updated, '
+                    f'{importer.unchanged} unchanged, {importer.skipped} skipped, {len(importer.errors)} errors'
                 )
                 
-                messages.success(
-                    request, 
-                    f'Import complete: {created_count} created, {updated_count} updated, {error_count} errors.'
-                )
-                return redirect('equipment-tree')
+                if dry_run:
+                    # Show the planned changes on the import page instead of applying them
+                    messages.info(request, f'Dry run: {summary}. Nothing was saved.')
+                    report = {
+                        'changes': importer.changed_nodes[:MAX_REPORTED_CHANGES],
+                        'total_changes': len(importer.changed_nodes),
+                        'errors': importer.errors[:MAX_REPORTED_CHANGES],
+                    }
+                else:
+                    if form.cleaned_data.get('clear_existing', False):
+                        messages.success(request, "All existing equipment data has been cleared.")
+                    
+                    # Log the activity
+                    UserActivity.objects.create(
+                        user=request.user,
+                        activity_type='csv_import',
+                        description=f'Imported equipment hierarchy from CSV: {importer.created} created, {importer.updated} updated',
+                        ip_address=request.META.get('REMOTE_ADDR')
+                    )
+                    
+                    messages.success(request, f'Import complete: {summary}.')
+                    return redirect('equipment-tree')
             
             except Exception as e:
                 messages.error(request, f"Error processing CSV file: {str(e)}")
@@ -279,7 +256,8 @@ def import_equipment_level_csv(request):
     
     return render(request, 'equipment/import_level_csv.html', {
         'form': form,
-        'csv_columns': ['Code', 'Level', 'Name', 'Reference', 'Fabricant', 'Doc Ref'],
+        'report': report,
+        'csv_columns': EquipmentLevelImporter.CSV_COLUMNS,
     })
 
 
@@ -295,9 +273,7 @@ def import_equipment_csv(request):
             update_existing = form.cleaned_data['update_existing']
             
             # Process CSV file
-            decoded_file = csv_file.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
+            reader = csv.DictReader(codecs.iterdecode(csv_file, 'utf-8'))
             
             created_count = 0
             updated_count = 0
@@ -352,24 +328,11 @@ def import_equipment_csv(request):
 
 @login_required
 def export_equipment_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="equipment_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['code', 'name', 'description', 'status', 'location', 'parent_code', 'category_name'])
-    
-    for equipment in Equipment.objects.all():
-        writer.writerow([
-            equipment.code,
-            equipment.name,
-            equipment.description,
-            equipment.status,
-            equipment.location,
-            equipment.parent.code if equipment.parent else '',
-            equipment.category.name if equipment.category else ''
-        ])
-        
-    return response
+    """Export the equipment hierarchy in the level-based import format, streamed as it is read"""
+    return streaming_csv_response(
+        request, EquipmentCSVExporter.CSV_COLUMNS, EquipmentCSVExporter.iter_rows(),
+        'equipment_export.csv', 'equipment items'
+    )
 
 
 @login_required
@@ -379,7 +342,7 @@ def equipment_direct_tree_view(request):
     instead of loading via AJAX
     """
     # Get all equipment
-    equipment_items = Equipment.objects.all().order_by('position', 'name')
+    equipment_items = Equipment.objects.order_by(*SIBLING_ORDER)
     categories = EquipmentCategory.objects.all()
     
     # Prepare data for the tree
@@ -406,14 +369,3 @@ def equipment_direct_tree_view(request):
         'tree_data_json': tree_data_json,
         'categories': categories,
     })
-
-def update_children_levels(equipment):
-    """Recursively update the level of all children based on parent's level"""
-    children = Equipment.objects.filter(parent=equipment)
-    
-    for child in children:
-        child.level = equipment.level + 1
-        child.save()
-        
-        # Recursively update grandchildren
-        update_children_levels(child)
\ No newline at end of file
@@ -2,6 +2,8 @@
 
 from django import forms
 from .models import Part, Document, MarkedPart
+from .services.csv_handler import STREAMING_REPLACE_ALL_ERROR
+from .services.part_filter import PartFilter
 
 class PartForm(forms.ModelForm):
     """Form for creating and updating parts"""
@@ -37,10 +39,9 @@ class PartForm(forms.ModelForm):
             self.fields['parent'].queryset = Part.objects.exclude(pk=self.instance.pk)
             
             # Don't allow selecting any children as parent (would create a cycle)
-            children = self.instance.get_all_children()
-            if children:
+            if self.instance.tree_path:
                 self.fields['parent'].queryset = self.fields['parent'].queryset.exclude(
-                    pk__in=[child.pk for child in children]
+                    tree_path__startswith=self.instance.tree_path
                 )
         
         # Sort parent options by ID for easier selection
@@ -107,6 +108,26 @@ class ImportCSVForm(forms.Form):
         required=False,
         initial=True
     )
+    
+    streaming = forms.BooleanField(
+        label='Stream large file in batches',
+        required=False,
+        initial=False,
+        help_text='Read and commit the file in chunks to keep memory use flat'
+    )
+    
+    run_in_background = forms.BooleanField(
+        label='Run import in the background',
+        required=False,
+        initial=True,
+        help_text='Queue the import and follow its progress instead of waiting for it (needs a running import worker)'
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('streaming') and cleaned_data.get('update_mode') == 'replace_all':
+            raise forms.ValidationError(STREAMING_REPLACE_ALL_ERROR)
+        return cleaned_data
 
 class PartSearchForm(forms.Form):
     """Form for searching parts"""
@@ -135,4 +156,15 @@ class PartSearchForm(forms.Form):
     is_marked = forms.BooleanField(
         required=False,
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
-    )
\ No newline at end of file
+    )
+    
+    root = forms.ModelChoiceField(
+        queryset=Part.objects.all(),
+        required=False,
+        widget=forms.HiddenInput(),
+        help_text='Limit results to this part and its descendants'
+    )
+    
+    def filter_parts(self, queryset, user):
+        """Apply the validated filters to a Part queryset"""
+        return PartFilter.apply(queryset, user, **self.cleaned_data)
\ No newline at end of file
@@ -0,0 +1,19 @@
+# parts/management/commands/rebuild_part_tree.py
+from django.core.management.base import BaseCommand
+from parts.models import Part
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized tree paths of all parts from their parent links'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows written per bulk update')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding part tree index...')
+        
+        updated = Part.rebuild_tree_paths(batch_size=options['batch_size'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Tree index rebuilt: {updated} of {Part.objects.count()} parts updated'
+        ))
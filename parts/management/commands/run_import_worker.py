@@ -0,0 +1,38 @@
+# parts/management/commands/run_import_worker.py
+import time
+from django.core.management.base import BaseCommand
+from parts.services.import_jobs import ImportJobQueue
+
+class Command(BaseCommand):
+    help = 'Process queued CSV imports (run several workers to import in parallel)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process the jobs currently queued, then exit')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait between polls when the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Import worker started'))
+        
+        while True:
+            job = ImportJobQueue.claim_next()
+            
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            
+            self.stdout.write(f'Running import {job.pk}: {job.file_name}')
+            job = ImportJobQueue.run(job)
+            
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(
+                    f'Import {job.pk} completed - Added: {job.parts_added}, '
+                    f'Updated: {job.parts_updated}, Skipped: {job.parts_skipped}'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f'Import {job.pk} failed: {job.log_message}'))
+        
+        self.stdout.write(self.style.SUCCESS('Import worker stopped'))
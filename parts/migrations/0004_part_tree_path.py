@@ -0,0 +1,45 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+def populate_tree_paths(apps, schema_editor):
+    """Compute the materialized path of every existing part"""
+    Part = apps.get_model('parts', 'Part')
+    rows = dict(Part.objects.values_list('pk', 'parent_id'))
+    paths = {}
+
+    for pk in rows:
+        chain = []
+        seen = set()
+        node = pk
+        while node is not None and node not in paths and node not in seen and node in rows:
+            seen.add(node)
+            chain.append(node)
+            node = rows[node]
+        prefix = paths.get(node, '')
+        for node in reversed(chain):
+            prefix = f"{prefix}{node}/"
+            paths[node] = prefix
+
+    Part.objects.bulk_update(
+        [Part(pk=pk, tree_path=path) for pk, path in paths.items()],
+        ['tree_path'],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0003_part_parent_part_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='part',
+            name='tree_path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_tree_paths, migrations.RunPython.noop),
+    ]
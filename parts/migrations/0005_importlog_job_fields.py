@@ -0,0 +1,65 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0004_part_tree_path'),
+    ]
+
+    # Existing logs are finished imports, so the status column is added as
+    # 'completed' before switching to the 'queued' default for new jobs
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='csv_file',
+            field=models.FileField(blank=True, upload_to='imports/'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='rows_processed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='skip_errors',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='completed', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='importlog',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='streaming',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='total_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='update_mode',
+            field=models.CharField(default='update_existing', max_length=20),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0005_importlog_job_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['level', 'part_id'], name='parts_part_level_f1ab68_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:34
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='parts_part_search_gin'),
+    django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('part_id'), name='gin_trgm_ops'),
+        name='parts_part_part_id_trgm'
+    ),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; other backends fall back to icontains
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Part = apps.get_model('parts', 'Part')
+    for index in SEARCH_INDEXES:
+        schema_editor.add_index(Part, index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Part = apps.get_model('parts', 'Part')
+    for index in SEARCH_INDEXES:
+        schema_editor.remove_index(Part, index)
+
+
+def populate_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Part = apps.get_model('parts', 'Part')
+    Part.objects.update(search_vector=(
+        SearchVector('part_id', weight='A', config='simple') +
+        SearchVector('name', weight='B', config='simple') +
+        SearchVector('info', weight='C', config='simple')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0006_part_level_part_id_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='part',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='part', index=index) for index in SEARCH_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_indexes, drop_search_indexes),
+            ],
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
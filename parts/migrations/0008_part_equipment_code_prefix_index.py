@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0007_part_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['equipment_code'], name='parts_part_equip_code_like', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:21
+
+from django.db import migrations, models
+
+OLD_FIELD = models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255)
+NEW_FIELD = models.TextField(blank=True, default='', editable=False)
+
+
+def _alter_tree_path(apps, schema_editor, old_field, new_field):
+    # Only PostgreSQL enforces the varchar length; rebuilding the table on other
+    # backends would also try to recreate the PostgreSQL-only GIN indexes
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Part = apps.get_model('parts', 'Part')
+    old_field, new_field = old_field.clone(), new_field.clone()
+    for field in (old_field, new_field):
+        field.set_attributes_from_name('tree_path')
+        field.model = Part
+    schema_editor.alter_field(Part, old_field, new_field)
+
+
+def widen_tree_path(apps, schema_editor):
+    _alter_tree_path(apps, schema_editor, OLD_FIELD, NEW_FIELD)
+
+
+def narrow_tree_path(apps, schema_editor):
+    _alter_tree_path(apps, schema_editor, NEW_FIELD, OLD_FIELD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0008_part_equipment_code_prefix_index'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='part',
+                    name='tree_path',
+                    field=NEW_FIELD,
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(widen_tree_path, narrow_tree_path),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['tree_path'], name='parts_part_tree_path_like', opclasses=['text_pattern_ops']),
+        ),
+    ]
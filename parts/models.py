@@ -1,6 +1,12 @@
 # parts/models.py
 
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Value
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.db.models.functions import Concat, Substr, Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.contrib.auth.models import User
 import os
 from django.urls import reverse
@@ -18,6 +24,13 @@ class Part(models.Model):
     # Hierarchical relationship
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
     
+    # Materialized path of ancestor pks ("1/23/456/"), maintained on save; unbounded
+    # so deep hierarchies never overflow it (indexed for prefix matches in Meta)
+    tree_path = models.TextField(blank=True, default='', editable=False)
+    
+    # Full-text document over part_id, name and info (PostgreSQL only), maintained on save
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     # Audit fields
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_parts')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -37,6 +50,21 @@ class Part(models.Model):
     
     class Meta:
         ordering = ['level', 'part_id']
+        indexes = [
+            # Ordered, keyset-paged child lookups for the lazy tree
+            models.Index(fields=['parent', 'part_id']),
+            # Keyset-paged exports in the default (level, part_id) order
+            models.Index(fields=['level', 'part_id']),
+            # Ranked full-text search and partial part-number matches
+            GinIndex(fields=['search_vector'], name='parts_part_search_gin'),
+            # Trigram index on UPPER(part_id), the expression icontains compares on PostgreSQL
+            GinIndex(OpClass(Upper('part_id'), name='gin_trgm_ops'), name='parts_part_part_id_trgm'),
+            # Prefix (LIKE 'abc%') type-ahead on equipment codes; the unique part_id
+            # already gets a pattern_ops index from Django on PostgreSQL
+            models.Index(fields=['equipment_code'], name='parts_part_equip_code_like', opclasses=['varchar_pattern_ops']),
+            # Subtree lookups (tree_path LIKE '1/23/%')
+            models.Index(fields=['tree_path'], name='parts_part_tree_path_like', opclasses=['text_pattern_ops']),
+        ]
     
     def __str__(self):
         return f"{self.part_id} - {self.name}"
@@ -44,12 +72,105 @@ class Part(models.Model):
     def get_absolute_url(self):
         return reverse('part-detail', kwargs={'pk': self.pk})
     
+    def save(self, *args, **kwargs):
+        # Trust the stored path over a possibly stale in-memory copy
+        old_path = ''
+        if self.pk:
+            old_path = Part.objects.filter(pk=self.pk).values_list('tree_path', flat=True).first() or ''
+            self.tree_path = old_path
+        
+        parent_path = ''
+        if self.parent_id:
+            parent_path = Part.objects.filter(pk=self.parent_id).values_list('tree_path', flat=True).first() or ''
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError("A part cannot be moved under one of its own descendants")
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # The path includes our own pk, so it can only be computed after the insert
+            new_path = f"{parent_path}{self.pk}/"
+            if new_path != old_path:
+                if old_path:
+                    # Moved: rewrite the prefix of the whole subtree in one statement
+                    Part.objects.filter(tree_path__startswith=old_path).update(
+                        tree_path=Concat(Value(new_path), Substr('tree_path', len(old_path) + 1))
+                    )
+                else:
+                    Part.objects.filter(pk=self.pk).update(tree_path=new_path)
+                self.tree_path = new_path
+            
+            Part.update_search_vectors(Part.objects.filter(pk=self.pk))
+    
+    def get_descendants(self, include_self=False):
+        """Returns a queryset of all parts below this one in the hierarchy"""
+        if not self.tree_path:
+            return Part.objects.none()
+        queryset = Part.objects.filter(tree_path__startswith=self.tree_path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+    
+    def get_ancestors(self, include_self=False):
+        """Returns a queryset of the parts above this one, read from the path"""
+        ancestor_ids = [int(pk) for pk in self.tree_path.split('/') if pk]
+        if not include_self:
+            ancestor_ids = ancestor_ids[:-1]
+        return Part.objects.filter(pk__in=ancestor_ids)
+    
+    def get_descendant_count(self):
+        """Returns the number of parts in this part's subtree (excluding itself)"""
+        return self.get_descendants().count()
+    
     def get_all_children(self):
         """Returns all children parts recursively"""
-        children = list(self.children.all())
-        for child in self.children.all():
-            children.extend(child.get_all_children())
-        return children
+        return list(self.get_descendants())
+    
+    @classmethod
+    def search_vector_expression(cls):
+        """Weighted document: part number first, then name, then info"""
+        return (
+            SearchVector('part_id', weight='A', config='simple') +
+            SearchVector('name', weight='B', config='simple') +
+            SearchVector('info', weight='C', config='simple')
+        )
+    
+    @classmethod
+    def update_search_vectors(cls, queryset):
+        """Recompute search_vector for the given parts in one UPDATE (no-op off PostgreSQL)"""
+        if connection.vendor != 'postgresql':
+            return 0
+        return queryset.update(search_vector=cls.search_vector_expression())
+    
+    @classmethod
+    def rebuild_tree_paths(cls, batch_size=1000):
+        """
+        Recompute tree_path for every part from the parent links
+        
+        Reads (pk, parent) pairs in one query, resolves the paths in memory and
+        writes back only the rows that changed. Returns the number of updated parts.
+        """
+        rows = dict(cls.objects.values_list('pk', 'parent_id'))
+        current = dict(cls.objects.values_list('pk', 'tree_path'))
+        paths = {}
+        
+        for pk in rows:
+            # Walk up until a resolved ancestor, a root or a cycle is reached
+            chain = []
+            seen = set()
+            node = pk
+            while node is not None and node not in paths and node not in seen and node in rows:
+                seen.add(node)
+                chain.append(node)
+                node = rows[node]
+            prefix = paths.get(node, '')
+            for node in reversed(chain):
+                prefix = f"{prefix}{node}/"
+                paths[node] = prefix
+        
+        changed = [cls(pk=pk, tree_path=path) for pk, path in paths.items() if current.get(pk) != path]
+        cls.objects.bulk_update(changed, ['tree_path'], batch_size=batch_size)
+        return len(changed)
     
     @property
     def has_documents(self):
@@ -130,10 +251,27 @@ class Document(models.Model):
     def is_text(self):
         return self.file_extension in ['.txt', '.csv', '.md']
 
+class ImportClaimLost(Exception):
+    """Raised when a worker reports into an import job that is no longer its claim"""
+    pass
+
 class ImportLog(models.Model):
     """
-    Track CSV imports for auditing
+    Track CSV imports for auditing; queued imports also use it as their job record
     """
+    # Fields a running import reports into (see save_progress)
+    PROGRESS_FIELDS = [
+        'status', 'log_message', 'total_rows', 'rows_processed', 'parts_added',
+        'parts_updated', 'parts_skipped', 'started_at', 'completed_at'
+    ]
+    
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    
     file_name = models.CharField(max_length=255)
     imported_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='imports')
     imported_at = models.DateTimeField(auto_now_add=True)
@@ -142,11 +280,49 @@ class ImportLog(models.Model):
     parts_skipped = models.IntegerField(default=0)
     log_message = models.TextField(blank=True, null=True)
     
+    # Job state and parameters for background imports
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    csv_file = models.FileField(upload_to='imports/', blank=True)
+    update_mode = models.CharField(max_length=20, default='update_existing')
+    skip_errors = models.BooleanField(default=True)
+    streaming = models.BooleanField(default=False)
+    total_rows = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    # Touched periodically by the worker running the job, so dead workers' jobs can be reclaimed
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    
     class Meta:
         ordering = ['-imported_at']
     
     def __str__(self):
         return f"Import {self.file_name} by {self.imported_by} on {self.imported_at}"
+    
+    def save_progress(self):
+        """
+        Write the status, counters and messages of a running import
+        
+        The write only applies while the row is still the running claim this
+        instance was read with (same status and attempt). A job requeued by
+        ImportJobQueue.reclaim_stale is no longer either, so a worker that was
+        only slow gets ImportClaimLost instead of overwriting the new run.
+        """
+        written = ImportLog.objects.filter(pk=self.pk, status='running', attempts=self.attempts).update(
+            **{field: getattr(self, field) for field in self.PROGRESS_FIELDS}
+        )
+        if not written:
+            raise ImportClaimLost(f"Import {self.pk} was reclaimed by another worker")
+    
+    @property
+    def progress(self):
+        """Percentage of rows processed (100 once the import has finished)"""
+        if self.status in ['completed', 'failed']:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, int(self.rows_processed * 100 / self.total_rows))
 
 class MarkedPart(models.Model):
     """
@@ -162,4 +338,23 @@ class MarkedPart(models.Model):
         ordering = ['-marked_at']
     
     def __str__(self):
-        return f"{self.user.username} marked {self.part.part_id}"
\ No newline at end of file
+        return f"{self.user.username} marked {self.part.part_id}"
+
+def invalidate_part_suggestions():
+    """
+    Drop the cached type-ahead suggestions once the current transaction commits
+    
+    Called by the signal receivers below and by the bulk importer, since
+    bulk_create sends no signals.
+    """
+    from .services.part_typeahead import PartTypeahead
+    PartTypeahead.invalidate_on_commit()
+
+# Signals to invalidate the cached suggestions on any saved or deleted part
+@receiver(post_save, sender=Part)
+def part_saved(sender, instance, **kwargs):
+    invalidate_part_suggestions()
+
+@receiver(post_delete, sender=Part)
+def part_deleted(sender, instance, **kwargs):
+    invalidate_part_suggestions()
@@ -0,0 +1,262 @@
+# parts/services/bulk_importer.py
+
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+from ..models import Part, invalidate_part_suggestions
+
+class PartImportRowError(Exception):
+    """Raised when a single CSV row cannot be turned into a part"""
+    pass
+
+class PartBulkImporter:
+    """
+    Set-based import engine for parts
+
+    Rows are applied in waves: every row whose parent is already known (in the
+    database or created by an earlier wave) is written with chunked bulk
+    inserts and upserts, then the rows waiting for the parts just written
+    follow. For a well-formed BOM each wave is one hierarchy level. Counters
+    are kept on the given ImportLog exactly as the row-by-row import did.
+
+    Only the part_id -> pk map of existing parts is held for the whole
+    import; the stored values an update is compared with are read per wave.
+    Rows whose parent has not turned up yet are held, keyed by that parent,
+    until it does; files in export order (parents first) never hold any.
+    """
+
+    # Fields written for both new and updated parts
+    DATA_FIELDS = [
+        'name', 'level', 'info', 'parent_id', 'equipment_code',
+        'system_code', 'subsystem_code', 'component_code', 'subcomponent_code'
+    ]
+    UPDATE_FIELDS = DATA_FIELDS + ['modified_by', 'modified_at']
+
+    # CSV header -> model field for the optional text columns
+    TEXT_COLUMNS = {
+        'Info': 'info',
+        'EquipmentCode': 'equipment_code',
+        'System': 'system_code',
+        'Subsystem': 'subsystem_code',
+        'Component': 'component_code',
+        'Subcomponent': 'subcomponent_code',
+    }
+
+    def __init__(self, user, import_log, update_mode='update_existing', skip_errors=True, batch_size=1000):
+        self.user = user
+        self.import_log = import_log
+        self.update_mode = update_mode
+        self.skip_errors = skip_errors
+        self.batch_size = batch_size
+        self.pk_map = {}
+        self.pending = {}
+        self.moved_parts = False
+
+        if import_log.log_message is None:
+            import_log.log_message = ''
+
+    def load_existing(self):
+        """Pre-load the part_id -> pk map of existing parts in one query"""
+        self.pk_map = dict(Part.objects.values_list('part_id', 'pk').iterator(chunk_size=self.batch_size))
+
+    def _current_values(self, part_ids):
+        """Stored values of existing parts, as part_id -> (pk, normalized DATA_FIELDS), in batched queries"""
+        current = {}
+        for start in range(0, len(part_ids), self.batch_size):
+            rows = Part.objects.filter(
+                part_id__in=part_ids[start:start + self.batch_size]
+            ).values_list('part_id', 'pk', *self.DATA_FIELDS)
+            for row in rows:
+                current[row[0]] = (row[1], self._normalize(row[2:]))
+        return current
+
+    @staticmethod
+    def _normalize(values):
+        """Treat NULL and empty text alike when comparing stored and imported values"""
+        return tuple('' if value is None else value for value in values)
+
+    def parse_row(self, record):
+        """
+        Convert a CSV record (dict keyed by the standard headers) into part values
+
+        Raises PartImportRowError if the row is not usable.
+        """
+        part_id = str(record.get('ID', '')).strip()
+        if not part_id:
+            raise PartImportRowError("Missing part ID")
+
+        try:
+            level = int(float(record['Level'])) if 'Level' in record else 0
+        except (TypeError, ValueError):
+            raise PartImportRowError(f"Invalid level '{record.get('Level')}'")
+
+        parent_id = str(record.get('Parent') or '').strip() or None
+
+        values = {
+            'part_id': part_id,
+            'name': str(record.get('Name', '')).strip(),
+            'level': level,
+            'parent_part_id': parent_id,
+        }
+        for column, field in self.TEXT_COLUMNS.items():
+            values[field] = str(record.get(column) or '')
+
+        # Catch overlong values here so one bad row doesn't fail a whole batch
+        for field in ['part_id', 'name'] + list(self.TEXT_COLUMNS.values()):
+            max_length = Part._meta.get_field(field).max_length
+            if max_length and len(values[field]) > max_length:
+                raise PartImportRowError(f"Value for {field} exceeds {max_length} characters")
+
+        return values
+
+    def process(self, records):
+        """Parse records and apply every row whose parent can already be resolved"""
+        rows = []
+        for record in records:
+            try:
+                rows.append(self.parse_row(record))
+            except PartImportRowError as e:
+                self._row_error(record.get('ID', ''), e)
+
+        self._apply(rows)
+
+    def finish(self):
+        """Account for rows whose parent never turned up and settle the tree index"""
+        for rows in self.pending.values():
+            for row in rows:
+                if not self.skip_errors:
+                    raise PartImportRowError(
+                        f"Parent part '{row['parent_part_id']}' not found for part '{row['part_id']}'"
+                    )
+                self.import_log.parts_skipped += 1
+        self.pending = {}
+
+        # Re-parented existing parts move whole subtrees; recompute paths once
+        if self.moved_parts:
+            Part.rebuild_tree_paths(batch_size=self.batch_size)
+
+    def _row_error(self, part_id, error):
+        if not self.skip_errors:
+            raise PartImportRowError(f"Error processing row: {error}")
+        self.import_log.log_message += f"Error on part {part_id}: {error}\n"
+        self.import_log.parts_skipped += 1
+
+    def _apply(self, rows):
+        """Write rows wave by wave; rows that still lack a parent are kept in pending"""
+        while rows:
+            ready = []
+            for row in rows:
+                if row['parent_part_id'] is None or row['parent_part_id'] in self.pk_map:
+                    ready.append(row)
+                else:
+                    self.pending.setdefault(row['parent_part_id'], []).append(row)
+
+            if not ready:
+                break
+
+            self._write(ready)
+            # Rows that were waiting for a part of this wave form the next one
+            rows = [waiting for part_id in dict.fromkeys(row['part_id'] for row in ready)
+                    for waiting in self.pending.pop(part_id, [])]
+
+    def _write(self, rows):
+        """Split one wave into inserts and updates and apply them in chunks"""
+        now = timezone.now()
+        updating = self.update_mode in ['update_existing', 'replace_all']
+        to_create = {}
+        to_update = {}
+
+        current_values = {}
+        if updating:
+            current_values = self._current_values(
+                list(dict.fromkeys(row['part_id'] for row in rows if row['part_id'] in self.pk_map))
+            )
+
+        for row in rows:
+            values = {field: row[field] for field in self.DATA_FIELDS if field != 'parent_id'}
+            values['parent_id'] = self.pk_map.get(row['parent_part_id']) if row['parent_part_id'] else None
+            part_id = row['part_id']
+
+            if part_id in to_create or part_id in self.pk_map:
+                if not updating:
+                    self.import_log.parts_skipped += 1
+                    continue
+                self.import_log.parts_updated += 1
+
+                if part_id in to_create:
+                    # Repeated row for a part created in this wave: last one wins
+                    for field, value in values.items():
+                        setattr(to_create[part_id], field, value)
+                    continue
+
+                # Rows identical to what is stored count as updated but cost no write
+                pk, current = current_values.get(part_id, (self.pk_map[part_id], None))
+                new_values = self._normalize(values[field] for field in self.DATA_FIELDS)
+                if current == new_values:
+                    continue
+                # A part deleted while the import ran is written back without a path; rebuild then too
+                if current is None or current[self.DATA_FIELDS.index('parent_id')] != values['parent_id']:
+                    self.moved_parts = True
+                # A repeated row later in the wave compares with what this one writes
+                current_values[part_id] = (pk, new_values)
+
+                to_update[part_id] = Part(
+                    pk=pk,
+                    part_id=part_id,
+                    modified_by=self.user,
+                    modified_at=now,
+                    **values
+                )
+            else:
+                to_create[part_id] = Part(
+                    part_id=part_id,
+                    created_by=self.user,
+                    modified_by=self.user,
+                    **values
+                )
+                self.import_log.parts_added += 1
+
+        if to_create:
+            created = Part.objects.bulk_create(list(to_create.values()), batch_size=self.batch_size)
+            if any(part.pk is None for part in created):
+                # Backends without RETURNING support: read the new pks back
+                self.pk_map.update(Part.objects.filter(
+                    part_id__in=list(to_create)
+                ).values_list('part_id', 'pk'))
+            else:
+                self.pk_map.update((part.part_id, part.pk) for part in created)
+            self._set_tree_paths([self.pk_map[part_id] for part_id in to_create])
+            self._set_search_vectors([self.pk_map[part_id] for part_id in to_create])
+
+        if to_update:
+            # Upsert on the unique part_id: one INSERT ... ON CONFLICT DO UPDATE per chunk,
+            # far cheaper than bulk_update's per-row CASE expressions
+            Part.objects.bulk_create(
+                list(to_update.values()),
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['part_id'],
+                update_fields=self.UPDATE_FIELDS
+            )
+            self._set_search_vectors([self.pk_map[part_id] for part_id in to_update])
+
+        if to_create or to_update:
+            invalidate_part_suggestions()
+
+    def _set_tree_paths(self, pks):
+        """Derive tree_path for newly created parts from their (already indexed) parents"""
+        parent_path = Part.objects.filter(pk=OuterRef('parent_id')).values('tree_path')[:1]
+        for start in range(0, len(pks), self.batch_size):
+            Part.objects.filter(pk__in=pks[start:start + self.batch_size]).update(
+                tree_path=Concat(
+                    Subquery(parent_path),
+                    Cast('pk', output_field=CharField()),
+                    Value('/'),
+                    output_field=CharField()
+                )
+            )
+
+    def _set_search_vectors(self, pks):
+        """Refresh the full-text document of written parts, one UPDATE per batch"""
+        for start in range(0, len(pks), self.batch_size):
+            Part.update_search_vectors(Part.objects.filter(pk__in=pks[start:start + self.batch_size]))
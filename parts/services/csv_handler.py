@@ -1,11 +1,16 @@
 # parts/services/csv_handler.py
 
 import csv
-import io
 import pandas as pd
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from ..models import Part, ImportLog
+from SSBModel.csv_streaming import csv_lines
+from ..models import Part, ImportLog, ImportClaimLost
+from .bulk_importer import PartBulkImporter
+
+# A streamed import commits chunk by chunk, so it cannot undo a deletion of every part
+STREAMING_REPLACE_ALL_ERROR = "'Replace all parts' cannot be combined with a streamed import"
 
 class CSVImportException(Exception):
     """Custom exception for CSV import errors"""
@@ -16,23 +21,62 @@ class CSVHandler:
     
     REQUIRED_HEADERS = ['ID', 'Name', 'Level', 'Info', 'Parent', 'EquipmentCode', 'System', 'Subsystem', 'Component', 'Subcomponent']
     
+    # Rows per chunk when streaming an import
+    STREAM_CHUNK_SIZE = 5000
+    
+    # Rows per query when streaming an export
+    EXPORT_CHUNK_SIZE = 2000
+    
+    EXPORT_HEADERS = [
+        'ID', 'Name', 'Level', 'Info', 'Parent', 
+        'EquipmentCode', 'System', 'Subsystem', 'Component', 'Subcomponent',
+        'Created By', 'Created At', 'Modified By', 'Modified At'
+    ]
+    EXPORT_FIELDS = [
+        'part_id', 'name', 'level', 'info', 'parent__part_id',
+        'equipment_code', 'system_code', 'subsystem_code', 'component_code', 'subcomponent_code',
+        'created_by__username', 'created_at', 'modified_by__username', 'modified_at'
+    ]
+    
+    @staticmethod
+    def read_headers(csv_file):
+        """Read the header row from the first chunk of the upload only"""
+        csv_file.seek(0)
+        first_chunk = next(csv_file.chunks(), b'')
+        if isinstance(first_chunk, bytes):
+            first_chunk = first_chunk.decode('utf-8-sig', errors='replace')
+        header_line = first_chunk.splitlines()[0] if first_chunk else ''
+        csv_file.seek(0)
+        return next(csv.reader([header_line]), [])
+    
+    @staticmethod
+    def count_rows(csv_file):
+        """Count data rows by scanning the upload chunk by chunk (used for progress reporting)"""
+        csv_file.seek(0)
+        newlines = 0
+        last_chunk = b''
+        for chunk in csv_file.chunks():
+            newlines += chunk.count(b'\n')
+            last_chunk = chunk
+        csv_file.seek(0)
+        
+        # A final line without a trailing newline still holds a row; the header doesn't
+        if last_chunk and not last_chunk.endswith(b'\n'):
+            newlines += 1
+        return max(0, newlines - 1)
+    
     @staticmethod
     def validate_csv_structure(csv_file):
         """
         Validate that the CSV file has the required structure
         Returns True if valid, raises CSVImportException if invalid
         """
-        # Reset file pointer to the beginning
-        csv_file.seek(0)
-        
-        # Read the first few lines to check headers
+        # Read only the header row to check headers
         try:
-            # Use pandas to read and detect headers
-            df = pd.read_csv(csv_file, nrows=1)
-            headers = df.columns.tolist()
+            headers = CSVHandler.read_headers(csv_file)
             
             # Check for required headers (case insensitive)
-            lower_headers = [h.lower() for h in headers]
+            lower_headers = [h.strip().lower() for h in headers]
             missing_headers = []
             
             for required in CSVHandler.REQUIRED_HEADERS:
@@ -42,15 +86,14 @@ class CSVHandler:
             if missing_headers:
                 raise CSVImportException(f"Missing required headers: {', '.join(missing_headers)}")
             
-            # Reset file pointer to the beginning
-            csv_file.seek(0)
             return True
             
         except Exception as e:
             raise CSVImportException(f"Error validating CSV: {str(e)}")
     
     @staticmethod
-    def import_csv(csv_file, user, update_mode='update_existing', skip_errors=True):
+    def import_csv(csv_file, user, update_mode='update_existing', skip_errors=True, streaming=False,
+                   import_log=None):
         """
         Import parts from CSV file
         
@@ -59,145 +102,193 @@ class CSVHandler:
             user: The user performing the import
             update_mode: One of 'add_only', 'update_existing', 'replace_all'
             skip_errors: Whether to skip errors and continue importing
+            streaming: Read the file in chunks and commit each chunk separately.
+                Memory stays flat for any file size, but a failure leaves the
+                chunks already committed in place, so it cannot be combined
+                with 'replace_all'.
+            import_log: Existing ImportLog to report into (used by queued jobs)
             
         Returns:
             ImportLog instance with import results
         """
-        # Create import log
-        import_log = ImportLog.objects.create(
-            imported_by=user,
-            filename=csv_file.name,
-            update_mode=update_mode,
-            skip_errors=skip_errors
-        )
+        if streaming and update_mode == 'replace_all':
+            raise CSVImportException(STREAMING_REPLACE_ALL_ERROR)
+        
+        # Create import log; queued jobs arrive already claimed and running
+        if import_log is None:
+            import_log = ImportLog.objects.create(
+                imported_by=user,
+                file_name=csv_file.name,
+                update_mode=update_mode,
+                skip_errors=skip_errors,
+                streaming=streaming,
+                status='running',
+                started_at=timezone.now()
+            )
         
         # Reset file pointer
         csv_file.seek(0)
         
         # Read CSV file
         try:
-            df = pd.read_csv(csv_file)
+            importer = PartBulkImporter(
+                user,
+                import_log,
+                update_mode=update_mode,
+                skip_errors=skip_errors
+            )
             
-            # Clean and standardize column names
-            df.columns = [col.strip() for col in df.columns]
-            renamed_columns = {}
-            for col in df.columns:
-                for required in CSVHandler.REQUIRED_HEADERS:
-                    if col.lower() == required.lower():
-                        renamed_columns[col] = required
+            if streaming:
+                CSVHandler._import_streaming(csv_file, importer, import_log, update_mode)
+            else:
+                CSVHandler._import_at_once(csv_file, importer, import_log, update_mode)
             
-            df = df.rename(columns=renamed_columns)
-            
-            # Start a database transaction
-            with transaction.atomic():
-                # If replace_all mode, delete all existing parts
-                if update_mode == 'replace_all':
-                    Part.objects.all().delete()
-                    import_log.parts_deleted = Part.objects.count()
-                
-                # Process parts hierarchically by level
-                if 'Level' in df.columns:
-                    # Sort by Level to import parents before children
-                    df = df.sort_values(by='Level')
-                
-                # Track parent mapping for hierarchical structure
-                parent_map = {}
-                
-                # Process each row
-                for _, row in df.iterrows():
-                    try:
-                        part_id = row['ID'].strip() if isinstance(row['ID'], str) else str(row['ID'])
-                        name = row['Name'].strip() if isinstance(row['Name'], str) else str(row['Name'])
-                        level = int(row['Level']) if 'Level' in row else 0
-                        info = row['Info'] if 'Info' in row else ''
-                        parent_id = row['Parent'] if 'Parent' in row and not pd.isna(row['Parent']) else None
-                        equipment_code = row['EquipmentCode'] if 'EquipmentCode' in row else ''
-                        system_code = row['System'] if 'System' in row else ''
-                        subsystem_code = row['Subsystem'] if 'Subsystem' in row else ''
-                        component_code = row['Component'] if 'Component' in row else ''
-                        subcomponent_code = row['Subcomponent'] if 'Subcomponent' in row else ''
-                        
-                        # Convert parent_id to string if it exists
-                        if parent_id is not None and not isinstance(parent_id, str):
-                            parent_id = str(parent_id)
-                        
-                        # Find parent part if a parent_id is provided
-                        parent = None
-                        if parent_id:
-                            # Look in parent map first (for newly created parts)
-                            if parent_id in parent_map:
-                                parent = parent_map[parent_id]
-                            else:
-                                # Try to find in database
-                                try:
-                                    parent = Part.objects.get(part_id=parent_id)
-                                except Part.DoesNotExist:
-                                    if not skip_errors:
-                                        raise CSVImportException(f"Parent part '{parent_id}' not found for part '{part_id}'")
-                                    import_log.parts_skipped += 1
-                                    continue
-                        
-                        # Check if part already exists
-                        try:
-                            existing_part = Part.objects.get(part_id=part_id)
-                            
-                            # Update existing part if mode allows
-                            if update_mode in ['update_existing', 'replace_all']:
-                                existing_part.name = name
-                                existing_part.level = level
-                                existing_part.info = info
-                                existing_part.parent = parent
-                                existing_part.equipment_code = equipment_code
-                                existing_part.system_code = system_code
-                                existing_part.subsystem_code = subsystem_code
-                                existing_part.component_code = component_code
-                                existing_part.subcomponent_code = subcomponent_code
-                                existing_part.modified_by = user
-                                existing_part.save()
-                                parent_map[part_id] = existing_part
-                                import_log.parts_updated += 1
-                            else:
-                                # Skip if add_only mode
-                                import_log.parts_skipped += 1
-                                
-                        except Part.DoesNotExist:
-                            # Create new part
-                            new_part = Part.objects.create(
-                                part_id=part_id,
-                                name=name,
-                                level=level,
-                                info=info,
-                                parent=parent,
-                                equipment_code=equipment_code,
-                                system_code=system_code,
-                                subsystem_code=subsystem_code,
-                                component_code=component_code,
-                                subcomponent_code=subcomponent_code,
-                                created_by=user,
-                                modified_by=user
-                            )
-                            parent_map[part_id] = new_part
-                            import_log.parts_added += 1
-                    
-                    except Exception as e:
-                        if not skip_errors:
-                            raise CSVImportException(f"Error processing row: {str(e)}")
-                        import_log.error_log += f"Error on part {part_id}: {str(e)}\n"
-                        import_log.parts_skipped += 1
-            
-            # Update import log with completion timestamp
+            import_log.status = 'completed'
             import_log.completed_at = timezone.now()
-            import_log.save()
+            import_log.save_progress()
             
             return import_log
-                        
+        
+        except ImportClaimLost:
+            # The job now belongs to another worker; leave its record alone
+            raise
         except Exception as e:
             # Log failure and re-raise
-            import_log.error_log = f"Import failed: {str(e)}"
+            import_log.log_message = f"Import failed: {str(e)}"
+            import_log.status = 'failed'
             import_log.completed_at = timezone.now()
-            import_log.save()
+            import_log.save_progress()
             raise CSVImportException(f"Error importing CSV: {str(e)}")
     
+    @staticmethod
+    def _delete_all_parts(import_log):
+        deleted_count = Part.objects.count()
+        Part.objects.all().delete()
+        import_log.log_message = f"Deleted {deleted_count} existing parts\n"
+    
+    @staticmethod
+    def _import_at_once(csv_file, importer, import_log, update_mode):
+        """Read the whole file and apply it in a single transaction"""
+        # Read every cell as text so part IDs like "0012" keep their form
+        df = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+        df = df.rename(columns=CSVHandler.standardize_columns(df.columns))
+        
+        # Sort by Level to import parents before children
+        if 'Level' in df.columns:
+            df = df.assign(_level=pd.to_numeric(df['Level'], errors='coerce'))
+            df = df.sort_values(by='_level', kind='stable').drop(columns='_level')
+        
+        # Start a database transaction
+        with transaction.atomic():
+            # If replace_all mode, delete all existing parts
+            if update_mode == 'replace_all':
+                CSVHandler._delete_all_parts(import_log)
+            
+            importer.load_existing()
+            importer.process(df.to_dict('records'))
+            importer.finish()
+            
+            # Written before the commit, so a worker that lost its claim rolls the import back
+            import_log.rows_processed = import_log.total_rows = len(df)
+            import_log.save_progress()
+    
+    @staticmethod
+    def _import_streaming(csv_file, importer, import_log, update_mode):
+        """Read the file chunk by chunk, committing one bounded transaction per chunk"""
+        importer.load_existing()
+        
+        reader = pd.read_csv(
+            csv_file,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=CSVHandler.STREAM_CHUNK_SIZE
+        )
+        for chunk in reader:
+            chunk = chunk.rename(columns=CSVHandler.standardize_columns(chunk.columns))
+            
+            # Rows whose parent appears later in the file stay pending in the importer.
+            # Progress is committed with each chunk, so pollers see it while the import
+            # runs and a worker that lost its claim stops with the chunk rolled back
+            with transaction.atomic():
+                importer.process(chunk.to_dict('records'))
+                import_log.rows_processed += len(chunk)
+                import_log.save_progress()
+        
+        with transaction.atomic():
+            importer.finish()
+    
+    @staticmethod
+    def standardize_columns(columns):
+        """Map CSV column names to the standard header spelling (case insensitive)"""
+        renamed_columns = {}
+        for col in columns:
+            for required in CSVHandler.REQUIRED_HEADERS:
+                if col.strip().lower() == required.lower():
+                    renamed_columns[col] = required
+        return renamed_columns
+    
+    @staticmethod
+    def iter_export_rows(parts, chunk_size=None):
+        """
+        Yield export rows for the given parts in (level, part_id) order
+
+        Parts are read in keyset-paginated chunks with values_list(), so the
+        parent and user columns come from joins in the same query and memory
+        use does not grow with the size of the export.
+
+        Args:
+            parts: QuerySet of parts to export (its ordering is replaced)
+            chunk_size: Rows read per query
+        """
+        chunk_size = chunk_size or CSVHandler.EXPORT_CHUNK_SIZE
+        parts = parts.order_by('level', 'part_id')
+        last = None
+        
+        while True:
+            chunk = parts
+            if last is not None:
+                chunk = chunk.filter(Q(level__gt=last[0]) | Q(level=last[0], part_id__gt=last[1]))
+            rows = list(chunk.values_list(*CSVHandler.EXPORT_FIELDS)[:chunk_size])
+            
+            for row in rows:
+                (part_id, name, level, info, parent_id, equipment_code, system_code,
+                 subsystem_code, component_code, subcomponent_code,
+                 created_by, created_at, modified_by, modified_at) = row
+                yield [
+                    part_id,
+                    name,
+                    level,
+                    info,
+                    parent_id or '',
+                    equipment_code or '',
+                    system_code or '',
+                    subsystem_code or '',
+                    component_code or '',
+                    subcomponent_code or '',
+                    created_by or '',
+                    created_at.strftime('%Y-%m-%d %H:%M:%S') if created_at else '',
+                    modified_by or '',
+                    modified_at.strftime('%Y-%m-%d %H:%M:%S') if modified_at else ''
+                ]
+            
+            if len(rows) < chunk_size:
+                break
+            last = (rows[-1][2], rows[-1][0])
+    
+    @staticmethod
+    def stream_csv(parts, chunk_size=None):
+        """
+        Generate the export CSV line by line (for StreamingHttpResponse)
+        
+        Args:
+            parts: QuerySet of parts to export
+            chunk_size: Rows read per query
+            
+        Yields:
+            CSV text, one line per item
+        """
+        return csv_lines(CSVHandler.EXPORT_HEADERS, CSVHandler.iter_export_rows(parts, chunk_size))
+    
     @staticmethod
     def export_csv(parts):
         """
@@ -209,33 +300,4 @@ class CSVHandler:
         Returns:
             CSV content as string
         """
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write headers with codification
-        writer.writerow([
-            'ID', 'Name', 'Level', 'Info', 'Parent', 
-            'EquipmentCode', 'System', 'Subsystem', 'Component', 'Subcomponent',
-            'Created By', 'Created At', 'Modified By', 'Modified At'
-        ])
-        
-        # Write part data
-        for part in parts:
-            writer.writerow([
-                part.part_id,
-                part.name,
-                part.level,
-                part.info,
-                part.parent.part_id if part.parent else '',
-                part.equipment_code or '',
-                part.system_code or '',
-                part.subsystem_code or '',
-                part.component_code or '',
-                part.subcomponent_code or '',
-                part.created_by.username if part.created_by else '',
-                part.created_at.strftime('%Y-%m-%d %H:%M:%S') if part.created_at else '',
-                part.modified_by.username if part.modified_by else '',
-                part.modified_at.strftime('%Y-%m-%d %H:%M:%S') if part.modified_at else ''
-            ])
-        
-        return output.getvalue()
\ No newline at end of file
+        return ''.join(CSVHandler.stream_csv(parts))
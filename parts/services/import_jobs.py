@@ -0,0 +1,202 @@
+# parts/services/import_jobs.py
+
+import logging
+import threading
+from datetime import timedelta
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from ..models import ImportLog, ImportClaimLost
+from .csv_handler import CSVHandler, CSVImportException
+
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats of a running job
+HEARTBEAT_INTERVAL = 30
+
+# Seconds without a heartbeat after which a job's worker is presumed dead
+STALE_AFTER = 5 * 60
+
+# Claims per job; a job whose worker keeps dying is failed instead of requeued
+MAX_ATTEMPTS = 3
+
+class _Heartbeat(threading.Thread):
+    """Touches heartbeat_at of a running job, for as long as the claim holds, until stopped"""
+
+    def __init__(self, import_log, interval=HEARTBEAT_INTERVAL):
+        super().__init__(daemon=True)
+        self.pk = import_log.pk
+        self.attempt = import_log.attempts
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                ImportLog.objects.filter(pk=self.pk, status='running', attempts=self.attempt).update(
+                    heartbeat_at=timezone.now()
+                )
+        finally:
+            # The thread had its own connection
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+class ImportJobQueue:
+    """
+    Database-backed queue for CSV imports
+
+    A queued import is an ImportLog row in 'queued' status holding the stored
+    upload and the import options. Worker processes (manage.py run_import_worker)
+    claim jobs one at a time, so several imports can run side by side. While a
+    job runs its worker touches heartbeat_at; jobs left 'running' by a worker
+    that died are requeued by the next claim. Every write of a running job is
+    tied to the claim (status and attempt number), so a worker whose job was
+    requeued under it stops at its next write without touching the new run.
+    The stored upload is deleted once its job has finished.
+    """
+
+    @staticmethod
+    def enqueue(csv_file, user, update_mode='update_existing', skip_errors=True, streaming=False):
+        """Store the upload and create a queued ImportLog for it"""
+        import_log = ImportLog(
+            imported_by=user,
+            file_name=csv_file.name,
+            update_mode=update_mode,
+            skip_errors=skip_errors,
+            streaming=streaming,
+            status='queued'
+        )
+        import_log.csv_file.save(csv_file.name, csv_file, save=False)
+        import_log.save()
+        return import_log
+
+    @staticmethod
+    def claim_next():
+        """
+        Atomically claim the oldest queued job
+
+        The conditional UPDATE only succeeds for one worker, so no locking is
+        needed. Stale jobs are reclaimed first. Returns the claimed ImportLog
+        or None if the queue is empty.
+        """
+        ImportJobQueue.reclaim_stale()
+
+        queued_ids = ImportLog.objects.filter(
+            status='queued'
+        ).exclude(csv_file='').order_by('imported_at', 'pk').values_list('pk', flat=True)[:10]
+
+        for pk in queued_ids:
+            now = timezone.now()
+            claimed = ImportLog.objects.filter(pk=pk, status='queued').update(
+                status='running',
+                started_at=now,
+                heartbeat_at=now,
+                attempts=F('attempts') + 1
+            )
+            if claimed:
+                return ImportLog.objects.get(pk=pk)
+        return None
+
+    @staticmethod
+    def reclaim_stale(stale_after=STALE_AFTER):
+        """
+        Requeue running jobs whose worker stopped sending heartbeats
+
+        The job restarts from the beginning, which is safe because imports
+        upsert by part id. A job already claimed MAX_ATTEMPTS times is failed
+        instead. Synchronous imports have no heartbeat and are never touched.
+        Returns the number of jobs requeued or failed.
+        """
+        stale = ImportLog.objects.filter(
+            status='running',
+            heartbeat_at__lt=timezone.now() - timedelta(seconds=stale_after)
+        )
+
+        reclaimed = stale.filter(attempts__lt=MAX_ATTEMPTS).update(
+            status='queued',
+            started_at=None,
+            heartbeat_at=None,
+            total_rows=0,
+            rows_processed=0,
+            parts_added=0,
+            parts_updated=0,
+            parts_skipped=0,
+            log_message=None
+        )
+        for import_log in stale.filter(attempts__gte=MAX_ATTEMPTS):
+            failed = ImportLog.objects.filter(pk=import_log.pk, status='running').update(
+                status='failed',
+                log_message=f"Import failed: its worker stopped responding {import_log.attempts} times",
+                completed_at=timezone.now()
+            )
+            if failed:
+                ImportJobQueue.discard_upload(import_log)
+                reclaimed += 1
+
+        if reclaimed:
+            logger.warning(f"Reclaimed {reclaimed} stale import jobs")
+        return reclaimed
+
+    @staticmethod
+    def discard_upload(import_log):
+        """Delete the stored upload of a finished job"""
+        if import_log.csv_file:
+            import_log.csv_file.delete(save=False)
+            ImportLog.objects.filter(pk=import_log.pk).update(csv_file='')
+
+    @staticmethod
+    def run(import_log):
+        """
+        Execute a claimed job; failures are recorded on the ImportLog
+
+        If the job is reclaimed while it runs, the worker stops and leaves the
+        record and the upload to the worker that now holds it.
+        """
+        heartbeat = _Heartbeat(import_log)
+        heartbeat.start()
+        try:
+            with import_log.csv_file.open('rb') as csv_file:
+                import_log.total_rows = CSVHandler.count_rows(csv_file)
+                import_log.save_progress()
+
+                CSVHandler.validate_csv_structure(csv_file)
+                CSVHandler.import_csv(
+                    csv_file,
+                    import_log.imported_by,
+                    update_mode=import_log.update_mode,
+                    skip_errors=import_log.skip_errors,
+                    streaming=import_log.streaming,
+                    import_log=import_log
+                )
+        except ImportClaimLost:
+            logger.warning(f"Import job {import_log.pk} was reclaimed by another worker; stopping")
+            return import_log
+        except CSVImportException as e:
+            logger.error(f"Import job {import_log.pk} failed: {str(e)}")
+            if import_log.status != 'failed' and not ImportJobQueue._fail(import_log, str(e)):
+                return import_log
+        except Exception as e:
+            logger.exception(f"Import job {import_log.pk} crashed")
+            if not ImportJobQueue._fail(import_log, f"Import failed: {str(e)}"):
+                return import_log
+        finally:
+            heartbeat.stop()
+
+        ImportJobQueue.discard_upload(import_log)
+        return import_log
+
+    @staticmethod
+    def _fail(import_log, message):
+        """Record a failed run; returns False if the job has been reclaimed meanwhile"""
+        import_log.status = 'failed'
+        import_log.log_message = message
+        import_log.completed_at = timezone.now()
+        try:
+            import_log.save_progress()
+        except ImportClaimLost:
+            logger.warning(f"Import job {import_log.pk} was reclaimed by another worker; stopping")
+            return False
+        return True
@@ -0,0 +1,50 @@
+# parts/services/part_filter.py
+
+from django.db.models import Exists, OuterRef
+from ..models import Document, MarkedPart
+from .part_search import PartSearch
+
+class PartFilter:
+    """Applies the part list search filters; shared by the list view and the CSV export"""
+
+    @staticmethod
+    def apply(queryset, user, search_term=None, level=None, has_documents=False, is_marked=False, root=None):
+        """
+        Narrow a Part queryset with the search form filters
+
+        Document and mark checks are EXISTS subqueries rather than joins, so
+        rows are never duplicated and no DISTINCT is needed.
+
+        Args:
+            queryset: Part queryset to filter
+            user: User whose marked parts are used for is_marked
+            search_term: Text searched in part_id, name and info
+            level: Exact hierarchy level
+            has_documents: Only parts with at least one document
+            is_marked: Only parts marked by the user
+            root: Part whose subtree (itself included) is kept
+
+        Returns:
+            Filtered queryset
+        """
+        if root is not None:
+            # Indexed prefix match on the materialized path
+            if root.tree_path:
+                queryset = queryset.filter(tree_path__startswith=root.tree_path)
+            else:
+                queryset = queryset.filter(pk=root.pk)
+
+        if search_term:
+            # Ranked full-text search; ordered by relevance where available
+            queryset = PartSearch.search(queryset, search_term)
+
+        if level is not None:
+            queryset = queryset.filter(level=level)
+
+        if has_documents:
+            queryset = queryset.filter(Exists(Document.objects.filter(part=OuterRef('pk'))))
+
+        if is_marked:
+            queryset = queryset.filter(Exists(MarkedPart.objects.filter(user=user, part=OuterRef('pk'))))
+
+        return queryset
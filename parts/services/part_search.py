@@ -0,0 +1,89 @@
+# parts/services/part_search.py
+
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q, Value, FloatField
+from ..models import Part, MarkedPart
+
+# Result limits for the search API
+DEFAULT_RESULT_LIMIT = 20
+MAX_RESULT_LIMIT = 100
+
+class PartSearch:
+    """
+    Ranked part search
+
+    On PostgreSQL parts are matched against the GIN-indexed search_vector
+    (every word of the term as a prefix) or by a partial part number, which
+    the trigram index serves, and ordered by text rank plus part number
+    similarity. Other backends fall back to a plain icontains filter.
+    """
+
+    @staticmethod
+    def is_full_text_available():
+        return connection.vendor == 'postgresql'
+
+    @staticmethod
+    def build_query(term):
+        """Turn free text into a prefix tsquery ("pump 12" -> "pump:* & 12:*"), or None"""
+        words = re.findall(r'\w+', term)
+        if not words:
+            return None
+        return SearchQuery(' & '.join(f"{word}:*" for word in words), search_type='raw', config='simple')
+
+    @staticmethod
+    def search(queryset, term):
+        """
+        Filter a Part queryset by a search term and order it by relevance
+
+        The result is annotated with 'rank' (always 0 without full-text support,
+        in which case the queryset's ordering is kept).
+        """
+        term = term.strip()
+
+        if not PartSearch.is_full_text_available():
+            return queryset.filter(
+                Q(part_id__icontains=term) |
+                Q(name__icontains=term) |
+                Q(info__icontains=term)
+            ).annotate(rank=Value(0.0, output_field=FloatField()))
+
+        query = PartSearch.build_query(term)
+        match = Q(part_id__icontains=term)
+        rank = TrigramSimilarity('part_id', term)
+        if query is not None:
+            match |= Q(search_vector=query)
+            rank = rank + SearchRank(F('search_vector'), query)
+
+        return queryset.filter(match).annotate(rank=rank).order_by('-rank', 'part_id')
+
+    @staticmethod
+    def search_nodes(term, user=None, limit=DEFAULT_RESULT_LIMIT):
+        """
+        Return the best matches as tree-style node dicts for the search API
+
+        Args:
+            term: Search text
+            user: Optional user whose marked parts are flagged
+            limit: Maximum number of results
+        """
+        limit = max(1, min(int(limit), MAX_RESULT_LIMIT))
+        rows = list(PartSearch.search(Part.objects.all(), term).values(
+            'id', 'part_id', 'name', 'level', 'rank'
+        )[:limit])
+
+        marked_ids = set()
+        if user is not None and rows:
+            marked_ids = set(MarkedPart.objects.filter(
+                user=user, part_id__in=[row['id'] for row in rows]
+            ).values_list('part_id', flat=True))
+
+        return [{
+            'id': row['id'],
+            'part_id': row['part_id'],
+            'text': f"{row['part_id']} - {row['name']}",
+            'level': row['level'],
+            'marked': row['id'] in marked_ids,
+            'rank': round(float(row['rank'] or 0), 4)
+        } for row in rows]
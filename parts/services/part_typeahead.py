@@ -0,0 +1,78 @@
+# parts/services/part_typeahead.py
+
+import hashlib
+from django.core.cache import caches
+from django.db import transaction
+from ..models import Part
+
+# Result limits for type-ahead lookups
+DEFAULT_SUGGESTION_LIMIT = 10
+MAX_SUGGESTION_LIMIT = 25
+
+# Seconds a prefix stays cached; other processes' suggestions may lag edits by this much
+CACHE_TIMEOUT = 30
+
+# Per-process LocMemCache alias (SSBModel/settings.py CACHES)
+CACHE_ALIAS = 'typeahead'
+
+class PartTypeahead:
+    """
+    Prefix lookup of parts by part number or equipment code
+
+    Both lookups are LIKE 'prefix%' queries answered from varchar_pattern_ops
+    indexes with a LIMIT, so a keystroke costs two short index range scans.
+    Recent prefixes are kept in the in-process 'typeahead' cache, so a repeated
+    keystroke costs neither a query nor file I/O. Committed part writes clear
+    this process's cache (see invalidate_part_suggestions in parts/models.py).
+    """
+
+    @staticmethod
+    def invalidate():
+        """Forget every cached prefix"""
+        caches[CACHE_ALIAS].clear()
+
+    @staticmethod
+    def invalidate_on_commit():
+        """Forget every cached prefix once the current transaction commits"""
+        transaction.on_commit(PartTypeahead.invalidate)
+
+    @staticmethod
+    def _cache_key(prefix, limit):
+        digest = hashlib.md5(prefix.encode('utf-8')).hexdigest()
+        return f"part-typeahead:{limit}:{digest}"
+
+    @staticmethod
+    def suggest(prefix, limit=DEFAULT_SUGGESTION_LIMIT, use_cache=True):
+        """
+        Return up to `limit` parts whose part_id or equipment_code starts with prefix
+
+        Part number matches come first, then equipment code matches, each in
+        code order.
+        """
+        prefix = prefix.strip()
+        limit = max(1, min(int(limit), MAX_SUGGESTION_LIMIT))
+        if not prefix:
+            return []
+
+        key = PartTypeahead._cache_key(prefix, limit)
+        if use_cache:
+            cached = caches[CACHE_ALIAS].get(key)
+            if cached is not None:
+                return cached
+
+        fields = ('id', 'part_id', 'name', 'equipment_code')
+        suggestions = list(Part.objects.filter(
+            part_id__startswith=prefix
+        ).order_by('part_id').values(*fields)[:limit])
+
+        if len(suggestions) < limit:
+            seen = {row['id'] for row in suggestions}
+            by_code = Part.objects.filter(
+                equipment_code__startswith=prefix
+            ).order_by('equipment_code').values(*fields)[:limit]
+            suggestions.extend(row for row in by_code if row['id'] not in seen)
+            suggestions = suggestions[:limit]
+
+        if use_cache:
+            caches[CACHE_ALIAS].set(key, suggestions, CACHE_TIMEOUT)
+        return suggestions
@@ -0,0 +1,123 @@
+# parts/services/tree_builder.py
+
+from django.db.models import Exists, OuterRef
+
+from ..models import Part, Document, MarkedPart
+
+# Page sizes for lazy children loading
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+class PartTreeBuilder:
+    """Builds the nested parts tree used by tree.js from a single Part query"""
+
+    @staticmethod
+    def get_marked_part_ids(user):
+        """Return the set of part pks marked by the given user"""
+        return set(MarkedPart.objects.filter(user=user).values_list('part_id', flat=True))
+
+    @staticmethod
+    def build_tree(user=None):
+        """
+        Build the full parts tree as a list of nested dicts
+
+        All parts are read once (with a has_documents flag computed in the
+        same query) and the hierarchy is assembled in memory, so the cost is
+        one query for parts plus one for the user's marks, whatever the size
+        of the tree.
+
+        Args:
+            user: Optional user whose marked parts are flagged in the output
+
+        Returns:
+            List of root node dicts, each with a nested 'children' list
+        """
+        marked_part_ids = PartTreeBuilder.get_marked_part_ids(user) if user else set()
+
+        rows = Part.objects.annotate(
+            has_docs=Exists(Document.objects.filter(part=OuterRef('pk')))
+        ).values(
+            'id', 'part_id', 'name', 'level', 'parent_id', 'has_docs'
+        ).order_by('part_id')
+
+        # Create one node per part; key order matches the previous recursive builder
+        nodes = {}
+        ordered_rows = []
+        for row in rows:
+            nodes[row['id']] = {
+                'id': row['id'],
+                'part_id': row['part_id'],
+                'text': f"{row['part_id']} - {row['name']}",
+                'level': row['level'],
+                'has_documents': bool(row['has_docs']),
+                'marked': row['id'] in marked_part_ids
+            }
+            ordered_rows.append(row)
+
+        # Attach children in part_id order; 'children' is only present when non-empty
+        for row in ordered_rows:
+            parent = nodes.get(row['parent_id'])
+            if parent is not None:
+                parent.setdefault('children', []).append(nodes[row['id']])
+
+        # Roots are level 0 parts, as in the dashboard
+        return [nodes[row['id']] for row in ordered_rows if row['level'] == 0]
+
+    @staticmethod
+    def get_children(parent_id=None, user=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Return one page of direct children for lazy tree expansion
+
+        Children are ordered by part_id and paged with a keyset cursor (the
+        last part_id of the previous page), so every page is a single indexed
+        query regardless of how many siblings precede it.
+
+        Args:
+            parent_id: Pk of the parent part, or None for the root level
+            user: Optional user whose marked parts are flagged in the output
+            cursor: part_id of the last node already returned, or None
+            limit: Maximum number of nodes in the page
+
+        Returns:
+            Tuple of (list of node dicts, next cursor or None)
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        if parent_id is None:
+            queryset = Part.objects.filter(level=0)
+        else:
+            queryset = Part.objects.filter(parent_id=parent_id)
+
+        if cursor:
+            queryset = queryset.filter(part_id__gt=cursor)
+
+        queryset = queryset.annotate(
+            has_docs=Exists(Document.objects.filter(part=OuterRef('pk'))),
+            has_kids=Exists(Part.objects.filter(parent=OuterRef('pk')))
+        )
+        fields = ['id', 'part_id', 'name', 'level', 'has_docs', 'has_kids']
+        if user is not None:
+            queryset = queryset.annotate(
+                is_marked=Exists(MarkedPart.objects.filter(user=user, part=OuterRef('pk')))
+            )
+            fields.append('is_marked')
+
+        rows = list(queryset.values(*fields).order_by('part_id')[:limit + 1])
+
+        # The extra row only tells us whether another page exists
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1]['part_id']
+
+        nodes = [{
+            'id': row['id'],
+            'part_id': row['part_id'],
+            'text': f"{row['part_id']} - {row['name']}",
+            'level': row['level'],
+            'has_documents': bool(row['has_docs']),
+            'marked': bool(row.get('is_marked', False)),
+            'has_children': bool(row['has_kids'])
+        } for row in rows]
+
+        return nodes, next_cursor
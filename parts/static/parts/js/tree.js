@@ -6,6 +6,9 @@ const DEBUG = true;
 // Global variables
 let partsTree = [];
 let selectedPart = null;
+let lazyChildrenUrl = null;
+let treeInitialized = false;
+let partSearchUrl = null;
 
 /**
  * Debug logging function
@@ -27,6 +30,7 @@ function debugLog(message, data = null) {
  */
 function initPartsTree(treeDataUrl, initiallyExpanded = false) {
     debugLog('Initializing tree with URL', treeDataUrl);
+    treeInitialized = true;
     
     const statusBar = document.getElementById('statusBar');
     if (statusBar) {
@@ -82,6 +86,141 @@ function initPartsTree(treeDataUrl, initiallyExpanded = false) {
         });
 }
 
+/**
+ * Initialize the parts tree in lazy mode: only the root level is fetched,
+ * children are loaded page by page when a node is expanded
+ * @param {string} childrenUrl - URL of the paginated children endpoint
+ */
+function initLazyPartsTree(childrenUrl) {
+    debugLog('Initializing lazy tree with URL', childrenUrl);
+    treeInitialized = true;
+    
+    if (!childrenUrl) {
+        console.error('Tree children URL is missing!');
+        updateStatus('Error: Tree children URL is missing');
+        return;
+    }
+    
+    const treeContainer = document.getElementById('partsTree');
+    if (!treeContainer) {
+        console.error('Tree container element not found! Expected element with id "partsTree"');
+        return;
+    }
+    
+    lazyChildrenUrl = childrenUrl;
+    partsTree = [];
+    updateStatus('Loading tree data...');
+    
+    const ul = document.createElement('ul');
+    ul.className = 'tree-root';
+    treeContainer.innerHTML = '';
+    treeContainer.appendChild(ul);
+    
+    loadChildPage(null, ul, null)
+        .then(() => {
+            if (partsTree.length === 0) {
+                treeContainer.innerHTML = '<p class="text-muted p-3">No parts found in the database.</p>';
+                updateStatus('No parts found in the database');
+            } else {
+                updateStatus('Tree data loaded successfully');
+            }
+        })
+        .catch(error => {
+            treeContainer.innerHTML = `
+                <div class="alert alert-danger">
+                    <strong>Error loading tree data:</strong> ${error.message}
+                    <p>URL: ${childrenUrl}</p>
+                </div>
+            `;
+        });
+}
+
+/**
+ * Fetch one page of children and append them to a list element
+ * @param {Object|null} parentNode - Parent node data, or null for root level
+ * @param {HTMLElement} childUl - The ul element receiving the nodes
+ * @param {string|null} cursor - Cursor returned by the previous page
+ * @returns {Promise} Resolves once the page has been rendered
+ */
+function loadChildPage(parentNode, childUl, cursor) {
+    const params = new URLSearchParams();
+    if (parentNode) {
+        params.set('node', parentNode.id);
+    }
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    
+    debugLog('Fetching child page', { parent: parentNode ? parentNode.id : null, cursor });
+    
+    return fetch(`${lazyChildrenUrl}?${params.toString()}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Server responded with status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            // Keep loaded nodes in the in-memory tree so searchParts can find them
+            const siblings = parentNode ? (parentNode.children = parentNode.children || []) : partsTree;
+            
+            data.nodes.forEach(childNode => {
+                siblings.push(childNode);
+                try {
+                    childUl.appendChild(createTreeNode(childNode));
+                } catch (error) {
+                    console.error('Error creating tree node:', error, childNode);
+                }
+            });
+            
+            if (data.next_cursor) {
+                const moreLi = document.createElement('li');
+                const moreLink = document.createElement('a');
+                moreLink.href = '#';
+                moreLink.className = 'tree-load-more text-muted';
+                moreLink.textContent = 'Load more...';
+                moreLink.onclick = function(e) {
+                    e.preventDefault();
+                    moreLi.remove();
+                    loadChildPage(parentNode, childUl, data.next_cursor);
+                };
+                moreLi.appendChild(moreLink);
+                childUl.appendChild(moreLi);
+            }
+        })
+        .catch(error => {
+            console.error('Error fetching child nodes:', error);
+            updateStatus('Error loading parts tree. See console for details.');
+            throw error;
+        });
+}
+
+/**
+ * Expand a lazily loaded node, fetching its children on first expansion
+ * @param {Object} node - Tree node data
+ * @param {HTMLElement} nodeDiv - The node element
+ */
+function expandLazyNode(node, nodeDiv) {
+    const li = nodeDiv.parentElement;
+    
+    // Children already fetched: behave like a regular toggle
+    if (li.querySelector('ul.child-nodes')) {
+        toggleChildNodes(nodeDiv);
+        return;
+    }
+    
+    const childUl = document.createElement('ul');
+    childUl.className = 'child-nodes';
+    childUl.style.display = 'block';
+    li.appendChild(childUl);
+    nodeDiv.querySelector('.expand-icon').textContent = '-';
+    
+    loadChildPage(node, childUl, null).catch(() => {
+        childUl.remove();
+        nodeDiv.querySelector('.expand-icon').textContent = '+';
+    });
+}
+
 /**
  * Render the tree in the tree container
  * @param {Array} treeData - Array of tree nodes
@@ -159,6 +298,13 @@ function createTreeNode(node, initiallyExpanded = false) {
             e.stopPropagation();
             toggleChildNodes(nodeDiv);
         };
+    } else if (node.has_children) {
+        // Lazy mode: children are fetched on first expansion
+        expandIcon.textContent = '+';
+        expandIcon.onclick = function(e) {
+            e.stopPropagation();
+            expandLazyNode(node, nodeDiv);
+        };
     } else {
         expandIcon.textContent = '•';
     }
@@ -187,8 +333,8 @@ function createTreeNode(node, initiallyExpanded = false) {
     
     li.appendChild(nodeDiv);
     
-    // Create child container if has children
-    if (node.children && node.children.length > 0) {
+    // Create child container if has children (lazy nodes build it on expansion)
+    if (node.children && node.children.length > 0 && !node.has_children) {
         const childUl = document.createElement('ul');
         childUl.className = 'child-nodes';
         childUl.style.display = initiallyExpanded ? 'block' : 'none';
@@ -376,6 +522,14 @@ function updateMarkForms(part) {
     }
 }
 
+/**
+ * Use the server-side ranked search instead of scanning the loaded tree
+ * @param {string} searchUrl - URL of the part search API
+ */
+function initPartSearch(searchUrl) {
+    partSearchUrl = searchUrl;
+}
+
 /**
  * Search for parts in the tree
  * @param {string} term - Search term
@@ -383,6 +537,12 @@ function updateMarkForms(part) {
 function searchParts(term) {
     if (!term.trim()) return;
     
+    // The loaded tree may only hold a few levels; ask the server when possible
+    if (partSearchUrl) {
+        searchPartsOnServer(term.trim());
+        return;
+    }
+    
     term = term.toLowerCase();
     let found = false;
     
@@ -425,6 +585,93 @@ function searchParts(term) {
     }
 }
 
+/**
+ * Offer part number / equipment code suggestions while typing in a search box
+ * @param {string} inputId - ID of the search input
+ * @param {string} typeaheadUrl - URL of the type-ahead API
+ */
+function initPartTypeahead(inputId, typeaheadUrl) {
+    const input = document.getElementById(inputId);
+    if (!input || !typeaheadUrl) return;
+    
+    const datalist = document.createElement('datalist');
+    datalist.id = `${inputId}Suggestions`;
+    input.setAttribute('list', datalist.id);
+    input.setAttribute('autocomplete', 'off');
+    input.after(datalist);
+    
+    let timer = null;
+    let latestPrefix = '';
+    
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const prefix = input.value.trim();
+        if (!prefix) {
+            datalist.innerHTML = '';
+            return;
+        }
+        
+        // Wait for a pause in typing before asking the server
+        timer = setTimeout(() => {
+            latestPrefix = prefix;
+            const params = new URLSearchParams({ q: prefix });
+            fetch(`${typeaheadUrl}?${params.toString()}`)
+                .then(response => response.json())
+                .then(data => {
+                    // Ignore answers for prefixes the user has already typed past
+                    if (prefix !== latestPrefix) return;
+                    
+                    datalist.innerHTML = '';
+                    data.results.forEach(part => {
+                        const option = document.createElement('option');
+                        option.value = part.part_id;
+                        option.label = part.equipment_code ? `${part.name} (${part.equipment_code})` : part.name;
+                        datalist.appendChild(option);
+                    });
+                })
+                .catch(error => debugLog('Type-ahead failed', error));
+        }, 150);
+    });
+}
+
+/**
+ * Search with the ranked search API and select the best match
+ * @param {string} term - Search term
+ */
+function searchPartsOnServer(term) {
+    updateStatus(`Searching for "${term}"...`);
+    
+    const params = new URLSearchParams({ q: term, limit: 20 });
+    fetch(`${partSearchUrl}?${params.toString()}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Search failed: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            debugLog('Search results', data);
+            
+            if (data.results.length === 0) {
+                updateStatus(`No parts found matching "${term}"`);
+                return;
+            }
+            
+            // The best match may not be loaded in the tree; details load either way
+            const best = data.results[0];
+            selectPart(best);
+            expandToNode(best.id);
+            
+            if (data.results.length > 1) {
+                updateStatus(`Selected part: ${best.text} (best of ${data.results.length} matches)`);
+            }
+        })
+        .catch(error => {
+            console.error('Error searching parts:', error);
+            updateStatus(`Error: ${error.message}`);
+        });
+}
+
 /**
  * Expand tree to show a specific node
  * @param {number} nodeId - Node ID to expand to
@@ -476,6 +723,9 @@ function updateStatus(message) {
 if (typeof module !== 'undefined' && module.exports) {
     module.exports = {
         initPartsTree,
+        initLazyPartsTree,
+        initPartSearch,
+        initPartTypeahead,
         renderTree,
         selectPart,
         debugLog
@@ -493,6 +743,19 @@ document.addEventListener('DOMContentLoaded', function() {
         return;
     }
     
+    // Skip if the page template already initialized the tree
+    if (treeInitialized) {
+        debugLog('Tree already initialized by the page');
+        return;
+    }
+    
+    // Prefer lazy loading when the container provides a children URL
+    const childrenUrl = treeContainer.getAttribute('data-children-url');
+    if (childrenUrl) {
+        initLazyPartsTree(childrenUrl);
+        return;
+    }
+    
     // Check for the URL in a data attribute
     const treeDataUrl = treeContainer.getAttribute('data-url') || '/parts/tree-json/';
     const initiallyExpanded = treeContainer.getAttribute('data-expanded') === 'true';
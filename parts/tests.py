@@ -1,3 +1,522 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .forms import ImportCSVForm
+from .models import Part, Document, MarkedPart, ImportLog, ImportClaimLost
+from .services.csv_handler import CSVHandler, CSVImportException, STREAMING_REPLACE_ALL_ERROR
+from .services.import_jobs import ImportJobQueue, MAX_ATTEMPTS, STALE_AFTER
+from .services.part_filter import PartFilter
+from .services.part_search import PartSearch
+from .services.part_typeahead import PartTypeahead
+from .services.tree_builder import PartTreeBuilder
+
+
+def make_csv(*rows):
+    """Build an upload in the import format from (ID, Name, Level, Parent) rows"""
+    lines = [','.join(CSVHandler.REQUIRED_HEADERS)]
+    for part_id, name, level, parent in rows:
+        lines.append(f'{part_id},{name},{level},,{parent},,,,,')
+    return SimpleUploadedFile('parts.csv', ('\n'.join(lines) + '\n').encode('utf-8'))
+
+
+class PartTreeBuilderTests(TestCase):
+    """The nested and lazy parts trees are built with a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tree-user', password='x')
+        cls.root = Part.objects.create(part_id='R1', name='Root', level=0)
+        cls.child_b = Part.objects.create(part_id='C2', name='Child B', level=1, parent=cls.root)
+        cls.child_a = Part.objects.create(part_id='C1', name='Child A', level=1, parent=cls.root)
+        cls.leaf = Part.objects.create(part_id='L1', name='Leaf', level=2, parent=cls.child_a)
+        cls.other_root = Part.objects.create(part_id='R2', name='Other root', level=0)
+        Document.objects.create(part=cls.leaf, title='Drawing', file='documents/drawing.pdf')
+        MarkedPart.objects.create(user=cls.user, part=cls.child_b)
+
+    def test_build_tree_nests_parts_in_part_id_order(self):
+        tree = PartTreeBuilder.build_tree()
+
+        self.assertEqual([node['part_id'] for node in tree], ['R1', 'R2'])
+        self.assertEqual([node['part_id'] for node in tree[0]['children']], ['C1', 'C2'])
+        self.assertEqual(tree[0]['children'][0]['children'][0]['text'], 'L1 - Leaf')
+        self.assertNotIn('children', tree[1])
+
+    def test_build_tree_flags_documents_and_marks(self):
+        tree = PartTreeBuilder.build_tree(self.user)
+
+        child_a, child_b = tree[0]['children']
+        self.assertTrue(child_a['children'][0]['has_documents'])
+        self.assertFalse(child_a['has_documents'])
+        self.assertTrue(child_b['marked'])
+        self.assertFalse(child_a['marked'])
+
+    def test_build_tree_query_count_does_not_grow_with_the_tree(self):
+        with self.assertNumQueries(2):
+            PartTreeBuilder.build_tree(self.user)
+
+        parent = self.leaf
+        for depth in range(3, 13):
+            parent = Part.objects.create(part_id=f'D{depth:02}', name='Deep', level=depth, parent=parent)
+            Document.objects.create(part=parent, title='Sheet', file='documents/sheet.pdf')
+
+        with self.assertNumQueries(2):
+            PartTreeBuilder.build_tree(self.user)
+        with self.assertNumQueries(1):
+            PartTreeBuilder.build_tree()
+
+    def test_get_children_pages_with_a_cursor(self):
+        with self.assertNumQueries(1):
+            nodes, cursor = PartTreeBuilder.get_children(self.root.pk, user=self.user, limit=1)
+        self.assertEqual([node['part_id'] for node in nodes], ['C1'])
+        self.assertTrue(nodes[0]['has_children'])
+        self.assertEqual(cursor, 'C1')
+
+        nodes, cursor = PartTreeBuilder.get_children(self.root.pk, user=self.user, cursor=cursor, limit=1)
+        self.assertEqual([node['part_id'] for node in nodes], ['C2'])
+        self.assertTrue(nodes[0]['marked'])
+        self.assertFalse(nodes[0]['has_children'])
+        self.assertIsNone(cursor)
+
+
+class PartBulkImportTests(TestCase):
+    """CSV imports through the bulk engine, at once and streamed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('import-user', password='x')
+
+    def paths(self):
+        return {part.part_id: part.tree_path for part in Part.objects.all()}
+
+    def expected_path(self, *part_ids):
+        return ''.join(f'{Part.objects.get(part_id=part_id).pk}/' for part_id in part_ids)
+
+    def test_children_listed_before_their_parents_are_created(self):
+        import_log = CSVHandler.import_csv(make_csv(
+            ('C1', 'Child', 1, 'R1'),
+            ('L1', 'Leaf', 2, 'C1'),
+            ('R1', 'Root', 0, ''),
+        ), self.user)
+
+        self.assertEqual(import_log.status, 'completed')
+        self.assertEqual((import_log.parts_added, import_log.parts_updated, import_log.parts_skipped), (3, 0, 0))
+        self.assertEqual(Part.objects.get(part_id='L1').parent.part_id, 'C1')
+        self.assertEqual(self.paths()['L1'], self.expected_path('R1', 'C1', 'L1'))
+
+    def test_orphans_are_skipped_and_counted(self):
+        import_log = CSVHandler.import_csv(make_csv(
+            ('R1', 'Root', 0, ''),
+            ('O1', 'Orphan', 1, 'MISSING'),
+            ('O2', 'Orphan child', 2, 'O1'),
+        ), self.user)
+
+        self.assertEqual((import_log.parts_added, import_log.parts_skipped), (1, 2))
+        self.assertFalse(Part.objects.filter(part_id__in=['O1', 'O2']).exists())
+
+    def test_orphans_fail_the_import_without_skip_errors(self):
+        with self.assertRaises(CSVImportException):
+            CSVHandler.import_csv(make_csv(
+                ('R1', 'Root', 0, ''),
+                ('O1', 'Orphan', 1, 'MISSING'),
+            ), self.user, skip_errors=False)
+        self.assertFalse(Part.objects.exists())
+
+    def test_moved_subtree_gets_new_tree_paths(self):
+        CSVHandler.import_csv(make_csv(
+            ('R1', 'Root', 0, ''),
+            ('R2', 'Other root', 0, ''),
+            ('C1', 'Child', 1, 'R1'),
+            ('L1', 'Leaf', 2, 'C1'),
+        ), self.user)
+
+        import_log = CSVHandler.import_csv(make_csv(
+            ('C1', 'Child', 1, 'R2'),
+        ), self.user)
+
+        self.assertEqual(import_log.parts_updated, 1)
+        self.assertEqual(Part.objects.get(part_id='C1').parent.part_id, 'R2')
+        self.assertEqual(self.paths()['C1'], self.expected_path('R2', 'C1'))
+        self.assertEqual(self.paths()['L1'], self.expected_path('R2', 'C1', 'L1'))
+        self.assertEqual(
+            set(Part.objects.get(part_id='R2').get_descendants().values_list('part_id', flat=True)),
+            {'C1', 'L1'}
+        )
+
+    def test_add_only_leaves_existing_parts_alone(self):
+        CSVHandler.import_csv(make_csv(('R1', 'Root', 0, '')), self.user)
+
+        import_log = CSVHandler.import_csv(make_csv(
+            ('R1', 'Renamed', 0, ''),
+            ('R2', 'New root', 0, ''),
+        ), self.user, update_mode='add_only')
+
+        self.assertEqual((import_log.parts_added, import_log.parts_skipped), (1, 1))
+        self.assertEqual(Part.objects.get(part_id='R1').name, 'Root')
+
+
+@mock.patch.object(CSVHandler, 'STREAM_CHUNK_SIZE', 2)
+class PartStreamingImportTests(TestCase):
+    """Streamed imports commit chunk by chunk and hold only the part_id -> pk map"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('stream-user', password='x')
+
+    def import_streaming(self, *rows, **kwargs):
+        return CSVHandler.import_csv(make_csv(*rows), self.user, streaming=True, **kwargs)
+
+    def test_parents_from_later_chunks_are_resolved(self):
+        import_log = self.import_streaming(
+            ('L1', 'Leaf', 2, 'C1'),
+            ('C1', 'Child', 1, 'R1'),
+            ('O1', 'Orphan', 1, 'MISSING'),
+            ('R1', 'Root', 0, ''),
+        )
+
+        self.assertEqual(import_log.status, 'completed')
+        self.assertEqual(import_log.rows_processed, 4)
+        self.assertEqual((import_log.parts_added, import_log.parts_skipped), (3, 1))
+        leaf = Part.objects.get(part_id='L1')
+        self.assertEqual(leaf.tree_path, f'{leaf.parent.parent_id}/{leaf.parent_id}/{leaf.pk}/')
+
+    def test_existing_values_are_read_per_chunk(self):
+        self.import_streaming(('R1', 'Root', 0, ''), ('C1', 'Child', 1, 'R1'), ('C2', 'Child', 1, 'R1'))
+
+        with mock.patch.object(Part, 'rebuild_tree_paths') as rebuild:
+            import_log = self.import_streaming(
+                ('N1', 'New', 1, 'R1'),
+                ('C1', 'Renamed', 1, 'R1'),
+                ('C2', 'Child', 1, 'R1'),
+                ('N1', 'New renamed', 1, 'R1'),
+            )
+
+        # Rows for parts stored earlier, even by this import, compare with the stored values
+        rebuild.assert_not_called()
+        self.assertEqual((import_log.parts_added, import_log.parts_updated), (1, 3))
+        self.assertEqual(Part.objects.get(part_id='N1').name, 'New renamed')
+        self.assertEqual(Part.objects.get(part_id='C1').name, 'Renamed')
+
+    def test_moved_parts_rebuild_the_tree_paths(self):
+        self.import_streaming(('R1', 'Root', 0, ''), ('R2', 'Root', 0, ''), ('C1', 'Child', 1, 'R1'))
+
+        self.import_streaming(('C1', 'Child', 1, 'R2'))
+
+        child = Part.objects.get(part_id='C1')
+        self.assertEqual(child.tree_path, f'{child.parent_id}/{child.pk}/')
+
+    def test_replace_all_is_rejected(self):
+        self.import_streaming(('R1', 'Root', 0, ''))
+
+        with self.assertRaises(CSVImportException):
+            self.import_streaming(('R2', 'Root', 0, ''), update_mode='replace_all')
+
+        self.assertEqual(list(Part.objects.values_list('part_id', flat=True)), ['R1'])
+
+    def test_form_rejects_replace_all_when_streaming(self):
+        form = ImportCSVForm(
+            {'update_mode': 'replace_all', 'streaming': 'on', 'skip_errors': 'on'},
+            {'csv_file': make_csv(('R1', 'Root', 0, ''))}
+        )
+
+        self.assertFalse(form.is_valid())
+        self.assertIn(STREAMING_REPLACE_ALL_ERROR, form.non_field_errors())
+
+
+class ImportJobQueueTests(TestCase):
+    """Queued imports are claimed, run, reclaimed and cleaned up through the ImportLog row"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('queue-user', password='x')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def enqueue(self, *rows):
+        return ImportJobQueue.enqueue(make_csv(*(rows or [('R1', 'Root', 0, ''), ('C1', 'Child', 1, 'R1')])), self.user)
+
+    def make_stale(self, job):
+        ImportLog.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=STALE_AFTER + 1)
+        )
+
+    def test_claimed_job_runs_to_completion_and_drops_its_upload(self):
+        queued = self.enqueue()
+        upload = queued.csv_file.path
+
+        job = ImportJobQueue.claim_next()
+        self.assertEqual((job.pk, job.status, job.attempts), (queued.pk, 'running', 1))
+        self.assertIsNone(ImportJobQueue.claim_next())
+
+        ImportJobQueue.run(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.total_rows, job.rows_processed, job.parts_added), (2, 2, 2))
+        self.assertEqual(job.csv_file.name, '')
+        self.assertIsNotNone(job.heartbeat_at)
+        self.assertFalse(os.path.exists(upload))
+
+    def test_job_without_heartbeat_is_reclaimed(self):
+        self.enqueue()
+        job = ImportJobQueue.claim_next()
+        self.make_stale(job)
+
+        with self.assertLogs('parts.services.import_jobs', 'WARNING'):
+            reclaimed = ImportJobQueue.claim_next()
+
+        self.assertEqual((reclaimed.pk, reclaimed.status, reclaimed.attempts), (job.pk, 'running', 2))
+
+    def test_worker_that_lost_its_claim_stops_without_writing(self):
+        self.enqueue()
+        slow = ImportJobQueue.claim_next()
+        self.make_stale(slow)
+        with self.assertLogs('parts.services.import_jobs', 'WARNING'):
+            current = ImportJobQueue.claim_next()
+
+        with self.assertRaises(ImportClaimLost):
+            slow.save_progress()
+        with self.assertLogs('parts.services.import_jobs', 'WARNING'):
+            ImportJobQueue.run(slow)
+
+        # The slow worker neither imported nor touched the new run or its upload
+        self.assertFalse(Part.objects.exists())
+        current.refresh_from_db()
+        self.assertEqual((current.status, current.attempts, current.rows_processed), ('running', 2, 0))
+        self.assertTrue(current.csv_file)
+
+        ImportJobQueue.run(current)
+        current.refresh_from_db()
+        self.assertEqual((current.status, current.parts_added), ('completed', 2))
+
+    def test_job_fails_after_max_attempts(self):
+        queued = self.enqueue()
+        upload = queued.csv_file.path
+        ImportLog.objects.filter(pk=queued.pk).update(attempts=MAX_ATTEMPTS - 1)
+        job = ImportJobQueue.claim_next()
+        self.make_stale(job)
+
+        with self.assertLogs('parts.services.import_jobs', 'WARNING'):
+            self.assertEqual(ImportJobQueue.reclaim_stale(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', MAX_ATTEMPTS))
+        self.assertIn('stopped responding', job.log_message)
+        self.assertEqual(job.csv_file.name, '')
+        self.assertFalse(os.path.exists(upload))
+        self.assertIsNone(ImportJobQueue.claim_next())
+
+    def test_failed_import_is_recorded_and_drops_its_upload(self):
+        ImportJobQueue.enqueue(SimpleUploadedFile('bad.csv', b'Name\nNo id column\n'), self.user)
+        job = ImportJobQueue.claim_next()
+
+        with self.assertLogs('parts.services.import_jobs', 'ERROR'):
+            ImportJobQueue.run(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Missing required headers', job.log_message)
+        self.assertEqual(job.csv_file.name, '')
+
+    def test_progress_endpoint(self):
+        job = self.enqueue()
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('import-log-progress', args=[job.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'queued')
+        self.assertEqual(response.json()['progress'], 0)
+
+        ImportJobQueue.run(ImportJobQueue.claim_next())
+        data = self.client.get(reverse('import-log-progress', args=[job.pk])).json()
+        self.assertEqual((data['status'], data['progress'], data['parts_added']), ('completed', 100, 2))
+
+    def test_progress_endpoint_is_limited_to_the_importer(self):
+        job = self.enqueue()
+        self.client.force_login(User.objects.create_user('other-user', password='x'))
+
+        response = self.client.get(reverse('import-log-progress', args=[job.pk]))
+
+        self.assertEqual(response.status_code, 403)
+
+
+class PartExportFilterTests(TestCase):
+    """The CSV export applies the part list filters and can be scoped to a subtree"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('export-user', password='x')
+        cls.root = Part.objects.create(part_id='R1', name='Pump', level=0)
+        cls.child = Part.objects.create(part_id='C1', name='Impeller', level=1, parent=cls.root)
+        cls.leaf = Part.objects.create(part_id='L1', name='Blade', level=2, parent=cls.child)
+        cls.other_root = Part.objects.create(part_id='R2', name='Valve', level=0)
+        cls.other_child = Part.objects.create(part_id='C2', name='Seat', level=1, parent=cls.other_root)
+        Document.objects.create(part=cls.leaf, title='Drawing', file='documents/drawing.pdf')
+        MarkedPart.objects.create(user=cls.user, part=cls.other_child)
+
+    def filtered(self, **filters):
+        return list(PartFilter.apply(Part.objects.all(), self.user, **filters).values_list('part_id', flat=True))
+
+    def exported(self, **params):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export-csv'), params)
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        return response, [line.split(',')[0] for line in lines[1:]]
+
+    def test_root_keeps_the_subtree_including_the_root(self):
+        self.assertEqual(self.filtered(root=self.child), ['C1', 'L1'])
+        self.assertEqual(self.filtered(root=self.root), ['R1', 'C1', 'L1'])
+
+    def test_filters_combine_without_duplicate_rows(self):
+        Document.objects.create(part=self.leaf, title='Manual', file='documents/manual.pdf')
+
+        self.assertEqual(self.filtered(has_documents=True), ['L1'])
+        self.assertEqual(self.filtered(is_marked=True), ['C2'])
+        self.assertEqual(self.filtered(root=self.root, level=1), ['C1'])
+
+    def test_export_is_scoped_to_the_root(self):
+        response, part_ids = self.exported(root=self.root.pk)
+
+        self.assertEqual(part_ids, ['R1', 'C1', 'L1'])
+        self.assertIn('parts_export_R1.csv', response['Content-Disposition'])
+
+    def test_export_uses_the_list_filters(self):
+        _, part_ids = self.exported(level=1)
+        self.assertEqual(part_ids, ['C1', 'C2'])
+
+        _, part_ids = self.exported(is_marked='on')
+        self.assertEqual(part_ids, ['C2'])
+
+    def test_invalid_filters_are_rejected(self):
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(reverse('export-csv'), {'root': 999999}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export-csv'), {'level': -1}).status_code, 400)
+
+
+class PartSearchTests(TestCase):
+    """Ranked search on PostgreSQL, a plain containment match elsewhere"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('search-user', password='x')
+        cls.pump = Part.objects.create(part_id='PMP-100', name='Centrifugal pump', level=0)
+        cls.impeller = Part.objects.create(part_id='IMP-200', name='Impeller', level=1, parent=cls.pump,
+                                           info='Fits the PMP-100 pump')
+        cls.valve = Part.objects.create(part_id='VLV-300', name='Check valve', level=0)
+        MarkedPart.objects.create(user=cls.user, part=cls.impeller)
+
+    def search(self, term):
+        return list(PartSearch.search(Part.objects.all(), term).values_list('part_id', flat=True))
+
+    def test_build_query_matches_every_word_as_a_prefix(self):
+        query = PartSearch.build_query('pump 12-b')
+
+        self.assertEqual(query, SearchQuery('pump:* & 12:* & b:*', search_type='raw', config='simple'))
+        self.assertIsNone(PartSearch.build_query(' - '))
+
+    def test_matches_part_number_name_and_info(self):
+        self.assertEqual(set(self.search('pmp-100')), {'PMP-100', 'IMP-200'})
+        self.assertEqual(self.search('valve'), ['VLV-300'])
+        self.assertEqual(self.search('gearbox'), [])
+
+    def test_search_nodes_flags_marks_and_limits_results(self):
+        nodes = PartSearch.search_nodes('pump', user=self.user, limit=5)
+
+        self.assertEqual({node['part_id']: node['marked'] for node in nodes}, {'PMP-100': False, 'IMP-200': True})
+        self.assertEqual(len(PartSearch.search_nodes('pump', limit=1)), 1)
+
+    def test_search_api(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('part-search-api'), {'q': 'valve'})
+
+        self.assertEqual([node['text'] for node in response.json()['results']], ['VLV-300 - Check valve'])
+        self.assertEqual(self.client.get(reverse('part-search-api'), {'q': ''}).json(), {'results': []})
+        self.assertEqual(self.client.get(reverse('part-search-api'), {'q': 'x', 'limit': 'all'}).status_code, 400)
+
+    @skipUnless(PartSearch.is_full_text_available(), 'Ranked search needs PostgreSQL')
+    def test_part_number_matches_rank_first(self):
+        # Both mention PMP-100; the part whose number it is ranks above the one whose info does
+        self.assertEqual(self.search('PMP-100'), ['PMP-100', 'IMP-200'])
+
+    @skipUnless(not PartSearch.is_full_text_available(), 'Fallback used without PostgreSQL')
+    def test_fallback_keeps_the_queryset_order_with_zero_rank(self):
+        results = PartSearch.search(Part.objects.order_by('-part_id'), 'E')
+
+        self.assertEqual([part.part_id for part in results], ['VLV-300', 'PMP-100', 'IMP-200'])
+        self.assertEqual({part.rank for part in results}, {0.0})
+
+
+class PartTypeaheadTests(TestCase):
+    """Prefix suggestions are cached per process and dropped on committed part writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('typeahead-user', password='x')
+        cls.pump = Part.objects.create(part_id='AB-200', name='Pump', level=0, equipment_code='ZZ-1')
+        cls.motor = Part.objects.create(part_id='AB-100', name='Motor', level=0, equipment_code='ZZ-2')
+        cls.valve = Part.objects.create(part_id='CD-100', name='Valve', level=0, equipment_code='AB-050')
+
+    def setUp(self):
+        PartTypeahead.invalidate()
+
+    def part_ids(self, prefix, **kwargs):
+        return [row['part_id'] for row in PartTypeahead.suggest(prefix, **kwargs)]
+
+    def test_part_numbers_come_before_equipment_codes(self):
+        self.assertEqual(self.part_ids('AB'), ['AB-100', 'AB-200', 'CD-100'])
+        self.assertEqual(self.part_ids('AB', limit=2), ['AB-100', 'AB-200'])
+        self.assertEqual(self.part_ids('ZZ'), ['AB-200', 'AB-100'])
+        self.assertEqual(self.part_ids('  '), [])
+
+    def test_repeated_prefix_is_served_from_the_cache(self):
+        self.part_ids('AB')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.part_ids('AB'), ['AB-100', 'AB-200', 'CD-100'])
+
+    def test_committed_save_invalidates_the_cache(self):
+        self.part_ids('AB')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Part.objects.create(part_id='AB-150', name='Seal', level=0)
+
+        self.assertEqual(self.part_ids('AB'), ['AB-100', 'AB-150', 'AB-200', 'CD-100'])
+
+    def test_delete_and_import_invalidate_the_cache(self):
+        self.part_ids('AB')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.motor.delete()
+        self.assertEqual(self.part_ids('AB'), ['AB-200', 'CD-100'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CSVHandler.import_csv(make_csv(('AB-300', 'Gear', 0, '')), self.user)
+        self.assertEqual(self.part_ids('AB'), ['AB-200', 'AB-300', 'CD-100'])
+
+    def test_typeahead_api(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('part-typeahead'), {'q': 'CD'})
+
+        self.assertEqual(response.json()['results'], [
+            {'id': self.valve.pk, 'part_id': 'CD-100', 'name': 'Valve', 'equipment_code': 'AB-050'}
+        ])
+        self.assertEqual(self.client.get(reverse('part-typeahead'), {'q': 'CD', 'limit': 'x'}).status_code, 400)
 
-# Create your tests here.
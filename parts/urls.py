@@ -7,6 +7,9 @@ from . import views_codification
 urlpatterns = [
     # API endpoints
     path('tree-json/', views.part_tree_json, name='part-tree-json'),
+    path('tree-children/', views.part_tree_children, name='part-tree-children'),
+    path('search/', views.part_search_api, name='part-search-api'),
+    path('typeahead/', views.part_typeahead_api, name='part-typeahead'),
     path('tree/', views.parts_tree_view, name='parts-tree'),
  path('codification/', views_codification.codification_viewer, name='codification-viewer'),
 
@@ -37,6 +40,7 @@ urlpatterns = [
     path('export-csv/', views.export_csv_view, name='export-csv'),
     path('import-logs/', views.import_logs_view, name='import-logs'),
     path('import-logs/<int:pk>/', views.import_log_detail, name='import-log-detail'),
+    path('import-logs/<int:pk>/progress/', views.import_log_progress, name='import-log-progress'),
 
     path('codification/', views_codification.codification_viewer, name='codification-viewer'),
 ]
\ No newline at end of file
@@ -4,16 +4,20 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
-from django.urls import reverse_lazy
+from django.http import HttpResponseBadRequest, JsonResponse, HttpResponseForbidden
+from django.urls import reverse, reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q
 
 from .models import Part, Document, MarkedPart, ImportLog
 from .forms import PartForm, DocumentForm, DocumentUpdateForm, MarkedPartForm, ImportCSVForm, PartSearchForm
 from .services.csv_handler import CSVHandler, CSVImportException
 from .services.document_handler import DocumentHandler
+from .services.import_jobs import ImportJobQueue
+from .services.part_search import PartSearch, DEFAULT_RESULT_LIMIT
+from .services.part_typeahead import PartTypeahead, DEFAULT_SUGGESTION_LIMIT
+from .services.tree_builder import PartTreeBuilder, DEFAULT_PAGE_SIZE
+from SSBModel.csv_streaming import streaming_csv_response
 from users.models import UserActivity
 
 # Tree View Components
@@ -57,45 +61,62 @@ class DashboardView(LoginRequiredMixin, ListView):
 @login_required
 def part_tree_json(request):
     """API endpoint to get the parts tree as JSON for the tree view"""
-    def build_tree_data(parts, marked_part_ids=None):
-        if marked_part_ids is None:
-            marked_part_ids = []
-            
-        tree_data = []
-        for part in parts:
-            # Check if part has documents
-            has_documents = part.documents.exists()
-            
-            # Build node data
-            node = {
-                'id': part.id,
-                'part_id': part.part_id,
-                'text': f"{part.part_id} - {part.name}",
-                'level': part.level,
-                'has_documents': has_documents,
-                'marked': part.id in marked_part_ids
-            }
-            
-            # Recursively add children
-            children = part.children.all().order_by('part_id')
-            if children:
-                node['children'] = build_tree_data(children, marked_part_ids)
-            
-            tree_data.append(node)
-        return tree_data
+    tree_data = PartTreeBuilder.build_tree(request.user)
     
-    # Get user's marked parts for highlighting in the tree
-    marked_part_ids = list(MarkedPart.objects.filter(
-        user=request.user
-    ).values_list('part_id', flat=True))
+    return JsonResponse(tree_data, safe=False)
+
+@login_required
+def part_tree_children(request):
+    """API endpoint returning one page of direct children for lazy tree expansion"""
+    node_id = request.GET.get('node', '')
+    cursor = request.GET.get('cursor') or None
+    
+    try:
+        parent_id = int(node_id) if node_id not in ('', '#') else None
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid node or limit parameter'}, status=400)
+    
+    nodes, next_cursor = PartTreeBuilder.get_children(
+        parent_id=parent_id,
+        user=request.user,
+        cursor=cursor,
+        limit=limit
+    )
     
-    # Get root parts (level 0)
-    root_parts = Part.objects.filter(level=0).order_by('part_id')
+    return JsonResponse({
+        'nodes': nodes,
+        'next_cursor': next_cursor
+    })
+
+@login_required
+def part_search_api(request):
+    """API endpoint returning parts ranked by relevance to the 'q' parameter"""
+    term = request.GET.get('q', '').strip()
     
-    # Build tree data
-    tree_data = build_tree_data(root_parts, marked_part_ids)
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_RESULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit parameter'}, status=400)
     
-    return JsonResponse(tree_data, safe=False)
+    if not term:
+        return JsonResponse({'results': []})
+    
+    return JsonResponse({
+        'results': PartSearch.search_nodes(term, user=request.user, limit=limit)
+    })
+
+@login_required
+def part_typeahead_api(request):
+    """API endpoint suggesting parts whose part number or equipment code starts with 'q'"""
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_SUGGESTION_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit parameter'}, status=400)
+    
+    return JsonResponse({
+        'results': PartTypeahead.suggest(request.GET.get('q', ''), limit=limit)
+    })
 
 @login_required
 def codification_tree_json(request):
@@ -187,27 +208,7 @@ class PartListView(LoginRequiredMixin, ListView):
         # Apply search if form is valid
         form = PartSearchForm(self.request.GET)
         if form.is_valid():
-            search_term = form.cleaned_data.get('search_term')
-            level = form.cleaned_data.get('level')
-            has_documents = form.cleaned_data.get('has_documents')
-            is_marked = form.cleaned_data.get('is_marked')
-            
-            if search_term:
-                queryset = queryset.filter(
-                    Q(part_id__icontains=search_term) | 
-                    Q(name__icontains=search_term) | 
-                    Q(info__icontains=search_term)
-                )
-            
-            if level is not None:
-                queryset = queryset.filter(level=level)
-            
-            if has_documents:
-                queryset = queryset.filter(documents__isnull=False).distinct()
-            
-            if is_marked:
-                marked_part_ids = MarkedPart.objects.filter(user=self.request.user).values_list('part_id', flat=True)
-                queryset = queryset.filter(id__in=marked_part_ids)
+            queryset = form.filter_parts(queryset, self.request.user)
         
         return queryset
     
@@ -215,6 +216,11 @@ class PartListView(LoginRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         context['search_form'] = PartSearchForm(self.request.GET)
         
+        # Export exactly what is listed (without the page number)
+        export_query = self.request.GET.copy()
+        export_query.pop('page', None)
+        context['export_query'] = export_query.urlencode()
+        
         # Add permissions
         context['can_add_parts'] = self.request.user.profile.can_add_parts
         context['can_edit_parts'] = self.request.user.profile.can_edit_parts
@@ -562,16 +568,38 @@ def import_csv_view(request):
                 csv_file = request.FILES['csv_file']
                 update_mode = form.cleaned_data['update_mode']
                 skip_errors = form.cleaned_data['skip_errors']
+                streaming = form.cleaned_data['streaming']
                 
                 # Validate CSV structure
                 CSVHandler.validate_csv_structure(csv_file)
                 
+                # Queue the import for a worker process and let the page poll its progress
+                if form.cleaned_data['run_in_background']:
+                    import_log = ImportJobQueue.enqueue(
+                        csv_file,
+                        request.user,
+                        update_mode=update_mode,
+                        skip_errors=skip_errors,
+                        streaming=streaming
+                    )
+                    
+                    UserActivity.objects.create(
+                        user=request.user,
+                        activity_type='csv_import',
+                        description=f"Queued CSV import: {csv_file.name}",
+                        ip_address=request.META.get('REMOTE_ADDR')
+                    )
+                    
+                    messages.info(request, f'Import of {csv_file.name} has been queued')
+                    return redirect(f"{reverse('import-csv')}?job={import_log.pk}")
+                
                 # Import the CSV
                 import_log = CSVHandler.import_csv(
                     csv_file, 
                     request.user,
                     update_mode=update_mode,
-                    skip_errors=skip_errors
+                    skip_errors=skip_errors,
+                    streaming=streaming
                 )
                 
                 # Log the activity
@@ -596,30 +624,51 @@ def import_csv_view(request):
     else:
         form = ImportCSVForm()
     
-    return render(request, 'parts/import_csv.html', {'form': form})
+    # Job to follow after queueing an import
+    job = None
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        job = ImportLog.objects.filter(pk=job_id, imported_by=request.user).first()
+    
+    return render(request, 'parts/import_csv.html', {'form': form, 'job': job})
+
+@login_required
+def import_log_progress(request, pk):
+    """API endpoint for polling the progress of a queued import"""
+    import_log = get_object_or_404(ImportLog, pk=pk)
+    
+    # Users can follow their own imports; admins and managers can follow any
+    if import_log.imported_by_id != request.user.id and request.user.profile.role not in ['admin', 'manager']:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    return JsonResponse({
+        'id': import_log.pk,
+        'file_name': import_log.file_name,
+        'status': import_log.status,
+        'progress': import_log.progress,
+        'rows_processed': import_log.rows_processed,
+        'total_rows': import_log.total_rows,
+        'parts_added': import_log.parts_added,
+        'parts_updated': import_log.parts_updated,
+        'parts_skipped': import_log.parts_skipped,
+        'log_message': import_log.log_message or ''
+    })
 
 @login_required
 def export_csv_view(request):
-    """Export parts to CSV"""
-    # Get parts to export (could filter based on request parameters)
-    parts = Part.objects.all().order_by('level', 'part_id')
-    
-    # Generate CSV content
-    csv_content = CSVHandler.export_csv(parts)
-    
-    # Create HTTP response with CSV file
-    response = HttpResponse(csv_content, content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="parts_export.csv"'
-    
-    # Log the activity
-    UserActivity.objects.create(
-        user=request.user,
-        activity_type='csv_export',
-        description=f"Exported {parts.count()} parts to CSV",
-        ip_address=request.META.get('REMOTE_ADDR')
+    """Export parts to CSV, streamed to the client as it is read"""
+    # Same filters as the part list, plus an optional subtree root
+    form = PartSearchForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest('Invalid export filters')
+    
+    parts = form.filter_parts(Part.objects.all(), request.user)
+    root = form.cleaned_data.get('root')
+    filename = f"parts_export_{root.part_id}.csv" if root else "parts_export.csv"
+    
+    return streaming_csv_response(
+        request, CSVHandler.EXPORT_HEADERS, CSVHandler.iter_export_rows(parts), filename, 'parts'
     )
-    
-    return response
 
 @login_required
 def import_logs_view(request):